@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Optional
+
+from textual.css.styles import RenderStyles
+
+# `auto` turns performance mode on for boards with more than `auto_threshold` drawables
+PERFORMANCE_MODES = ("auto", "on", "off")
+
+
+class AnimationBudget:
+    """Limit of style animations running at once, changes beyond it are applied instantly
+
+    The limit holds only in performance mode, so sweeping the mouse over
+    a dense board does not start dozens of animations together. Only animations
+    started by the budget in performance mode are counted, each until its duration has passed.
+    """
+
+    def __init__(
+        self,
+        max_animations: int = 8,
+        auto_threshold: int = 300,
+        mode: str = "auto",
+        count_drawables: Callable[[], int] = lambda: 0,
+    ) -> None:
+        self.max_animations = max_animations
+        self.auto_threshold = auto_threshold
+        self.mode = mode
+        self.count_drawables = count_drawables
+        # End times of animations started by the budget, by animated styles and attribute
+        self._running: dict[tuple[int, str], float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        if self.mode == "auto":
+            return self.count_drawables() > self.auto_threshold
+        return self.mode == "on"
+
+    @property
+    def running(self) -> int:
+        """Number of animations started by the budget that have not ended yet"""
+        now = time.monotonic()
+        self._running = {key: end for key, end in self._running.items() if end > now}
+        return len(self._running)
+
+    def configure(self, conf: dict[str, Any]) -> None:
+        self.set_mode(str(conf.get("mode", self.mode)))
+        self.max_animations = int(conf.get("max_animations", self.max_animations))
+        self.auto_threshold = int(conf.get("auto_threshold", self.auto_threshold))
+
+    def set_mode(self, mode: str) -> None:
+        if mode not in PERFORMANCE_MODES:
+            raise ValueError(f"Performance mode must be one of {', '.join(PERFORMANCE_MODES)}, not {mode!r}")
+        self.mode = mode
+
+    def next_mode(self) -> str:
+        self.mode = PERFORMANCE_MODES[(PERFORMANCE_MODES.index(self.mode) + 1) % len(PERFORMANCE_MODES)]
+        return self.mode
+
+    def animate(self, styles: RenderStyles, attribute: str, value: Any, duration: float) -> None:
+        if not self.enabled:
+            styles.animate(attribute, value=value, duration=duration)
+            return
+        key = (id(styles), attribute)
+        # Counting drops finished animations first, so ids of styles freed since then are not taken as running
+        running = self.running
+        if duration and running >= self.max_animations and key not in self._running:
+            # Zero length animation replaces running one of this attribute, which would overwrite the value
+            if styles.node.app.animator.is_being_animated(styles, attribute):  # type: ignore
+                styles.animate(attribute, value=value, duration=0)
+            else:
+                setattr(styles, attribute, value)
+            return
+        if duration:
+            self._running[key] = time.monotonic() + duration
+        else:
+            self._running.pop(key, None)
+        styles.animate(attribute, value=value, duration=duration)
+
+
+def animate_style(styles: RenderStyles, attribute: str, value: Any, duration: float) -> None:
+    """Animate style through `animation_budget` of its app, apps without one animate every change"""
+    budget: Optional[AnimationBudget] = getattr(styles.node.app, "animation_budget", None)  # type: ignore
+    if budget is None:
+        styles.animate(attribute, value=value, duration=duration)
+    else:
+        budget.animate(styles, attribute, value, duration)
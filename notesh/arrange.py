@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import colorsys
+import math
+from typing import Sequence
+
+# Space left between arranged drawables
+GAP = (2, 1)
+# Terminal cells are about twice as high as wide,
+# so boards that should look square are twice as wide in cells
+CELL_ASPECT = 2.0
+
+
+def arrange_grid(
+    xs: Sequence[int], ys: Sequence[int], widths: Sequence[int], heights: Sequence[int], gap: tuple[int, int] = GAP
+) -> tuple[list[int], list[int]]:
+    """Equal cells in reading order of current positions"""
+    n = len(widths)
+    if n == 0:
+        return [], []
+    cell_w = max(widths) + gap[0]
+    cell_h = max(heights) + gap[1]
+    columns = max(1, math.ceil(math.sqrt(CELL_ASPECT * n * cell_h / cell_w)))
+
+    new_xs, new_ys = [0] * n, [0] * n
+    for place, i in enumerate(sorted(range(n), key=lambda i: (ys[i], xs[i]))):
+        row, column = divmod(place, columns)
+        new_xs[i] = column * cell_w
+        new_ys[i] = row * cell_h
+    return new_xs, new_ys
+
+
+def _shelf(
+    widths: Sequence[int], heights: Sequence[int], gap: tuple[int, int]
+) -> tuple[list[int], list[int], int, int]:
+    """Shelf packing of rectangles, returns positions and extent of packed area"""
+    n = len(widths)
+    if n == 0:
+        return [], [], 0, 0
+    area = sum((w + gap[0]) * (h + gap[1]) for w, h in zip(widths, heights))
+    max_width = max(widths) + gap[0]
+    shelf_width = max(max_width, math.ceil(math.sqrt(CELL_ASPECT * area)))
+
+    new_xs, new_ys = [0] * n, [0] * n
+    x = y = shelf_height = extent_x = 0
+    # Tallest first, so each shelf wastes as little height as possible
+    for i in sorted(range(n), key=lambda i: (-heights[i], -widths[i])):
+        w, h = widths[i] + gap[0], heights[i] + gap[1]
+        if x > 0 and x + w > shelf_width:
+            y += shelf_height
+            x = shelf_height = 0
+        new_xs[i], new_ys[i] = x, y
+        x += w
+        extent_x = max(extent_x, x)
+        shelf_height = max(shelf_height, h)
+    return new_xs, new_ys, extent_x, y + shelf_height
+
+
+def arrange_shelf(
+    xs: Sequence[int], ys: Sequence[int], widths: Sequence[int], heights: Sequence[int], gap: tuple[int, int] = GAP
+) -> tuple[list[int], list[int]]:
+    new_xs, new_ys, _, _ = _shelf(widths, heights, gap)
+    return new_xs, new_ys
+
+
+def _hue(color: str) -> tuple[float, float, float]:
+    color = color.lstrip("#")
+    try:
+        r, g, b = (int(color[i : i + 2], 16) / 255 for i in (0, 2, 4))
+    except ValueError:
+        return (0.0, 0.0, 0.0)
+    return colorsys.rgb_to_hls(r, g, b)
+
+
+def arrange_clusters(
+    xs: Sequence[int],
+    ys: Sequence[int],
+    widths: Sequence[int],
+    heights: Sequence[int],
+    colors: Sequence[str],
+    gap: tuple[int, int] = GAP,
+) -> tuple[list[int], list[int]]:
+    """Drawables of the same color packed together, clusters ordered by hue"""
+    clusters: dict[str, list[int]] = {}
+    for i, color in enumerate(colors):
+        clusters.setdefault(color.upper(), []).append(i)
+    keys = sorted(clusters, key=_hue)
+
+    packed: list[tuple[list[int], list[int]]] = []
+    block_widths: list[int] = []
+    block_heights: list[int] = []
+    for key in keys:
+        members = clusters[key]
+        cxs, cys, cw, ch = _shelf([widths[i] for i in members], [heights[i] for i in members], gap)
+        packed.append((cxs, cys))
+        block_widths.append(cw)
+        block_heights.append(ch)
+
+    # Clusters are then packed as blocks with the same shelf algorithm
+    bxs, bys, _, _ = _shelf(block_widths, block_heights, gap)
+
+    n = len(widths)
+    new_xs, new_ys = [0] * n, [0] * n
+    for key, (cxs, cys), bx, by in zip(keys, packed, bxs, bys):
+        for i, cx, cy in zip(clusters[key], cxs, cys):
+            new_xs[i] = bx + cx
+            new_ys[i] = by + cy
+    return new_xs, new_ys
+
+
+ARRANGE_MODES = ("grid", "shelf", "cluster")
+
+
+def arrange(
+    mode: str,
+    xs: Sequence[int],
+    ys: Sequence[int],
+    widths: Sequence[int],
+    heights: Sequence[int],
+    colors: Sequence[str],
+    gap: tuple[int, int] = GAP,
+) -> tuple[list[int], list[int]]:
+    """Target positions for all drawables given as columns of their geometry"""
+    if mode == "grid":
+        return arrange_grid(xs, ys, widths, heights, gap)
+    if mode == "shelf":
+        return arrange_shelf(xs, ys, widths, heights, gap)
+    if mode == "cluster":
+        return arrange_clusters(xs, ys, widths, heights, colors, gap)
+    raise ValueError(f"Unknown arrange mode {mode!r}, expected one of {ARRANGE_MODES}")
@@ -1,7 +1,14 @@
 #!/usr/bin/env python
 from __future__ import annotations
 
+import sys
+import tracemalloc
+
+from notesh.animation import PERFORMANCE_MODES
 from notesh.main import NoteApp
+from notesh.memory import BOARD_SIZES, TRACEBACK_DEPTH, memory_curve
+from notesh.snapshot import snapshot_boards
+from notesh.tools import BOARD_FORMATS, TOOL_ACTIONS, run_tools
 
 
 def run():
@@ -15,8 +22,81 @@ def run():
         help=f"Notes file to use. Defaults to $NOTESH_FILE or $XDG_DATA_HOME/notesh/notes.json (currently: {NoteApp.DEFAULT_FILE!r})",
         required=False,
     )
+    parser.add_argument(
+        "-p",
+        "--performance",
+        choices=PERFORMANCE_MODES,
+        default=None,
+        help="Limit animations running at once: always (on), never (off) or on big boards (auto, default)",
+        required=False,
+    )
+    parser.add_argument(
+        "-m",
+        "--trace-memory",
+        action="store_true",
+        help="Trace memory from start, for report shown with memory_report binding",
+    )
+    commands = parser.add_subparsers(dest="command")
+    snapshot = commands.add_parser("snapshot", help="Save SVG of whole board for each file, without opening NoteSH")
+    snapshot.add_argument("files", nargs="+", help="Notes files to render")
+    snapshot.add_argument("-o", "--output", default=".", help="Directory for SVG files. Defaults to current one")
+    snapshot.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Boards rendered at once, each in own process. Defaults to number of CPUs",
+    )
+    tools = commands.add_parser("tools", help="Check or change all boards in directory, without opening NoteSH")
+    tools.add_argument(
+        "action",
+        choices=TOOL_ACTIONS,
+        help="validate: check entries, convert: save in another format, bounds: show extent, merge: save all as one",
+    )
+    tools.add_argument("directory", help="Directory searched for boards, also in subdirectories, or one board file")
+    tools.add_argument("--to", choices=BOARD_FORMATS, default="json", help="Format for convert. Defaults to json")
+    tools.add_argument("-o", "--output", default=None, help="Board file merged boards are saved to")
+    tools.add_argument("--force", action="store_true", help="Let convert overwrite boards already in that format")
+    tools.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Boards processed at once, each in own process. Defaults to number of CPUs",
+    )
+    memory = commands.add_parser("memory", help="Show memory taken by synthetic boards of growing size")
+    memory.add_argument(
+        "-s",
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=BOARD_SIZES,
+        help=f"Numbers of drawables on measured boards. Defaults to {' '.join(map(str, BOARD_SIZES))}",
+    )
+    memory.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Boards measured at once, each in own process. Defaults to number of CPUs",
+    )
     argsx = parser.parse_args()
-    NoteApp(file=argsx.file).run()
+    if argsx.command == "memory":
+        print(memory_curve(argsx.sizes, argsx.jobs))
+        return
+    if argsx.command == "tools":
+        if argsx.action == "merge" and argsx.output is None:
+            tools.error("merge needs --output")
+        sys.exit(1 if run_tools(argsx.action, argsx.directory, argsx.jobs, argsx.to, argsx.output, argsx.force) else 0)
+    if argsx.command == "snapshot":
+        try:
+            failed = snapshot_boards(argsx.files, argsx.output, argsx.jobs)
+        except ValueError as error:
+            snapshot.error(str(error))
+        sys.exit(1 if failed else 0)
+    if argsx.trace_memory:
+        tracemalloc.start(TRACEBACK_DEPTH)
+    NoteApp(file=argsx.file, performance=argsx.performance).run()
 
 
 if __name__ == "__main__":
@@ -8,22 +8,11 @@ from textual.geometry import Offset, Size
 from textual.reactive import reactive
 from textual.widget import Widget
 
+from notesh.animation import animate_style
 from notesh.drawables.drawable import Body, Drawable, Resizer
+from notesh.schema import BORDERS
 from notesh.widgets.multiline_input import MultilineArray
 
-BORDERS = [
-    "outer",
-    "ascii",
-    "round",
-    "solid",
-    "double",
-    "dashed",
-    "heavy",
-    "hkey",
-    "vkey",
-    "none",
-]
-
 _T = TypeVar("_T")
 
 
@@ -48,14 +37,25 @@ class Box(Drawable):
         self.border_color = Color.parse(border_color)
         self.border_index = BORDERS.index(border_type)
         self.border_type = BORDERS[self.border_index]
-        self._body = body
 
         self.init_parts()
 
     def init_parts(self) -> None:
-        self.body = Body(self, body=self._body, id="default-body")
+        self.body = Body(self, body=self.record.body, id="default-body", field="body")
         self.resizer = Resizer(body=" ", id=f"{self.id}-resizer", parent=self)
 
+    @property
+    def border_color(self) -> Color:
+        return self._border_color
+
+    @border_color.setter
+    def border_color(self, color: Color) -> None:
+        self._border_color = color
+        self.record.border_color = color.hex6
+
+    def watch_border_type(self, border_type: str) -> None:
+        self.record.border_type = border_type
+
     def change_color(self, new_color: str | Color, duration: float = 1.0, part_type: str = "body") -> None:
         if isinstance(new_color, str):
             base_color = Color.parse(new_color)
@@ -75,15 +75,26 @@ class Box(Drawable):
             base_color = base_color.darken(0.1) if base_color.brightness > 0.9 else base_color.lighten(0.1)
             border_color = border_color.darken(0.1) if border_color.brightness > 0.9 else border_color.lighten(0.1)
 
-        self.body.styles.animate("background", value=base_color, duration=duration)
+        animate_style(self.body.styles, "background", base_color, duration)
 
         self.body.styles.border = (self.border_type, border_color.darken(0.1))
         self.body.styles.border_left = (self.border_type, border_color.lighten(0.1))
         self.body.styles.border_top = (self.border_type, border_color.lighten(0.1))
-        self.resizer.styles.animate("background", value=border_color.darken(0.1), duration=duration)
+        animate_style(self.resizer.styles, "background", border_color.darken(0.1), duration)
+
+    def get_color(self, part_type: str = "body") -> Color:
+        if part_type == "" or part_type == "body":
+            return self.color
+        return self.border_color
 
     def next_border(self):
-        self.border_index = (self.border_index + 1) % len(BORDERS)
+        self.change_border(BORDERS[(self.border_index + 1) % len(BORDERS)])
+
+    def get_border_type(self) -> Optional[str]:
+        return self.border_type
+
+    def change_border(self, border_type: str) -> None:
+        self.border_index = BORDERS.index(border_type)
         self.border_type = BORDERS[self.border_index]
         self.update_layout(duration=1.0)
 
@@ -102,17 +113,6 @@ class Box(Drawable):
         widgets["body_color_picker"].update_colors(self.color)
         widgets["border_color_picker"].update_colors(self.border_color)
 
-    def dump(self) -> dict[str, Any]:
-        return {
-            "body": self.body.body,
-            "pos": (self.styles.offset.x.value, self.styles.offset.y.value),
-            "color": self.color.hex6,
-            "border_color": self.border_color.hex6,
-            "border_type": self.border_type,
-            "size": (self.styles.width.value, self.styles.height.value),
-            "type": self.type,
-        }
-
     @classmethod
     def load(cls: Type[_T], obj: dict[Any, Any], drawable_id: str, offset: Offset = Offset(0, 0)):
         return cls(
@@ -124,3 +124,9 @@ class Box(Drawable):
             border_color=obj["border_color"],
             border_type=obj["border_type"],
         )
+
+    def restore(self, obj: dict[Any, Any], offset: Offset = Offset(0, 0)) -> None:
+        self.border_color = Color.parse(obj["border_color"])
+        self.border_index = BORDERS.index(obj["border_type"])
+        self.border_type = BORDERS[self.border_index]
+        super().restore(obj, offset)
@@ -1,28 +1,49 @@
 from __future__ import annotations
 
-from typing import Any, Optional, OrderedDict, Type, TypeVar, cast
+from collections import OrderedDict as OrderedDictType
+from typing import TYPE_CHECKING, Any, Hashable, Optional, OrderedDict, Type, TypeVar, cast
 
+from rich.console import RenderableType
 from rich.markdown import Markdown
 from textual import events
 from textual.app import ComposeResult
 from textual.color import Color
 from textual.containers import Vertical
+from textual.css.scalar import ScalarOffset
 from textual.geometry import Offset, Size
 from textual.message import Message
 from textual.reactive import reactive
+from textual.strip import Strip
 from textual.widget import Widget
 from textual.widgets import Input, Static
 
-from notesh.utils import generate_short_uuid
+from notesh.animation import animate_style
+from notesh.model import DrawableRecord
+from notesh.utils import generate_drawable_id
 from notesh.widgets.multiline_input import MultilineArray
 
+if TYPE_CHECKING:
+    from notesh.play_area import PlayArea
+
 _T = TypeVar("_T")
 
+# Renders kept by each drawable part, enough for its looks when entered or not and on two zoom levels
+RENDER_CACHE_SIZE = 4
+
 
 class Drawable(Static):
     can_focus: bool = True
     type: str = "drawable"
     is_entered: reactive[bool] = reactive(False)
+    # Board cells per screen cell and level of detail, set by PlayArea zoom
+    view_scale: int = 1
+    view_detail: str = "full"
+    # Hidden by tag filter of PlayArea
+    filtered_out: bool = False
+    # Hidden while far from screen, see `PlayArea.cull`
+    culled: bool = False
+    # Re-layouts of all drawables skipped as hover changes within one frame cancelled out
+    hover_layouts_avoided: int = 0
 
     def __init__(
         self,
@@ -35,22 +56,91 @@ class Drawable(Static):
         init_parts: bool = True,
     ) -> None:
         if id is None or id == "":
-            id = f"note-{generate_short_uuid()}"
+            id = generate_drawable_id()
         super().__init__(id=id)
         self.note_id: str = id
+        self.record = DrawableRecord(id, self.type, body=body)
         self.clicked = (0, 0)
-        self.styles.layer = f"{id}"
+        # Hover state asked for since last frame, and the one asked for last
+        self._hover: Optional[bool] = None
+        self._hover_asked = False
         self.color = Color.parse(color)
-        self.styles.offset = pos
-        self.styles.width = size.width
-        self.styles.height = size.height
+        self.offset = pos
+        self.set_size(size)
         self.pparent = parent
 
         if init_parts:
             self.init_parts()
 
+    @property
+    def color(self) -> Color:
+        return self._color
+
+    @color.setter
+    def color(self, color: Color) -> None:
+        self._color = color
+        self.record.color = color.hex6
+        if self.view_detail == "block":
+            self.styles.background = color
+
+    @property
+    def offset(self) -> Offset:
+        """Position read from record, without resolving styles"""
+        return self.record.pos
+
+    @offset.setter
+    def offset(self, offset: Offset) -> None:
+        self.record.pos = offset
+        self.styles.offset = self._view_position()
+
+    def place(self, position: Offset, animate: bool = False) -> None:
+        self.record.pos = position
+        view_position = self._view_position()
+        if animate:
+            animate_style(self.styles, "offset", ScalarOffset.from_offset(view_position), 0.5)
+        else:
+            self.styles.offset = view_position
+
+    def _view_position(self) -> Offset:
+        return Offset(self.record.x // self.view_scale, self.record.y // self.view_scale)
+
+    def set_size(self, size: tuple[int, int]) -> None:
+        self.record.size = Size(*size)
+        scale = self.view_scale
+        self.styles.width = max(1, -(-self.record.width // scale))
+        self.styles.height = max(1, -(-self.record.height // scale))
+
+    def set_view(self, scale: int, detail: str) -> None:
+        """Show drawable zoomed out `scale` times, with parts given by `detail`
+
+        `title` keeps only the title, `block` draws a coloured block
+        and `canvas` hides the widget as board is painted by PlayArea.
+        """
+        self.view_scale = scale
+        self.view_detail = detail
+        self.set_class(detail == "title", "-lod-title")
+        self.set_class(detail == "block", "-lod-block")
+        self._update_display()
+        if detail == "block":
+            self.styles.background = self.color
+        else:
+            self.styles.clear_rule("background")
+        self.place(self.record.pos)
+        self.set_size(self.record.size)
+
+    def set_filtered(self, filtered_out: bool) -> None:
+        self.filtered_out = filtered_out
+        self._update_display()
+
+    def set_culled(self, culled: bool) -> None:
+        self.culled = culled
+        self._update_display()
+
+    def _update_display(self) -> None:
+        self.display = self.view_detail != "canvas" and not self.filtered_out and not self.culled
+
     def init_parts(self) -> None:
-        self.body = Body(self, body="", id="default-body")
+        self.body = Body(self, body=self.record.body, id="default-body", field="body")
         self.resizer = Resizer(body=" ", id=f"{self.id}-resizer", parent=self)
 
     def drawable_body(self) -> ComposeResult:
@@ -63,7 +153,6 @@ class Drawable(Static):
         yield from self.drawable_body()
 
         self.change_color(self.color, duration=0.0)
-        self.bring_forward()
 
     def change_color(self, new_color: str | Color, duration: float = 1.0, part_type: str = "body") -> None:
         if isinstance(new_color, str):
@@ -80,12 +169,12 @@ class Drawable(Static):
         if self.is_entered:
             base_color = base_color.darken(0.1) if base_color.brightness > 0.9 else base_color.lighten(0.1)
 
-        self.body.styles.animate("background", value=base_color, duration=duration)
+        animate_style(self.body.styles, "background", base_color, duration)
 
         self.body.styles.border = ("outer", base_color.darken(0.1))
         self.body.styles.border_left = ("outer", base_color.lighten(0.1))
         self.body.styles.border_top = ("outer", base_color.lighten(0.1))
-        self.resizer.styles.animate("background", value=base_color.darken(0.1), duration=duration)
+        animate_style(self.resizer.styles, "background", base_color.darken(0.1), duration)
 
     async def drawable_is_moved_from_key(self, offset: Offset):
         note = self
@@ -101,8 +190,10 @@ class Drawable(Static):
         if self.clicked is not None and event.button != 0:
             note = self
             if event.delta:
-                note.offset = note.offset + event.delta
-                self.post_message(Drawable.Move(drawable=self, offset=event.delta))
+                # Mouse moves on zoomed out board are in screen cells
+                delta = event.delta * self.view_scale
+                note.offset = note.offset + delta
+                self.post_message(Drawable.Move(drawable=self, offset=delta))
 
     async def drawable_is_focused(self, event: events.MouseEvent, display_sidebar: bool = False):
         self.clicked = event.offset
@@ -114,13 +205,13 @@ class Drawable(Static):
 
     async def resize_drawable(self, delta_x: int, delta_y: int):
         note = self
-        note.styles.width = note.styles.width.value + delta_x
-        note.styles.height = note.styles.height.value + delta_y
+        note.set_size((note.record.width + delta_x, note.record.height + delta_y))
         note.refresh()
+        self.post_message(Drawable.Resize(drawable=self, delta=Offset(delta_x, delta_y)))
 
     async def drawable_is_resized(self, event: events.MouseMove) -> None:
         if self.clicked is not None and event.button != 0:
-            await self.resize_drawable(event.delta_x, event.delta_y)
+            await self.resize_drawable(event.delta_x * self.view_scale, event.delta_y * self.view_scale)
 
     async def on_mouse_move(self, event: events.MouseMove) -> None:
         ...
@@ -137,7 +228,7 @@ class Drawable(Static):
         await self.drawable_is_unfocused(event)
 
     async def on_click(self, event: events.Click):
-        self.post_message(Drawable.Clicked(drawable=self))
+        self.post_message(Drawable.Clicked(drawable=self, extend_selection=event.shift or event.meta))
         event.stop()
 
     async def on_focus(self, event: events.Focus):
@@ -148,10 +239,29 @@ class Drawable(Static):
         await self.on_leave(cast(events.Leave, event))
 
     async def on_enter(self, event: events.Enter):
-        self.is_entered = True
+        self.set_hover(True)
 
     async def on_leave(self, event: events.Leave):
-        self.is_entered = False
+        self.set_hover(False)
+
+    def set_hover(self, entered: bool) -> None:
+        """Ask for hover state, applied once per frame
+
+        Moving mouse between parts of drawable leaves one and enters another,
+        which then does not change `is_entered` at all.
+        """
+        if entered != self._hover_asked:
+            self._hover_asked = entered
+            Drawable.hover_layouts_avoided += 1
+        if self._hover is None:
+            self.call_after_refresh(self._apply_hover)
+        self._hover = entered
+
+    def _apply_hover(self) -> None:
+        entered, self._hover = self._hover, None
+        if entered is not None and entered != self.is_entered:
+            Drawable.hover_layouts_avoided -= 1
+            self.is_entered = entered
 
     async def watch_is_entered(self, new_value: bool) -> None:
         if new_value:
@@ -162,13 +272,21 @@ class Drawable(Static):
     def next_border(self):
         ...
 
+    def get_border_type(self) -> Optional[str]:
+        """Border type of drawables that have changeable border, None otherwise"""
+        return None
+
+    def change_border(self, border_type: str) -> None:
+        ...
+
+    def get_color(self, part_type: str = "body") -> Color:
+        return self.color
+
     def bring_forward(self):
-        layers = tuple(x for x in self.screen.styles.layers if x not in [self.layer, f"{self.layer}-resizer"])
-        self.screen.styles.layers = layers + (self.styles.layer, f"{self.styles.layer}-resizer")
+        cast("PlayArea", self.parent).bring_drawables([self], "forward")
 
     def bring_backward(self):
-        layers = tuple(x for x in self.screen.styles.layers if x not in [self.layer, f"{self.layer}-resizer"])
-        self.screen.styles.layers = (f"{self.styles.layer}", f"{self.styles.layer}-resizer") + layers
+        cast("PlayArea", self.parent).bring_drawables([self], "backward")
 
     def input_changed(self, event: Input.Changed):
         ...
@@ -183,13 +301,7 @@ class Drawable(Static):
         widgets["body_color_picker"].update_colors(self.color)
 
     def dump(self) -> dict[str, Any]:
-        return {
-            "body": self.body.body,
-            "pos": (self.styles.offset.x.value, self.styles.offset.y.value),
-            "color": self.color.hex6,
-            "size": (self.styles.width.value, self.styles.height.value),
-            "type": self.type,
-        }
+        return self.record.dump()
 
     @classmethod
     def load(cls: Type[_T], obj: dict[Any, Any], drawable_id: str, offset: Offset = Offset(0, 0)):
@@ -201,6 +313,14 @@ class Drawable(Static):
             size=Size(*obj["size"]),
         )
 
+    def restore(self, obj: dict[Any, Any], offset: Offset = Offset(0, 0)) -> None:
+        """Update mounted drawable in place to state from `dump`"""
+        self.offset = Offset(*obj["pos"]) - offset
+        self.set_size(obj["size"])
+        self.record.tags = tuple(obj.get("tags", ()))
+        self.body.body = obj["body"]
+        self.change_color(obj["color"], duration=0.0)
+
     class Mess(Message):
         def __init__(self, value: str | None) -> None:
             super().__init__()
@@ -228,14 +348,55 @@ class Drawable(Static):
         def __init__(
             self,
             drawable: Drawable,
+            extend_selection: bool = False,
         ) -> None:
             super().__init__()
             self.drawable = drawable
+            self.extend_selection = extend_selection
 
+    class Resize(Message):
+        def __init__(
+            self,
+            drawable: Drawable,
+            delta: Offset,
+        ) -> None:
+            super().__init__()
+            self.drawable = drawable
+            self.delta = delta
 
-class DrawablePart(Static):
-    body: reactive[str] = reactive("")
+    class Recolor(Message):
+        def __init__(self, drawable: Drawable, part_type: str, old: Color, new: Color) -> None:
+            super().__init__()
+            self.drawable = drawable
+            self.part_type = part_type
+            self.old = old
+            self.new = new
+
+    class Reborder(Message):
+        def __init__(self, drawable: Drawable, old: str, new: str) -> None:
+            super().__init__()
+            self.drawable = drawable
+            self.old = old
+            self.new = new
 
+    class Retag(Message):
+        def __init__(self, drawable: Drawable, old: tuple[str, ...], new: tuple[str, ...]) -> None:
+            super().__init__()
+            self.drawable = drawable
+            self.old = old
+            self.new = new
+
+    class Edit(Message):
+        def __init__(self, drawable: Drawable, part: str, old: str, new: str) -> None:
+            super().__init__()
+            self.drawable = drawable
+            # name of the DrawablePart attribute, like `title` or `body`
+            self.part = part
+            self.old = old
+            self.new = new
+
+
+class DrawablePart(Static):
     def __init__(
         self,
         parent: Drawable,
@@ -243,14 +404,61 @@ class DrawablePart(Static):
         id: str | None = None,
         classes: str | None = None,
         body: str = "",
+        field: str | None = None,
     ) -> None:
-        super().__init__(body, name=name, id=id, classes=classes)
+        super().__init__(name=name, id=id, classes=classes)
         self.clicked = Offset(0, 0)
         self.pparent: Drawable = parent
-        self.body = str(body)
-
-    def watch_body(self, body_text: str):
-        self.update(Markdown(body_text))
+        # Record attribute that holds text of this part, parts without one keep it themselves
+        self.field = field
+        self._body = ""
+        self._renders: OrderedDictType[Hashable, list[Strip]] = OrderedDictType()
+        self._set_body(str(body))
+
+    @property
+    def body(self) -> str:
+        if self.field is not None:
+            return getattr(self.pparent.record, self.field)
+        return self._body
+
+    @body.setter
+    def body(self, body_text: str) -> None:
+        if body_text != self.body:
+            self._set_body(body_text)
+
+    def _set_body(self, body_text: str) -> None:
+        if self.field is not None:
+            setattr(self.pparent.record, self.field, body_text)
+        else:
+            self._body = body_text
+        self.update(self.render_body(body_text))
+
+    def render_body(self, body_text: str) -> RenderableType:
+        return Markdown(body_text)
+
+    def _content_key(self) -> Hashable:
+        """Everything besides size and style that decides how part looks"""
+        return self.body
+
+    def render_line(self, y: int) -> Strip:
+        """Line of content, taken from an earlier render that looked the same if there is one
+
+        Every refresh drops rendered content, also when the part comes back to earlier
+        state, like leaving it with mouse or zooming in again, while rendering markdown is slow.
+        """
+        key = (self._content_key(), self.size, self.rich_style, self.pparent.is_entered)
+        strips = self._renders.get(key)
+        if strips is None:
+            render_line = super().render_line
+            strips = [render_line(line) for line in range(self.size.height)]
+            self._renders[key] = strips
+            if len(self._renders) > RENDER_CACHE_SIZE:
+                self._renders.popitem(last=False)
+        else:
+            self._renders.move_to_end(key)
+        if y >= len(strips):
+            return Strip.blank(self.size.width, self.rich_style)
+        return strips[y]
 
     async def on_mouse_down(self, event: events.MouseDown):
         self.capture_mouse()
@@ -260,8 +468,7 @@ class DrawablePart(Static):
         self.capture_mouse(False)
         await self.pparent.drawable_is_unfocused(event)
 
-    async def on_mouse_move(self, event: events.MouseMove) -> None:
-        ...
+    async def on_mouse_move(self, event: events.MouseMove) -> None: ...
 
     async def on_enter(self, event: events.Enter):
         await self.pparent.on_enter(event)
@@ -284,9 +491,11 @@ class Resizer(DrawablePart):
         id: str | None = None,
         classes: str | None = None,
         body: str = "",
+        field: str | None = None,
     ) -> None:
-        super().__init__(parent, name=name, id=id, classes=classes, body=body)
-        self.styles.layer = f"{id}"
+        super().__init__(parent, name=name, id=id, classes=classes, body=body, field=field)
+        # Drawable has its own small set of layers, see `Drawable` in main.css
+        self.styles.layer = "drawable-resizer"
 
     async def on_mouse_move(self, event: events.MouseMove) -> None:
         await self.pparent.drawable_is_resized(event)
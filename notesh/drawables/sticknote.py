@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Optional, OrderedDict, Type, TypeVar
+from typing import Any, Hashable, Optional, OrderedDict, Type, TypeVar
 
+from rich.console import RenderableType
 from textual import events
 from textual.app import ComposeResult
 from textual.color import Color
@@ -10,8 +11,10 @@ from textual.geometry import Offset, Size
 from textual.widget import Widget
 from textual.widgets import Input
 
+from notesh.animation import animate_style
 from notesh.drawables.drawable import Drawable, DrawablePart, Resizer
-from notesh.utils import generate_short_uuid
+from notesh.markdown_window import BlockCache, MarkdownWindow, split_blocks
+from notesh.utils import generate_drawable_id
 from notesh.widgets.multiline_input import MultilineArray
 
 
@@ -41,14 +44,14 @@ class Note(Drawable):
         id: str | None = None,
     ) -> None:
         if id is None or id == "":
-            id = f"note-{generate_short_uuid()}"
-        self._title = title
-        self._body = body
-        super().__init__(id=id, color=color, pos=pos, parent=parent, size=size)
+            id = generate_drawable_id()
+        super().__init__(id=id, body=body, color=color, pos=pos, parent=parent, size=size, init_parts=False)
+        self.record.title = title
+        self.init_parts()
 
     def init_parts(self) -> None:
-        self.title = NoteTop(id=f"note-top", parent=self, body=self._title)
-        self.body = NoteBody(id=f"note-body", parent=self, body=self._body)
+        self.title = NoteTop(id=f"note-top", parent=self, body=self.record.title, field="title")
+        self.body = NoteBody(id=f"note-body", parent=self, body=self.record.body, field="body")
         self.spacer = Spacer(body="▌", id=f"note-spacer", parent=self)
         self.resizer_left = ResizerLeft(body="▌", id=f"note-resizer-left", parent=self)
         self.resizer = Resizer(body="◢█", id=f"note-resizer", parent=self)
@@ -87,12 +90,12 @@ class Note(Drawable):
         self.spacer.styles.background = much_darker
         self.spacer.styles.color = lighter
 
-        self.title.styles.animate("background", value=default, duration=duration)
+        animate_style(self.title.styles, "background", default, duration)
         self.title.styles.border_top = ("outer", lighter)
         self.title.styles.border_left = ("outer", lighter)
         self.title.styles.border_right = ("outer", much_darker)
 
-        self.body.styles.animate("background", value=darker, duration=duration)
+        animate_style(self.body.styles, "background", darker, duration)
         self.body.styles.border_right = ("outer", much_darker)
         self.body.styles.border_bottom = ("none", much_darker)
         self.body.styles.border_left = ("outer", lighter)
@@ -120,16 +123,6 @@ class Note(Drawable):
         text = [str(x.value) for x in event.input.lines]
         self.body.body = "  \n".join(text)
 
-    def dump(self) -> dict[str, Any]:
-        return {
-            "title": self.title.body,
-            "body": self.body.body,
-            "pos": (self.styles.offset.x.value, self.styles.offset.y.value),
-            "color": self.color.hex6,
-            "size": (self.styles.width.value, self.styles.height.value),
-            "type": self.type,
-        }
-
     @classmethod
     def load(cls: Type[_T], obj: dict[Any, Any], drawable_id: str, offset: Offset = Offset(0, 0)):
         return cls(
@@ -141,8 +134,46 @@ class Note(Drawable):
             size=Size(*obj["size"]),
         )
 
+    def restore(self, obj: dict[Any, Any], offset: Offset = Offset(0, 0)) -> None:
+        self.title.body = obj["title"]
+        super().restore(obj, offset)
+
 
 class NoteBody(DrawablePart):
+    """Body of note that scrolls, rendering only markdown blocks it shows"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.top = 0
+        self._blocks = BlockCache()
+        self._window = MarkdownWindow([], self._blocks)
+        super().__init__(*args, **kwargs)
+
+    def render_body(self, body_text: str) -> RenderableType:
+        blocks = split_blocks(body_text)
+        self._blocks.keep(blocks)
+        self._window = MarkdownWindow(blocks, self._blocks, self.top)
+        return self._window
+
+    def _content_key(self) -> Hashable:
+        return (self.body, self.top)
+
+    def scroll_body(self, lines: int) -> None:
+        # Window knows where text ends only after rendering all of it
+        top = max(0, self._window.top + lines)
+        if self._window.line_count is not None:
+            top = min(top, max(0, self._window.line_count - self.content_size.height))
+        if top != self._window.top:
+            self.top = top
+            self.update(self.render_body(self.body))
+
+    async def on_mouse_scroll_down(self, event: events.MouseScrollDown) -> None:
+        event.stop()
+        self.scroll_body(1)
+
+    async def on_mouse_scroll_up(self, event: events.MouseScrollUp) -> None:
+        event.stop()
+        self.scroll_body(-1)
+
     async def on_mouse_move(self, event: events.MouseMove) -> None:
         await self.pparent.drawable_is_moved(event)
 
@@ -0,0 +1,590 @@
+from __future__ import annotations
+
+import sys
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Optional
+
+from textual.color import Color
+from textual.geometry import Offset
+
+if TYPE_CHECKING:
+    from notesh.drawables.drawable import Drawable
+    from notesh.play_area import PlayArea
+
+# Consecutive operations on the same target closer than this (in seconds)
+# are merged into one undo step
+MERGE_WINDOW = 1.0
+DEFAULT_MEMORY_BUDGET = 2 * 1024 * 1024
+# Rough size of operation object itself without its payload
+OPERATION_OVERHEAD = 64
+
+
+def _payload_size(obj: Any) -> int:
+    if isinstance(obj, str):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sum(_payload_size(k) + _payload_size(v) for k, v in obj.items())  # type: ignore
+    if isinstance(obj, (list, tuple)):
+        return sum(_payload_size(x) for x in obj)  # type: ignore
+    return 8
+
+
+def text_diff(old: str, new: str) -> tuple[int, str, str]:
+    """Smallest single replacement that turns `old` into `new` as (start, removed, inserted)"""
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+    return start, old[start:end_old], new[start:end_new]
+
+
+class Operation:
+    __slots__ = ("drawable_id", "timestamp")
+
+    def __init__(self, drawable_id: str) -> None:
+        self.drawable_id = drawable_id
+        self.timestamp = time.monotonic()
+
+    def cost(self) -> int:
+        return OPERATION_OVERHEAD
+
+    def merge(self, other: Operation) -> bool:
+        """Absorb `other` that happened right after this one, returns False if not possible"""
+        return False
+
+    def affects(self, drawable_id: str) -> bool:
+        return self.drawable_id == drawable_id
+
+    def drawable_ids_changed(self) -> tuple[str, ...]:
+        return (self.drawable_id,)
+
+    def _can_merge(self, other: Operation) -> bool:
+        return (
+            type(other) is type(self)
+            and other.drawable_id == self.drawable_id
+            and other.timestamp - self.timestamp <= MERGE_WINDOW
+        )
+
+    async def undo(self, play_area: PlayArea) -> None:
+        ...
+
+    async def redo(self, play_area: PlayArea) -> None:
+        ...
+
+
+class MoveOperation(Operation):
+    __slots__ = ("delta",)
+
+    def __init__(self, drawable_id: str, delta: Offset) -> None:
+        super().__init__(drawable_id)
+        self.delta = delta
+
+    def merge(self, other: Operation) -> bool:
+        if not self._can_merge(other):
+            return False
+        assert isinstance(other, MoveOperation)
+        self.delta = self.delta + other.delta
+        self.timestamp = other.timestamp
+        return True
+
+    async def _apply(self, play_area: PlayArea, delta: Offset) -> None:
+        drawable = play_area.get_drawable(self.drawable_id)
+        if drawable is not None:
+            await play_area.move_drawables([drawable], delta, record=False)
+
+    async def undo(self, play_area: PlayArea) -> None:
+        await self._apply(play_area, -self.delta)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        await self._apply(play_area, self.delta)
+
+
+class ResizeOperation(Operation):
+    __slots__ = ("delta",)
+
+    def __init__(self, drawable_id: str, delta: Offset) -> None:
+        super().__init__(drawable_id)
+        self.delta = delta
+
+    def merge(self, other: Operation) -> bool:
+        if not self._can_merge(other):
+            return False
+        assert isinstance(other, ResizeOperation)
+        self.delta = self.delta + other.delta
+        self.timestamp = other.timestamp
+        return True
+
+    def _apply(self, play_area: PlayArea, delta: Offset) -> None:
+        drawable = play_area.get_drawable(self.drawable_id)
+        if drawable is None:
+            return
+        drawable.set_size((drawable.record.width + delta.x, drawable.record.height + delta.y))
+        drawable.refresh()
+        play_area.reindex_drawables([drawable])
+
+    async def undo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, -self.delta)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.delta)
+
+
+class ColorOperation(Operation):
+    __slots__ = ("part_type", "old", "new")
+
+    def __init__(self, drawable_id: str, part_type: str, old: Color, new: Color) -> None:
+        super().__init__(drawable_id)
+        self.part_type = part_type
+        self.old = old
+        self.new = new
+
+    def merge(self, other: Operation) -> bool:
+        if not self._can_merge(other):
+            return False
+        assert isinstance(other, ColorOperation)
+        if other.part_type != self.part_type:
+            return False
+        self.new = other.new
+        self.timestamp = other.timestamp
+        return True
+
+    def _apply(self, play_area: PlayArea, color: Color) -> None:
+        drawable = play_area.get_drawable(self.drawable_id)
+        if drawable is not None:
+            drawable.change_color(color, part_type=self.part_type)
+
+    async def undo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.old)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.new)
+
+
+class TextOperation(Operation):
+    __slots__ = ("part", "start", "removed", "inserted")
+
+    def __init__(self, drawable_id: str, part: str, start: int, removed: str, inserted: str) -> None:
+        super().__init__(drawable_id)
+        self.part = part
+        self.start = start
+        self.removed = removed
+        self.inserted = inserted
+
+    def cost(self) -> int:
+        return OPERATION_OVERHEAD + sys.getsizeof(self.removed) + sys.getsizeof(self.inserted)
+
+    def merge(self, other: Operation) -> bool:
+        if not self._can_merge(other):
+            return False
+        assert isinstance(other, TextOperation)
+        if other.part != self.part:
+            return False
+
+        # Span of our inserted text and of the text removed by `other`,
+        # both in coordinates of the text between the two operations
+        a, b = self.start, self.start + len(self.inserted)
+        c, d = other.start, other.start + len(other.removed)
+        if c > b or d < a:
+            return False
+
+        s = min(a, c)
+        pre = other.removed[: max(0, a - c)]
+        post = other.removed[len(other.removed) - max(0, d - b) :]
+        middle = pre + self.inserted + post
+
+        self.start = s
+        self.removed = pre + self.removed + post
+        self.inserted = middle[: c - s] + other.inserted + middle[d - s :]
+        self.timestamp = other.timestamp
+        return True
+
+    def _apply(self, play_area: PlayArea, removed: str, inserted: str) -> None:
+        drawable = play_area.get_drawable(self.drawable_id)
+        if drawable is None:
+            return
+        part = getattr(drawable, self.part)
+        text = str(part.body)
+        part.body = text[: self.start] + inserted + text[self.start + len(removed) :]
+
+    async def undo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.inserted, self.removed)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.removed, self.inserted)
+
+
+class BorderOperation(Operation):
+    __slots__ = ("old", "new")
+
+    def __init__(self, drawable_id: str, old: str, new: str) -> None:
+        super().__init__(drawable_id)
+        self.old = old
+        self.new = new
+
+    def merge(self, other: Operation) -> bool:
+        if not self._can_merge(other):
+            return False
+        assert isinstance(other, BorderOperation)
+        self.new = other.new
+        self.timestamp = other.timestamp
+        return True
+
+    def _apply(self, play_area: PlayArea, border_type: str) -> None:
+        drawable = play_area.get_drawable(self.drawable_id)
+        if drawable is not None:
+            drawable.change_border(border_type)
+
+    async def undo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.old)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.new)
+
+
+class TagsOperation(Operation):
+    __slots__ = ("old", "new")
+
+    def __init__(self, drawable_id: str, old: tuple[str, ...], new: tuple[str, ...]) -> None:
+        super().__init__(drawable_id)
+        self.old = old
+        self.new = new
+
+    def cost(self) -> int:
+        return OPERATION_OVERHEAD + _payload_size(self.old) + _payload_size(self.new)
+
+    def merge(self, other: Operation) -> bool:
+        if not self._can_merge(other):
+            return False
+        assert isinstance(other, TagsOperation)
+        self.new = other.new
+        self.timestamp = other.timestamp
+        return True
+
+    def _apply(self, play_area: PlayArea, tags: tuple[str, ...]) -> None:
+        drawable = play_area.get_drawable(self.drawable_id)
+        if drawable is not None:
+            play_area.set_drawable_tags(drawable, tags)
+
+    async def undo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.old)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        self._apply(play_area, self.new)
+
+
+class LifecycleOperation(Operation):
+    """Creation (or deletion if `created` is False) of drawable with its serialised state"""
+
+    __slots__ = ("obj", "created", "_cost")
+
+    def __init__(self, drawable_id: str, obj: dict[str, Any], created: bool) -> None:
+        super().__init__(drawable_id)
+        self.obj = obj
+        self.created = created
+        self._cost = OPERATION_OVERHEAD + _payload_size(obj)
+
+    def cost(self) -> int:
+        return self._cost
+
+    def _add(self, play_area: PlayArea) -> None:
+        if play_area.get_drawable(self.drawable_id) is None:
+            # Position is kept in file coordinates, see `History.origin`
+            play_area.add_parsed_drawable(self.obj, self.drawable_id, -play_area.file_origin)
+
+    async def _remove(self, play_area: PlayArea) -> None:
+        drawable = play_area.get_drawable(self.drawable_id)
+        if drawable is not None:
+            await play_area._remove_drawable(drawable)
+
+    async def undo(self, play_area: PlayArea) -> None:
+        if self.created:
+            await self._remove(play_area)
+        else:
+            self._add(play_area)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        if self.created:
+            self._add(play_area)
+        else:
+            await self._remove(play_area)
+
+
+class GroupMoveOperation(Operation):
+    """Move of several drawables by the same delta, replayed in one layout pass"""
+
+    __slots__ = ("drawable_ids", "delta")
+
+    def __init__(self, drawable_ids: tuple[str, ...], delta: Offset) -> None:
+        super().__init__("")
+        self.drawable_ids = drawable_ids
+        self.delta = delta
+
+    def cost(self) -> int:
+        return OPERATION_OVERHEAD + 8 * len(self.drawable_ids)
+
+    def affects(self, drawable_id: str) -> bool:
+        return drawable_id in self.drawable_ids
+
+    def drawable_ids_changed(self) -> tuple[str, ...]:
+        return self.drawable_ids
+
+    def merge(self, other: Operation) -> bool:
+        if not self._can_merge(other):
+            return False
+        assert isinstance(other, GroupMoveOperation)
+        if other.drawable_ids != self.drawable_ids:
+            return False
+        self.delta = self.delta + other.delta
+        self.timestamp = other.timestamp
+        return True
+
+    async def _apply(self, play_area: PlayArea, delta: Offset) -> None:
+        drawables = [play_area.get_drawable(x) for x in self.drawable_ids]
+        await play_area.move_drawables([x for x in drawables if x is not None], delta, record=False)
+
+    async def undo(self, play_area: PlayArea) -> None:
+        await self._apply(play_area, -self.delta)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        await self._apply(play_area, self.delta)
+
+
+class PlaceOperation(Operation):
+    """Drawables placed at new absolute positions, like after auto arrange
+
+    Positions are in file coordinates, see `History.origin`.
+    """
+
+    __slots__ = ("drawable_ids", "before", "after")
+
+    def __init__(self, drawable_ids: tuple[str, ...], before: list[Offset], after: list[Offset]) -> None:
+        super().__init__("")
+        self.drawable_ids = drawable_ids
+        self.before = before
+        self.after = after
+
+    def cost(self) -> int:
+        return OPERATION_OVERHEAD + 24 * len(self.drawable_ids)
+
+    def affects(self, drawable_id: str) -> bool:
+        return drawable_id in self.drawable_ids
+
+    def drawable_ids_changed(self) -> tuple[str, ...]:
+        return self.drawable_ids
+
+    async def _apply(self, play_area: PlayArea, positions: list[Offset]) -> None:
+        drawables: list[Drawable] = []
+        placed: list[Offset] = []
+        for drawable_id, position in zip(self.drawable_ids, positions):
+            drawable = play_area.get_drawable(drawable_id)
+            if drawable is not None:
+                drawables.append(drawable)
+                placed.append(position + play_area.file_origin)
+        await play_area.place_drawables(drawables, placed, record=False)
+
+    async def undo(self, play_area: PlayArea) -> None:
+        await self._apply(play_area, self.before)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        await self._apply(play_area, self.after)
+
+
+class BatchOperation(Operation):
+    """Several operations done at once by group action, undone as a single step"""
+
+    __slots__ = ("operations",)
+
+    def __init__(self, operations: list[Operation]) -> None:
+        super().__init__("")
+        self.operations = operations
+
+    def cost(self) -> int:
+        return OPERATION_OVERHEAD + sum(x.cost() for x in self.operations)
+
+    def affects(self, drawable_id: str) -> bool:
+        return any(x.affects(drawable_id) for x in self.operations)
+
+    def drawable_ids_changed(self) -> tuple[str, ...]:
+        return tuple(drawable_id for x in self.operations for drawable_id in x.drawable_ids_changed())
+
+    def merge(self, other: Operation) -> bool:
+        if not isinstance(other, BatchOperation) or other.timestamp - self.timestamp > MERGE_WINDOW:
+            return False
+        if len(other.operations) != len(self.operations):
+            return False
+        # Only group recolors are merged, like dragging group color picker
+        pairs = list(zip(self.operations, other.operations))
+        for a, b in pairs:
+            if not (isinstance(a, ColorOperation) and isinstance(b, ColorOperation)):
+                return False
+            if not a._can_merge(b) or a.part_type != b.part_type:
+                return False
+        for a, b in pairs:
+            a.merge(b)
+        self.timestamp = other.timestamp
+        return True
+
+    async def undo(self, play_area: PlayArea) -> None:
+        with play_area.app.batch_update():
+            for operation in reversed(self.operations):
+                await operation.undo(play_area)
+
+    async def redo(self, play_area: PlayArea) -> None:
+        with play_area.app.batch_update():
+            for operation in self.operations:
+                await operation.redo(play_area)
+
+
+class History:
+    """Undo/redo log of compact operations limited by approximate memory budget"""
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET) -> None:
+        self.memory_budget = memory_budget
+        self.undo_stack: Deque[Operation] = deque()
+        self.redo_stack: Deque[Operation] = deque()
+        self.used_memory = 0
+        # Called with every operation that is recorded, undone or redone
+        self.on_change: Optional[Callable[[Operation], None]] = None
+        # Where file coordinates start in PlayArea. Field shifts move every drawable,
+        # so absolute positions are kept in file coordinates, which shifts don't change.
+        self.origin: Callable[[], Offset] = lambda: Offset(0, 0)
+
+    def record(self, operation: Operation) -> None:
+        self.redo_stack.clear()
+        if self.on_change is not None:
+            self.on_change(operation)
+
+        if self.undo_stack:
+            last = self.undo_stack[-1]
+            last_cost = last.cost()
+            if last.merge(operation):
+                self.used_memory += last.cost() - last_cost
+                self._trim()
+                return
+
+        self.undo_stack.append(operation)
+        self.used_memory += operation.cost()
+        self._trim()
+
+    def record_move(self, drawable: Drawable, delta: Offset) -> None:
+        if drawable.id is not None and delta:
+            self.record(MoveOperation(drawable.id, delta))
+
+    def record_resize(self, drawable: Drawable, delta: Offset) -> None:
+        if drawable.id is not None and delta:
+            self.record(ResizeOperation(drawable.id, delta))
+
+    def record_color(self, drawable: Drawable, part_type: str, old: Color, new: Color) -> None:
+        if drawable.id is not None and old != new:
+            self.record(ColorOperation(drawable.id, part_type, old, new))
+
+    def record_text(self, drawable: Drawable, part: str, old: str, new: str) -> None:
+        if drawable.id is None or old == new:
+            return
+        self.record(TextOperation(drawable.id, part, *text_diff(old, new)))
+
+    def record_border(self, drawable: Drawable, old: str, new: str) -> None:
+        if drawable.id is not None and old != new:
+            self.record(BorderOperation(drawable.id, old, new))
+
+    def record_tags(self, drawable: Drawable, old: tuple[str, ...], new: tuple[str, ...]) -> None:
+        if drawable.id is not None and old != new:
+            self.record(TagsOperation(drawable.id, old, new))
+
+    def record_create(self, drawable: Drawable) -> None:
+        if drawable.id is not None:
+            self.record(LifecycleOperation(drawable.id, self._file_dump(drawable), created=True))
+
+    def record_delete(self, drawable: Drawable) -> None:
+        if drawable.id is not None:
+            self.record(LifecycleOperation(drawable.id, self._file_dump(drawable), created=False))
+
+    def record_group_move(self, drawables: list[Drawable], delta: Offset) -> None:
+        drawable_ids = tuple(x.id for x in drawables if x.id is not None)
+        if drawable_ids and delta:
+            self.record(GroupMoveOperation(drawable_ids, delta))
+
+    def record_place(self, drawables: list[Drawable], before: list[Offset], after: list[Offset]) -> None:
+        drawable_ids = tuple(x.id for x in drawables if x.id is not None)
+        if len(drawable_ids) == len(drawables) and before != after:
+            origin = self.origin()
+            self.record(PlaceOperation(drawable_ids, [x - origin for x in before], [x - origin for x in after]))
+
+    def record_group_color(self, changes: list[tuple[Drawable, Color]], part_type: str, new: Color) -> None:
+        operations: list[Operation] = [
+            ColorOperation(drawable.id, part_type, old, new)
+            for drawable, old in changes
+            if drawable.id is not None and old != new
+        ]
+        if operations:
+            self.record(BatchOperation(operations))
+
+    def record_group_delete(self, drawables: list[Drawable]) -> None:
+        operations: list[Operation] = [
+            LifecycleOperation(x.id, self._file_dump(x), created=False) for x in drawables if x.id is not None
+        ]
+        if operations:
+            self.record(BatchOperation(operations))
+
+    def seal(self) -> None:
+        """Prevent next operation from being merged with the last one"""
+        if self.undo_stack:
+            self.undo_stack[-1].timestamp = -MERGE_WINDOW - 1.0
+
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack)
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack)
+
+    async def undo(self, play_area: PlayArea) -> Optional[Operation]:
+        if not self.undo_stack:
+            return None
+        operation = self.undo_stack.pop()
+        self.used_memory -= operation.cost()
+        await operation.undo(play_area)
+        if self.on_change is not None:
+            self.on_change(operation)
+        self.redo_stack.append(operation)
+        self.seal()
+        return operation
+
+    async def redo(self, play_area: PlayArea) -> Optional[Operation]:
+        if not self.redo_stack:
+            return None
+        operation = self.redo_stack.pop()
+        await operation.redo(play_area)
+        if self.on_change is not None:
+            self.on_change(operation)
+        self.undo_stack.append(operation)
+        self.used_memory += operation.cost()
+        self.seal()
+        return operation
+
+    def forget(self, drawable_ids: set[str]) -> None:
+        """Drop operations on drawables that were changed outside of history"""
+        if not drawable_ids:
+            return
+        self.undo_stack = deque(x for x in self.undo_stack if not any(x.affects(i) for i in drawable_ids))
+        self.redo_stack = deque(x for x in self.redo_stack if not any(x.affects(i) for i in drawable_ids))
+        self.used_memory = sum(x.cost() for x in self.undo_stack)
+
+    def clear(self) -> None:
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.used_memory = 0
+
+    def _file_dump(self, drawable: Drawable) -> dict[str, Any]:
+        obj = drawable.dump()
+        obj["pos"] = tuple(drawable.record.pos - self.origin())
+        return obj
+
+    def _trim(self) -> None:
+        # Oldest steps are forgotten first, but last one is always kept
+        while self.used_memory > self.memory_budget and len(self.undo_stack) > 1:
+            self.used_memory -= self.undo_stack.popleft().cost()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Optional
+
+from notesh.schema import check_background, check_drawable
+
+JOURNAL_SUFFIX = ".wal"
+# Seconds between writes of buffered entries, each followed by one fsync
+JOURNAL_INTERVAL = 0.5
+
+
+class Journal:
+    """Write-ahead log of changes made since last save, kept next to notes file
+
+    Every entry holds whole state of changed drawable (or its removal),
+    so after a crash replaying entries on top of saved board brings back
+    unsaved work, in time that depends only on number of entries.
+    Changed drawables are only marked, their state is taken by `snapshot`
+    (None for removed one) once per `flush`, which writes all entries together.
+    """
+
+    def __init__(self, file_name: str) -> None:
+        self.file_name = file_name + JOURNAL_SUFFIX
+        self.snapshot: Callable[[str], Optional[dict[str, Any]]] = lambda drawable_id: None
+        self._pending: dict[str, Optional[dict[str, Any]]] = {}
+        self._count = 0
+
+    def log_drawables(self, drawable_ids: tuple[str, ...]) -> None:
+        for drawable_id in drawable_ids:
+            # Moved to the end, so order of entries follows order of changes
+            self._pending.pop(drawable_id, None)
+            self._pending[drawable_id] = None
+
+    def log_bring(self, drawable_ids: list[str], direction: str) -> None:
+        self._count += 1
+        self._pending[f" bring {self._count}"] = {"bring": drawable_ids, "direction": direction}
+
+    def log_background(self, background: dict[str, Any]) -> None:
+        # Only the last background matters, it is moved to the end like drawables
+        self._pending.pop(" background", None)
+        self._pending[" background"] = {"background": background}
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        entries: list[dict[str, Any]] = []
+        for key, entry in self._pending.items():
+            if entry is None:
+                obj = self.snapshot(key)
+                entry = {"id": key, "deleted": True} if obj is None else {"id": key, "obj": obj}
+            entries.append(entry)
+        lines = "".join(json.dumps(x) + "\n" for x in entries)
+        self._pending.clear()
+        with open(self.file_name, "a", encoding="utf-8") as file:
+            file.write(lines)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def clear(self) -> None:
+        """Forget all entries, after they were saved to notes file"""
+        self._pending.clear()
+        try:
+            os.remove(self.file_name)
+        except FileNotFoundError:
+            pass
+
+    def replay(self, obj: dict[str, Any], quarantined: Optional[dict[str, Any]] = None) -> tuple[dict[str, Any], int]:
+        """Board `obj` with logged entries applied and number of applied ones, `obj` is not changed
+
+        Logged drawables and background are checked like ones read from notes file,
+        invalid ones are skipped and put in `quarantined` if given.
+        """
+        if quarantined is None:
+            quarantined = {}
+        try:
+            with open(self.file_name, encoding="utf-8") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return obj, 0
+
+        board = dict(obj)
+        layers: list[str] = list(board.get("layers", []))
+        count = 0
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                if "bring" in entry:
+                    moved = [x for x in entry["bring"] if x in board]
+                    moved_set = set(moved)
+                    others = [x for x in layers if x not in moved_set]
+                    layers = others + moved if entry["direction"] == "forward" else moved + others
+                elif "background" in entry:
+                    error = check_background(entry["background"])
+                    if error is None:
+                        board["background"] = dict(entry["background"])
+                    else:
+                        quarantined["background (unsaved)"] = {"error": error, "value": entry["background"]}
+                        continue
+                elif entry.get("deleted"):
+                    if board.pop(entry["id"], None) is not None:
+                        layers.remove(entry["id"])
+                else:
+                    error = check_drawable(entry["obj"])
+                    if error is not None:
+                        quarantined[f"{entry['id']} (unsaved)"] = {"error": error, "value": entry["obj"]}
+                        continue
+                    if entry["id"] not in board:
+                        layers.append(entry["id"])
+                    board[entry["id"]] = dict(entry["obj"])
+            except (ValueError, KeyError, TypeError):
+                # Last line may be cut by the crash
+                break
+            count += 1
+        board["layers"] = layers
+        return board, count
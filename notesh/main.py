@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import tracemalloc
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from textual.app import App, ComposeResult
 from textual.binding import Binding
@@ -10,17 +13,38 @@ from textual.geometry import Offset, Size
 from textual.keys import KEY_ALIASES
 from textual.widget import Widget
 
+from notesh.animation import AnimationBudget
 from notesh.drawables.drawable import Drawable
+from notesh.history import Operation
+from notesh.memory import MEMORY_REPORT_SUFFIX, TRACEBACK_DEPTH, memory_report
+from notesh.merge import BoardMerge
 from notesh.play_area import PlayArea
-from notesh.utils import calculate_size_for_file, load_binding_config_file, load_drawables, save_drawables, set_bindings
+from notesh.utils import (
+    BOARD_ERRORS,
+    calculate_board_size,
+    load_binding_config_file,
+    quarantine_board,
+    read_board,
+    save_quarantined,
+    save_drawables,
+    set_bindings,
+    split_board,
+)
+from notesh.journal import JOURNAL_INTERVAL, Journal
+from notesh.watcher import BoardWatcher
 from notesh.widgets.focusable_footer import FocusableFooter
 from notesh.widgets.sidebar import DeleteDrawable, Sidebar
 from notesh.widgets.sidebar_left import SidebarLeft
+from notesh.widgets.viewport_hop import ViewportHopScreen, press
 from hoptex.configs import HoptexBindingConfig
 from hoptex.decorator import hoptex
+from hoptex.utils import get_focusable
 
 KEY_ALIASES["backspace"] = ["ctrl+h"]
 
+# Drawables mounted between two frames while board is loading
+LOAD_BATCH_SIZE = 100
+
 
 def load_confing_hoptex():
     conf = load_binding_config_file(str(Path(__file__).parent / "default_bindings.toml"))
@@ -64,17 +88,26 @@ class NoteApp(App[None]):
         self,
         watch_css: bool = False,
         file: str = DEFAULT_FILE,
+        performance: Optional[str] = None,
     ):
         super().__init__(watch_css=watch_css)
         self.file = file
+        # Performance mode given on command line, overrides the one from bindings file
+        self.performance = performance
         self.footer = FocusableFooter()
         self.sidebar_left = SidebarLeft(classes="-hidden")
         self.sidebar = Sidebar(classes="-hidden")
+        self.watcher = BoardWatcher(self.file)
+        # Styles animated by drawables and PlayArea go through it, see `animate_style`
+        self.animation_budget = AnimationBudget()
+        self.journal = Journal(self.file)
+        # Bumped by every load, loads that were started before the last one stop
+        self._load_generation = 0
 
     def compose(self) -> ComposeResult:
-        min_size, max_size = calculate_size_for_file(self.file)
-        self.play_area = PlayArea(min_size=min_size, max_size=max_size, screen_size=self.size)
-        self.action_load_notes(min_size)
+        # Board is loaded after first frame, see `action_load_notes`
+        self.play_area = PlayArea(screen_size=self.size, journal=self.journal)
+        self.animation_budget.count_drawables = lambda: len(self.play_area.drawables)
         self.sidebar_left.set_play_area(self.play_area)
 
         self._load_key_bindings()
@@ -87,6 +120,61 @@ class NoteApp(App[None]):
 
         self.set_focus(self.footer)
 
+    def on_mount(self) -> None:
+        self.action_load_notes()
+        self.set_interval(JOURNAL_INTERVAL, self.journal.flush)
+        self.run_worker(
+            partial(self.watcher.watch, self._on_notes_file_changed),
+            name="notes-file-watcher",
+            exit_on_error=False,
+            thread=True,
+        )
+
+    def _hoptex_targets(self) -> list[Widget]:
+        # Only drawables on screen are labeled, walking whole board is slow and gives long labels
+        targets: list[Widget] = []
+        for parent in self._hoptex_parent_widgets:
+            if parent is self.play_area:
+                targets.extend(self.play_area.visible_drawables())
+            else:
+                targets.extend(get_focusable(parent, self._hoptex_filter_lists))
+        return targets
+
+    def action_hop(self, focus_and_press: bool = False) -> None:
+        """Hoptex focus and press, labeling only targets from `_hoptex_targets`"""
+        screen = ViewportHopScreen(
+            hoptex_binding, self._hoptex_filter_lists, self._hoptex_label, self._hoptex_targets()
+        )
+
+        async def change_focus(widget: Widget) -> None:
+            self.set_focus(widget)
+            if focus_and_press:
+                await press(widget)
+
+        self.push_screen(screen, change_focus)
+
+    def on_unmount(self) -> None:
+        # Thread worker would keep the process alive after exit
+        self.watcher.stop()
+        self.journal.flush()
+
+    def _on_notes_file_changed(self, obj: dict[str, Any]) -> None:
+        # Called from watcher thread
+        self.call_from_thread(self._reload_changed_notes, obj, self.watcher.checked_generation)
+
+    async def _reload_changed_notes(self, obj: dict[str, Any], generation: int) -> None:
+        await self.loaded.wait()
+        if generation != self.watcher.generation:
+            # File was saved or loaded meanwhile, this content is already merged
+            return
+        diff = self.watcher.diff(obj)
+        self.watcher.remember(obj, file_seen=False)
+        if not diff:
+            return
+        await self.play_area.apply_board_diff(diff)
+        changed = diff.changed_ids()
+        await self._sync_sidebar(lambda drawable_id: drawable_id in changed)
+
     async def action_delete(self):
         await self._delete_drawable()
 
@@ -102,9 +190,37 @@ class NoteApp(App[None]):
         await self._edit_drawable()
 
     async def on_drawable_clicked(self, event: Drawable.Clicked):
+        if event.extend_selection:
+            self.play_area.toggle_selection(event.drawable)
+            return
         self.play_area.focused_drawable = event.drawable
         await self._edit_drawable()
 
+    def action_toggle_snapping(self) -> None:
+        self.play_area.snap_to_edges = not self.play_area.snap_to_edges
+
+    def action_zoom_in(self) -> None:
+        self.play_area.set_zoom(self.play_area.zoom_level - 1)
+
+    def action_zoom_out(self) -> None:
+        self.play_area.set_zoom(self.play_area.zoom_level + 1)
+
+    def action_memory_report(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_DEPTH)
+            self.notify(
+                "Memory is traced from now on, ask again for report. Start with --trace-memory to see all of it",
+                title="Memory report",
+            )
+            return
+        report = memory_report(self.file)
+        sections = "\n".join(x for x in report.splitlines() if not x.startswith("  "))
+        self.notify(f"{sections}\nDetails in {self.file}{MEMORY_REPORT_SUFFIX}", title="Memory report", timeout=30)
+
+    def action_toggle_select(self) -> None:
+        if self.play_area.focused_drawable is not None:
+            self.play_area.toggle_selection(self.play_area.focused_drawable)
+
     async def _move_drawable(self, direction: str) -> None:
         value = 1
         if "_" in direction:
@@ -112,9 +228,23 @@ class NoteApp(App[None]):
             direction, value = direction_parsed[0], int(direction_parsed[1])
         await self.play_area.move_drawable(direction, value)
 
+    async def _arrange(self, direction: str) -> None:
+        await self.play_area.arrange_drawables(direction)
+
     async def _bring(self, direction: str) -> None:
         if self.play_area.focused_drawable is not None:
-            getattr(self.play_area.focused_drawable, f"bring_{direction}")()
+            self.play_area.bring_drawables(self.play_area.group_of(self.play_area.focused_drawable), direction)
+
+    async def _focus_drawable(self, direction: str) -> None:
+        # Named `focus_left` and so on, as `left` is already action of moving drawable
+        direction = direction.split("_")[-1]
+        drawable = self.play_area.drawable_in_direction(direction, self.play_area.focused_drawable)
+        if drawable is None:
+            return
+        self.play_area.show_drawable(drawable)
+        self.play_area.can_focus_children = True
+        self.set_focus(drawable)
+        self.play_area.focused_drawable = drawable
 
     async def _resize(self, direction: str) -> None:
         d = {"h_plus": (1, 0), "h_minus": (-1, 0), "v_plus": (0, 1), "v_minus": (0, -1)}
@@ -131,7 +261,9 @@ class NoteApp(App[None]):
         if self.focused is None:
             return
         # Unfocuss Fully (forced) or from view with selected one drawable
+        self.play_area.clear_overlaps()
         if self.focused is self.play_area.focused_drawable or fully:
+            self.play_area.clear_selection()
             self.set_focus(self.footer)
             self.play_area.focused_drawable = None
             return
@@ -139,7 +271,7 @@ class NoteApp(App[None]):
         self.play_area.focused_drawable = None
 
     async def _delete_drawable(self, drawable: Optional[Drawable] = None):
-        self.play_area.delete_drawable(drawable)
+        await self.play_area.delete_drawable(drawable)
         await self.sidebar.set_drawable(None)
         if self.play_area.can_focus:
             self.set_focus(self.play_area)
@@ -179,19 +311,158 @@ class NoteApp(App[None]):
             self.play_area.can_focus_children = False
             self.set_focus(self.sidebar_left.children[0])
 
-    def action_save_notes(self) -> None:
-        save_drawables(self.file, self.play_area.drawables, list(self.screen.layers), self.play_area.dump())
+    async def action_save_notes(self) -> None:
+        if not self.loaded.is_set():
+            # Drawables that are not mounted yet would be removed from file
+            self.notify("Board is still loading", severity="warning")
+            return
+        merger = BoardMerge(self.watcher.stamps, self.watcher.background, self.play_area.file_origin)
+        obj = save_drawables(
+            self.file,
+            self.play_area.records,
+            [x.id for x in self.play_area.records],
+            self.play_area.dump(),
+            merge=merger.merge,
+        )
+        self.journal.clear()
+        if merger.from_disk:
+            await self.play_area.apply_board_diff(merger.from_disk)
+        self.watcher.remember(obj)
+        if merger.conflicts:
+            self.notify(
+                f"Changed here and in other notesh, kept this version: {', '.join(merger.conflicts)}",
+                title="Save conflicts",
+                severity="warning",
+            )
 
-    def action_load_notes(self, min_size: Size = Size(0, 0)) -> None:
+    def action_load_notes(self) -> None:
+        """Load board in background, first frame is shown before file is read
+
+        Load still in progress is cancelled, `loaded` is set when the last one is done.
+        """
+        if self._load_generation == 0 or self.loaded.is_set():
+            self.loaded = asyncio.Event()
+        self._load_generation += 1
+        self.run_worker(
+            partial(self._read_notes, self._load_generation),
+            name="notes-loader",
+            group="load",
+            exclusive=True,
+            thread=True,
+        )
+
+    def _read_notes(self, generation: int) -> None:
+        # Called from loader thread
+        try:
+            quarantined: dict[str, Any] = {}
+            try:
+                saved = read_board(self.file, quarantined)
+            except BOARD_ERRORS as error:
+                # Whole file is kept aside and board starts empty, instead of app failing to start
+                broken_name = quarantine_board(self.file)
+                saved = {}
+                self.call_from_thread(
+                    self.notify,
+                    f"Could not read notes ({error}), file moved to {broken_name}",
+                    title="Invalid board",
+                    severity="error",
+                )
+            # Changes not saved before last exit (or crash) are put back
+            unsaved: dict[str, Any] = {}
+            obj, recovered = self.journal.replay(saved, unsaved)
+            if unsaved:
+                save_quarantined(self.file, unsaved)
+                quarantined.update(unsaved)
+            if quarantined:
+                self.call_from_thread(
+                    self.notify,
+                    f"Skipped invalid entries, kept in {self.file}.quarantine.json: {', '.join(quarantined)}",
+                    title="Invalid notes",
+                    severity="warning",
+                )
+            min_size, max_size = calculate_board_size(obj)
+            if generation != self._load_generation:
+                return
+            self.call_from_thread(self._show_notes, obj, min_size, max_size, saved, generation)
+            if recovered:
+                self.call_from_thread(self.notify, f"Recovered {recovered} unsaved changes", title="Notes restored")
+        finally:
+            self.call_from_thread(self._finish_load, generation)
+
+    def _finish_load(self, generation: int) -> None:
+        if generation == self._load_generation:
+            self.loaded.set()
+
+    async def _show_notes(
+        self, obj: dict[str, Any], min_size: Size, max_size: Size, saved: dict[str, Any], generation: int
+    ) -> None:
+        """Mount drawables in batches, closest to the middle of screen first
+
+        `saved` is board as it is in file, `obj` can have recovered changes on top of it.
+        Mounting stops if another load with newer `generation` started meanwhile.
+        """
         self.play_area.clear_drawables()
-        drawables, background = load_drawables(self.file)
-        for name, drawable_obj in drawables:
-            self.play_area.add_parsed_drawable(drawable_obj, name, Offset(min_size.width, min_size.height))
+        self.play_area.fit_to_board(min_size, max_size, self.size)
+        drawables, background = split_board(obj)
         self.play_area.load(background)
-        self.refresh()
+        self.play_area.update_layout(duration=0.0)
+        offset = Offset(min_size.width, min_size.height)
+        self.play_area.file_origin = -offset
+        # Recovered changes are ours, not made on disk, so they are kept when merging on save
+        self.watcher.remember(saved)
+
+        # PlayArea is centered, so middle of the field is in the middle of screen
+        field = self.play_area.field_size
+        center_x, center_y = field.width / 2 + offset.x, field.height / 2 + offset.y
+
+        def distance(item: tuple[str, dict[str, Any]]) -> float:
+            x, y = item[1]["pos"]
+            width, height = item[1]["size"]
+            return (x + width / 2 - center_x) ** 2 + (y + height / 2 - center_y) ** 2
+
+        # Saved stacking is set once, each batch is put in its place within it
+        self.play_area.stack_in_order([name for name, _ in drawables])
+        ordered = sorted(drawables, key=distance)
+        total = len(ordered)
+        self.footer.progress = (0, total)
+        try:
+            for start in range(0, total, LOAD_BATCH_SIZE):
+                batch = ordered[start : start + LOAD_BATCH_SIZE]
+                # Waiting for mount lets screen refresh and handle input between batches
+                await self.play_area.add_parsed_drawables(batch, offset)
+                if generation != self._load_generation:
+                    return
+                self.footer.progress = (start + len(batch), total)
+        finally:
+            # Newer load has its own stacking and progress
+            if generation == self._load_generation:
+                self.play_area.stack_in_order([])
+                self.footer.progress = None
+
+    async def action_undo(self) -> None:
+        await self._sync_after_history(await self.play_area.undo())
+
+    async def action_redo(self) -> None:
+        await self._sync_after_history(await self.play_area.redo())
+
+    async def _sync_after_history(self, operation: Optional[Operation]) -> None:
+        if operation is not None:
+            await self._sync_sidebar(operation.affects)
+
+    async def _sync_sidebar(self, affects: Callable[[str], bool]) -> None:
+        drawable = self.sidebar.drawable
+        if drawable is None:
+            return
+        if drawable not in self.play_area.drawables:
+            await self.sidebar.set_drawable(None)
+            self._unfocus(fully=True)
+        elif drawable.id is not None and affects(drawable.id):
+            self.sidebar.change_sidebar()
 
     async def action_quit(self) -> None:
-        self.action_save_notes()
+        self.watcher.stop()
+        await self.loaded.wait()
+        await self.action_save_notes()
         self.exit()  # type: ignore
 
     async def on_play_area_clicked(self, message: PlayArea.Clicked):
@@ -215,14 +486,24 @@ class NoteApp(App[None]):
         conf.update(load_binding_config_file(str(Path(__file__).parent / "user_bindings.toml")))
 
         set_bindings(self, conf["default"], show=True)
+        # Hoptex keys go to own action, other bindings can still take them over
+        hop = {"hop": [hoptex_binding.focus, "Hop Focus"], "hop(True)": [hoptex_binding.press, "Hop Press"]}
+        set_bindings(self, hop, show=True)
 
         set_bindings(self, conf["moving_drawables"], func=self._move_drawable)
         set_bindings(self, conf["bring_drawable"], func=self._bring)
+        set_bindings(self, conf["focus_drawable"], func=self._focus_drawable)
         set_bindings(self, conf["resize_drawable"], func=self._resize)
+        set_bindings(self, conf["arrange_drawables"], func=self._arrange)
 
         set_bindings(self, conf["normal_insert"])
         set_bindings(self.play_area, conf["normal"])
 
+        self.play_area.set_snapping(conf["snapping"])
+        self.animation_budget.configure(conf["performance"])
+        if self.performance is not None:
+            self.animation_budget.set_mode(self.performance)
+
 
 if __name__ == "__main__":
     app = NoteApp(watch_css=True)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, List, Tuple
+
+from rich.console import Console, ConsoleOptions, RenderResult
+from rich.markdown import Markdown
+from rich.segment import Segment
+
+# Lines rendered below visible window, so scrolling by few lines has them ready
+LOOKAHEAD_LINES = 5
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_LIST_ITEM = re.compile(r"^\s*([-+*]|\d+[.)])(\s|$)")
+_REFERENCE = re.compile(r"^ {0,3}\[[^\]]+\]:", re.MULTILINE)
+
+# Blocks starting with these get blank line before them from Rich, as their nested parts end first
+_NESTED_OPENS = ("bullet_list_open", "ordered_list_open", "blockquote_open", "table_open")
+
+Lines = List[List[Segment]]
+# Lines of block, if it starts with nested element and if it ends with horizontal rule
+RenderedBlock = Tuple[Lines, bool, bool]
+
+
+def split_blocks(text: str) -> list[str]:
+    """Markdown split at blank lines that end a top level block
+
+    Blank lines inside code fences, between items of a list and before
+    indented lines (continuation of list item or indented code) don't split.
+    Text with link reference definitions is kept whole, they are used by all blocks.
+    """
+    if _REFERENCE.search(text):
+        return [text] if text.strip() else []
+    blocks: list[str] = []
+    current: list[str] = []
+    blank = 0
+    fenced = False
+    in_list = False
+    for line in text.split("\n"):
+        if not fenced and not line.strip():
+            blank += 1
+            continue
+        if blank and current and not fenced:
+            if (in_list and _LIST_ITEM.match(line)) or line[0].isspace():
+                current.extend([""] * blank)
+            else:
+                blocks.append("\n".join(current))
+                current = []
+                in_list = False
+        blank = 0
+        if not fenced and _LIST_ITEM.match(line):
+            in_list = True
+        if _FENCE.match(line):
+            fenced = not fenced
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+class BlockCache:
+    """Rendered lines of markdown blocks by text and width, kept only for blocks still in use"""
+
+    def __init__(self) -> None:
+        self.lines: dict[tuple[str, int], RenderedBlock] = {}
+
+    def keep(self, blocks: Iterable[str]) -> None:
+        used = set(blocks)
+        self.lines = {key: lines for key, lines in self.lines.items() if key[0] in used}
+
+    def render(self, block: str, console: Console, options: ConsoleOptions) -> RenderedBlock:
+        key = (block, options.max_width)
+        rendered = self.lines.get(key)
+        if rendered is None:
+            markdown = Markdown(block)
+            tokens = markdown.parsed
+            rendered = self.lines[key] = (
+                console.render_lines(markdown, options, pad=False),
+                bool(tokens) and tokens[0].type in _NESTED_OPENS,
+                bool(tokens) and tokens[-1].type == "hr",
+            )
+        return rendered
+
+
+class MarkdownWindow:
+    """Markdown of which only lines from `top` down to the bottom of render are shown
+
+    Blocks are parsed and rendered in order only until the window and
+    `LOOKAHEAD_LINES` below it are filled, blocks further down are left alone.
+    Once all blocks were rendered `line_count` is known, otherwise it is None.
+    """
+
+    def __init__(self, blocks: list[str], cache: BlockCache, top: int = 0) -> None:
+        self.blocks = blocks
+        self.cache = cache
+        self.top = top
+        self.line_count: int | None = None
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        height = options.height or options.size.height
+        block_options = options.reset_height()
+        lines: Lines = []
+        end = self.top + height + LOOKAHEAD_LINES
+        # Blank line between blocks, put where Rich puts it when rendering them together
+        after_rule = True
+        for block in self.blocks:
+            if len(lines) >= end:
+                break
+            block_lines, nested, rule = self.cache.render(block, console, block_options)
+            if not after_rule and not nested:
+                lines.append([])
+            lines.extend(block_lines)
+            after_rule = rule
+        else:
+            self.line_count = len(lines)
+            self.top = max(0, min(self.top, len(lines) - height))
+
+        new_line = Segment.line()
+        for line in lines[self.top : self.top + height]:
+            yield from line
+            yield new_line
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import gc
+import inspect
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from types import ModuleType
+from typing import Dict, Optional, Sequence, Tuple
+
+from textual.geometry import Offset, Size
+from textual.pilot import Pilot
+
+from notesh.drawables.drawable import Drawable, DrawablePart
+from notesh.model import DrawableRecord
+from notesh.utils import save_drawables
+
+# Frames kept for every allocation, enough to reach drawable creating a part from inside Markdown parser.
+# Tracing gets slower with every frame.
+TRACEBACK_DEPTH = 16
+BOARD_SIZES = (25, 50, 100, 200)
+ENTRIES_PER_SECTION = 6
+MEMORY_REPORT_SUFFIX = ".memory.txt"
+
+SIDEBAR_MODULES = (
+    "notesh.widgets.sidebar",
+    "notesh.widgets.sidebar_left",
+    "notesh.widgets.color_picker",
+    "notesh.widgets.multiline_input",
+)
+STORAGE_MODULES = (
+    "notesh.utils",
+    "notesh.model",
+    "notesh.schema",
+    "notesh.journal",
+    "notesh.watcher",
+    "notesh.merge",
+    "notesh.tools",
+)
+MARKDOWN_FILE = os.path.join("rich", "markdown.py")
+# Base classes which code is shared, memory they allocate is charged to subclass calling them if there is one
+SHARED_BASES = (Drawable, DrawablePart)
+
+# Sizes in bytes by section, like `Drawables`, and entry in it, like `Note`
+Breakdown = Dict[Tuple[str, str], int]
+
+
+@lru_cache(maxsize=None)
+def _notesh_modules() -> dict[str, ModuleType]:
+    return {
+        os.path.abspath(module.__file__): module
+        for name, module in list(sys.modules.items())
+        if name.split(".")[0] == "notesh" and getattr(module, "__file__", None)
+    }
+
+
+@lru_cache(maxsize=None)
+def _classes_in(file_name: str) -> Optional[tuple[ModuleType, list[tuple[int, int, type]]]]:
+    """Module of NoteSH file with line ranges of its classes, None for other files"""
+    module = _notesh_modules().get(os.path.abspath(file_name))
+    if module is None:
+        return None
+    classes: list[tuple[int, int, type]] = []
+    for value in vars(module).values():
+        if isinstance(value, type) and value.__module__ == module.__name__:
+            try:
+                lines, first = inspect.getsourcelines(value)
+            except (OSError, TypeError):
+                continue
+            classes.append((first, first + len(lines), value))
+    return module, classes
+
+
+def _owner(frame: tracemalloc.Frame) -> Optional[tuple[ModuleType, Optional[type]]]:
+    found = _classes_in(frame.filename)
+    if found is None:
+        return None
+    module, classes = found
+    for first, last, cls in classes:
+        if first <= frame.lineno < last:
+            return module, cls
+    return module, None
+
+
+def _library(traceback: tracemalloc.Traceback) -> str:
+    """Library module of the innermost frame with file, like `textual.css`
+
+    Code generated from strings (like namedtuples) has no file, its memory goes to code calling it.
+    """
+    file_name = next(
+        (x.filename for x in reversed(traceback) if not x.filename.startswith("<")), traceback[-1].filename
+    )
+    parts = file_name.split(os.sep)
+    if "site-packages" in parts:
+        parts = parts[parts.index("site-packages") + 1 :]
+        return os.path.splitext(os.path.join(*parts[:2]))[0].replace(os.sep, ".")
+    return os.path.basename(file_name)
+
+
+def _charge(traceback: tracemalloc.Traceback) -> Optional[tuple[str, str]]:
+    """Section and entry that allocation is charged to
+
+    Section is given by the innermost NoteSH frame. Code of `SHARED_BASES` is charged
+    to the first subclass of one of them further out, `DrawablePart.__init__` called
+    by `Note.init_parts` is charged to `Note`, and to the base itself if there is none.
+    """
+    markdown = False
+    charged: Optional[tuple[ModuleType, Optional[type]]] = None
+    name = ""
+    # Frames go from the oldest one, innermost is the last
+    for frame in reversed(traceback):
+        if frame.filename == __file__:
+            # Snapshots taken for report
+            return None
+        if charged is None and frame.filename.endswith(MARKDOWN_FILE):
+            markdown = True
+        owner = _owner(frame)
+        if owner is None:
+            continue
+        module, cls = owner
+        if charged is None:
+            charged = owner
+            name = module.__name__.split(".")[-1] if cls is None else cls.__name__
+            if cls not in SHARED_BASES:
+                break
+        elif cls is not None and issubclass(cls, SHARED_BASES) and cls not in SHARED_BASES:
+            name = cls.__name__
+            break
+
+    if charged is None:
+        return "Textual and libraries", _library(traceback)
+    module, cls = charged
+    if markdown or module.__name__ == "notesh.markdown_window":
+        return "Markdown renderables", name
+    if cls is not None and issubclass(cls, Drawable):
+        return "Drawables", name
+    if cls is not None and issubclass(cls, DrawablePart):
+        return "Drawable parts", name
+    if module.__name__ in SIDEBAR_MODULES:
+        return "Sidebar widgets", name
+    if module.__name__ in STORAGE_MODULES:
+        return "Storage", name
+    return "Other NoteSH", name
+
+
+def memory_breakdown(snapshot: tracemalloc.Snapshot, baseline: Optional[tracemalloc.Snapshot] = None) -> Breakdown:
+    """Memory allocated in `snapshot` (or added since `baseline`) by section and entry"""
+    ignored = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ]
+    snapshot = snapshot.filter_traces(ignored)
+    breakdown: Breakdown = {}
+    if baseline is None:
+        sizes = [(x.traceback, x.size) for x in snapshot.statistics("traceback")]
+    else:
+        compared = snapshot.compare_to(baseline.filter_traces(ignored), "traceback")
+        sizes = [(x.traceback, x.size_diff) for x in compared if x.size_diff > 0]
+    for traceback, size in sizes:
+        key = _charge(traceback)
+        if key is None:
+            continue
+        breakdown[key] = breakdown.get(key, 0) + size
+    return breakdown
+
+
+def format_report(columns: Sequence[tuple[str, Breakdown]], per: Sequence[int] = ()) -> str:
+    """Table of sections with their largest entries, a column for every breakdown, sizes in KiB
+
+    With `per` given (number of drawables of each column) last row is total per drawable.
+    """
+    sections: dict[str, dict[str, int]] = {}
+    for _, breakdown in columns:
+        for (section, entry), size in breakdown.items():
+            entries = sections.setdefault(section, {})
+            entries[entry] = max(entries.get(entry, 0), size)
+
+    def section_size(breakdown: Breakdown, section: str) -> int:
+        return sum(size for (name, _), size in breakdown.items() if name == section)
+
+    def row(name: str, values: Sequence[float]) -> str:
+        return f"{name:<32}" + "".join(f"{value / 1024:>12.1f}" for value in values)
+
+    lines = [f"{'KiB':<32}" + "".join(f"{title:>12}" for title, _ in columns)]
+    for section in sorted(sections, key=lambda x: -max(section_size(b, x) for _, b in columns)):
+        lines.append(row(section, [section_size(breakdown, section) for _, breakdown in columns]))
+        largest = sorted(sections[section].items(), key=lambda x: -x[1])[:ENTRIES_PER_SECTION]
+        for entry, _ in largest:
+            lines.append(row(f"  {entry}", [breakdown.get((section, entry), 0) for _, breakdown in columns]))
+    totals = [sum(breakdown.values()) for _, breakdown in columns]
+    lines.append(row("Total", totals))
+    if per:
+        lines.append(row("Total per drawable", [total / max(count, 1) for total, count in zip(totals, per)]))
+    return "\n".join(lines)
+
+
+def memory_report(file_name: str) -> str:
+    """Report of memory allocated since tracing started, also written to file next to notes"""
+    breakdown = memory_breakdown(tracemalloc.take_snapshot())
+    report = format_report([("now", breakdown)])
+    with open(f"{file_name}{MEMORY_REPORT_SUFFIX}", "w", encoding="utf-8") as file:
+        file.write(report + "\n")
+    return report
+
+
+def synthetic_records(count: int) -> list[DrawableRecord]:
+    """Board with notes and every tenth drawable a box, laid out in rows"""
+    records: list[DrawableRecord] = []
+    for index in range(count):
+        pos = Offset(index % 20 * 22, index // 20 * 15)
+        if index % 10 == 9:
+            record = DrawableRecord(
+                f"box-{index}", "box", pos, Size(20, 14), "#0044aa", border_color="#ffaa00", border_type="outer"
+            )
+        else:
+            body = f"Note **{index}**  \n- first\n- second  \n  \nSome longer text of note number {index}"
+            record = DrawableRecord(f"note-{index}", "note", pos, Size(20, 14), "#ffaa00", body, title=f"Note {index}")
+        records.append(record)
+    return records
+
+
+def measure_board(count: int) -> Breakdown:
+    """Memory added by loading synthetic board of `count` drawables in headless NoteApp
+
+    App starts with empty board, which is then replaced with synthetic one and loaded again.
+    Only the second load is traced, so memory of app itself is left out.
+    """
+    # NoteApp has memory report action, so it is imported only when measuring
+    from notesh.main import NoteApp
+
+    breakdown: Breakdown = {}
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "notes.json")
+        board_name = os.path.join(directory, "board.json")
+        records = synthetic_records(count)
+        save_drawables(board_name, records, [x.id for x in records])
+        del records
+        app = NoteApp(file=file_name, performance="on")
+
+        async def auto_pilot(pilot: Pilot[None]) -> None:
+            await app.loaded.wait()
+            await pilot.wait_for_scheduled_animations()
+            tracemalloc.start(TRACEBACK_DEPTH)
+            baseline = tracemalloc.take_snapshot()
+            os.replace(board_name, file_name)
+            app.action_load_notes()
+            await app.loaded.wait()
+            await pilot.wait_for_scheduled_animations()
+            # Messages still waiting in queues and cycles not collected yet would be counted too
+            await pilot.pause()
+            gc.collect()
+            snapshot = tracemalloc.take_snapshot()
+            # Tracing would slow down going through snapshot many times
+            tracemalloc.stop()
+            breakdown.update(memory_breakdown(snapshot, baseline))
+            app.exit()
+
+        try:
+            app.run(headless=True, size=(120, 40), auto_pilot=auto_pilot)
+        finally:
+            tracemalloc.stop()
+    return breakdown
+
+
+def memory_curve(sizes: Sequence[int] = BOARD_SIZES, jobs: Optional[int] = None) -> str:
+    """Report of memory taken by synthetic boards of given sizes, each measured in own process"""
+    results: dict[int, Breakdown] = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(measure_board, size): size for size in sizes}
+        for future in as_completed(futures):
+            size = futures[future]
+            results[size] = future.result()
+            print(f"{size} drawables measured after {time.perf_counter() - start:.2f}s", flush=True)
+    ordered = sorted(results)
+    return format_report([(str(size), results[size]) for size in ordered], per=ordered)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from textual.geometry import Offset
+
+from notesh.schema import BOARD_KEYS, BOARD_VERSION
+from notesh.utils import drawable_stamp
+from notesh.watcher import BoardDiff
+
+
+class BoardMerge:
+    """Three-way merge of board being saved with the one on disk
+
+    Base is what this process loaded (or last saved or synced) kept as
+    per drawable stamps. Drawables changed only on disk are taken from
+    disk and collected in `from_disk`, so they can be applied to the
+    running board without full reload. Drawables changed on both sides
+    are reported in `conflicts`, the version from this process wins
+    unless it deleted drawable that was edited on disk.
+    """
+
+    def __init__(
+        self, stamps: dict[str, str], background: Optional[dict[str, Any]], origin: Offset = Offset(0, 0)
+    ) -> None:
+        self.stamps = stamps
+        self.background = background
+        # Drawable positions are saved in notes file coordinates
+        self.origin = origin
+        self.from_disk = BoardDiff()
+        self.conflicts: list[str] = []
+
+    def merge(self, ours: dict[str, Any], theirs: dict[str, Any]) -> dict[str, Any]:
+        self.from_disk = BoardDiff()
+        self.conflicts = []
+
+        mine = {key: self._to_file(value) for key, value in ours.items() if key not in BOARD_KEYS}
+        disk = {key: value for key, value in theirs.items() if key not in BOARD_KEYS}
+
+        merged: dict[str, Any] = {"version": BOARD_VERSION, "layers": []}
+        for key in [*mine, *(x for x in disk if x not in mine)]:
+            value = self._merge_drawable(key, mine.get(key), disk.get(key))
+            if value is not None:
+                merged[key] = value
+
+        order = [*ours.get("layers", []), *theirs.get("layers", [])]
+        seen: set[str] = set()
+        for key in [*order, *merged]:
+            if key in merged and key not in BOARD_KEYS and key not in seen:
+                seen.add(key)
+                merged["layers"].append(key)
+
+        background = self._merge_background(ours.get("background"), theirs.get("background"))
+        if background is not None:
+            merged["background"] = background
+        return merged
+
+    def _merge_drawable(
+        self, key: str, mine: Optional[dict[str, Any]], disk: Optional[dict[str, Any]]
+    ) -> Optional[dict[str, Any]]:
+        base = self.stamps.get(key)
+        mine_stamp = None if mine is None else drawable_stamp(mine)
+        disk_stamp = None if disk is None else drawable_stamp(disk)
+
+        if disk_stamp == base or disk_stamp == mine_stamp:
+            return mine
+        if mine_stamp == base:
+            if disk is None:
+                self.from_disk.removed.append(key)
+            elif mine is None:
+                self.from_disk.added[key] = disk
+            else:
+                self.from_disk.modified[key] = disk
+            return disk
+
+        self.conflicts.append(key)
+        if mine is None and disk is not None:
+            self.from_disk.added[key] = disk
+            return disk
+        return mine
+
+    def _merge_background(
+        self, mine: Optional[dict[str, Any]], disk: Optional[dict[str, Any]]
+    ) -> Optional[dict[str, Any]]:
+        if disk == self.background or disk == mine or disk is None:
+            return mine
+        if mine == self.background:
+            self.from_disk.background = disk
+            return disk
+        self.conflicts.append("background")
+        return mine
+
+    def _to_file(self, obj: dict[str, Any]) -> dict[str, Any]:
+        if not self.origin or "pos" not in obj:
+            return obj
+        x, y = obj["pos"]
+        return {**obj, "pos": (x - self.origin.x, y - self.origin.y)}
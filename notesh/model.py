@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from textual.geometry import Offset, Region, Size
+
+
+class DrawableRecord:
+    """Plain state of one drawable, widgets are only views of it
+
+    Position is kept in PlayArea content coordinates, like widget offset.
+    Parts not used by drawable type (title of Box, border of Note) are None.
+    """
+
+    __slots__ = (
+        "id",
+        "type",
+        "x",
+        "y",
+        "width",
+        "height",
+        "color",
+        "body",
+        "title",
+        "border_color",
+        "border_type",
+        "tags",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        type: str,
+        pos: Offset = Offset(0, 0),
+        size: Size = Size(20, 14),
+        color: str = "#FFAA00",
+        body: str = "",
+        title: Optional[str] = None,
+        border_color: Optional[str] = None,
+        border_type: Optional[str] = None,
+        tags: tuple[str, ...] = (),
+    ) -> None:
+        self.id = id
+        self.type = type
+        self.x, self.y = int(pos.x), int(pos.y)
+        self.width, self.height = int(size.width), int(size.height)
+        self.color = color
+        self.body = body
+        self.title = title
+        self.border_color = border_color
+        self.border_type = border_type
+        self.tags = tags
+
+    @classmethod
+    def load(cls, id: str, obj: dict[str, Any]) -> DrawableRecord:
+        """Record of drawable as saved by `dump`"""
+        return cls(
+            id,
+            obj["type"],
+            pos=Offset(*obj["pos"]),
+            size=Size(*obj["size"]),
+            color=obj["color"],
+            body=obj["body"],
+            title=obj.get("title"),
+            border_color=obj.get("border_color"),
+            border_type=obj.get("border_type"),
+            tags=tuple(obj.get("tags", ())),
+        )
+
+    @property
+    def pos(self) -> Offset:
+        return Offset(self.x, self.y)
+
+    @pos.setter
+    def pos(self, pos: Offset) -> None:
+        self.x, self.y = int(pos.x), int(pos.y)
+
+    @property
+    def size(self) -> Size:
+        return Size(self.width, self.height)
+
+    @size.setter
+    def size(self, size: Size) -> None:
+        self.width, self.height = int(size.width), int(size.height)
+
+    @property
+    def region(self) -> Region:
+        return Region(self.x, self.y, self.width, self.height)
+
+    def dump(self) -> dict[str, Any]:
+        obj: dict[str, Any] = {}
+        if self.title is not None:
+            obj["title"] = self.title
+        obj["body"] = self.body
+        obj["pos"] = (self.x, self.y)
+        obj["color"] = self.color
+        if self.border_color is not None:
+            obj["border_color"] = self.border_color
+            obj["border_type"] = self.border_type
+        obj["size"] = (self.width, self.height)
+        obj["type"] = self.type
+        if self.tags:
+            obj["tags"] = list(self.tags)
+        return obj
@@ -1,21 +1,47 @@
 from __future__ import annotations
 
+import math
+from bisect import bisect_right
 from typing import Any, Optional, OrderedDict, cast
 from textual.app import ComposeResult
 from textual.color import Color
 
 from textual.containers import Container
 from textual.events import Click, MouseDown, MouseMove, MouseUp
-from textual.geometry import Offset, Size
+from textual.geometry import Offset, Region, Size
 from textual.message import Message
 from textual.reactive import reactive
-from textual.widget import Widget
+from textual.widget import AwaitMount, Widget
 
+from notesh.animation import animate_style
+from notesh.arrange import GAP, arrange
 from notesh.drawables.box import Box
 from notesh.drawables.drawable import Drawable
 from notesh.drawables.sticknote import Note
+from notesh.history import History, Operation
+from notesh.journal import Journal
+from notesh.model import DrawableRecord
+from notesh.spatial import SpatialIndex
+from notesh.tags import TagIndex
+from notesh.watcher import BoardDiff
+from notesh.widgets.board_overview import BoardOverview
+from notesh.widgets.selection_band import SelectionBand
 
 CHUNK_SIZE = Offset(20, 5)
+# Field never shrinks below size of empty board
+MIN_FIELD_EXTENT = Size(50, 20)
+# Above this count arranged drawables jump to their places without animation
+ARRANGE_ANIMATION_LIMIT = 200
+DIRECTIONS = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+# Board cells per screen cell and how much of drawable is shown at each zoom level
+ZOOM_LEVELS = ((1, "full"), (2, "title"), (4, "block"), (8, "canvas"))
+
+
+def field_size(min_size: Size, max_size: Size) -> Size:
+    """Size of field PlayArea makes for board that spans from `min_size` to `max_size`"""
+    width = ((max_size.width - min_size.width + 1) // CHUNK_SIZE.x) * CHUNK_SIZE.x + CHUNK_SIZE.x
+    height = ((max_size.height - min_size.height + 1) // CHUNK_SIZE.y) * CHUNK_SIZE.y + CHUNK_SIZE.y
+    return Size(width, height)
 
 
 class PlayArea(Container):
@@ -36,17 +62,50 @@ class PlayArea(Container):
         screen_size: Size = Size(100, 100),
         color: str = "#444444",
         border_color: str = "#ffaa00",
+        journal: Optional[Journal] = None,
     ) -> None:
         super().__init__(*children, name=name, id=id, classes=classes)
         calculated_width, calculated_height = self._calculate_size(min_size, max_size)
-        self.styles.width, self.styles.height = calculated_width, calculated_height
+        self.zoom_level = 0
+        self._set_field_size(Size(calculated_width, calculated_height))
         self.offset += self._calculate_additional_offset(screen_size, Size(calculated_width, calculated_height))
         self.color = Color.parse(color)
         self.border_color = Color.parse(border_color)
+        # Own list, the class one would be shared by every PlayArea made in process
+        self.drawables = []
+        self.drawables_by_id: dict[str, Drawable] = {}
+        self.history = History()
+        self.history.origin = lambda: self.file_origin
+        # Unsaved changes are logged as they happen, to recover them after crash
+        self.journal = journal
+        if journal is not None:
+            journal.snapshot = self._journal_snapshot
+            self.history.on_change = lambda operation: journal.log_drawables(operation.drawable_ids_changed())
+        self.selection: dict[str, Drawable] = {}
+        self.selection_band = SelectionBand()
+        self.overview = BoardOverview()
+        self._band_start: Optional[Offset] = None
+        self._band_used = False
+        self.spatial = SpatialIndex(CHUNK_SIZE)
+        self.tags = TagIndex()
+        self.overlapping: set[Drawable] = set()
+        self.snap_to_edges = False
+        self.snap_distance = 2
+        self.snap_grid = Offset(0, 0)
+        # Drawable position in PlayArea is position from notes file moved by this
+        self.file_origin = Offset(0, 0)
+        # Saved stacking of drawables that are still being mounted
+        self._stacking: dict[str, int] = {}
+        # Ids on screen, for viewport and spatial index version they were found with
+        self._visible: tuple[Optional[tuple[Region, int]], list[str]] = (None, [])
+        # Ids of drawables that are not culled, and area and spatial index version they were found with
+        self._shown: set[str] = set()
+        self._cull_key: Optional[tuple[Region, int]] = None
 
     def compose(self) -> ComposeResult:
         self.change_color(self.color, duration=0.0)
-        yield from ()
+        yield self.selection_band
+        yield self.overview
 
     def change_color(self, new_color: str | Color, duration: float = 1.0, part_type: str = "body") -> None:
         if isinstance(new_color, str):
@@ -55,16 +114,26 @@ class PlayArea(Container):
             base_color = new_color
 
         if part_type == "" or part_type == "body":
+            changed = base_color != self.color
             self.color = base_color
         else:
+            changed = base_color != self.border_color
             self.border_color = base_color
         self.update_layout(duration)
+        if changed and self.journal is not None:
+            self.journal.log_background(self.dump())
+
+    def change_background_type(self, background_type: str) -> None:
+        changed = background_type != self.background_type
+        self.background_type = background_type
+        if changed and self.journal is not None:
+            self.journal.log_background(self.dump())
 
     def update_layout(self, duration: float = 1.0):
         base_color = self.color
         border_color = self.border_color
 
-        self.styles.animate("background", value=base_color, duration=duration)
+        animate_style(self.styles, "background", base_color, duration)
         self.styles.border = ("outer", border_color)
 
     def sidebar_layout(self, widgets: OrderedDict[str, Widget]) -> None:
@@ -78,94 +147,727 @@ class PlayArea(Container):
         d = {"note": Note, "box": Box}
         drawable = cast(Drawable, d.get(drawable_type, Drawable)())
         self._mount_drawable(drawable)
+        self.history.record_create(drawable)
 
         return drawable
 
-    def add_parsed_drawable(self, obj: dict[Any, Any], drawable_id: str, offset: Offset = Offset(0, 0)) -> None:
-        drawable_type = obj["type"]
-        d = {"note": Note, "box": Box}
-        drawable = cast(Drawable, d.get(drawable_type, Drawable).load(obj, drawable_id, offset))
-        self._mount_drawable(drawable)
+    def add_parsed_drawable(self, obj: dict[Any, Any], drawable_id: str, offset: Offset = Offset(0, 0)) -> AwaitMount:
+        return self._mount_drawable(self._load_drawable(obj, drawable_id, offset))
+
+    def add_parsed_drawables(
+        self, items: list[tuple[str, dict[Any, Any]]], offset: Offset = Offset(0, 0)
+    ) -> AwaitMount:
+        """Mount many drawables with one `mount`, keeping stacking set by `stack_in_order`"""
+        return self._mount_drawables([self._load_drawable(obj, drawable_id, offset) for drawable_id, obj in items])
+
+    def fit_to_board(self, min_size: Size, max_size: Size, screen_size: Size) -> None:
+        """Resize field to board loaded after PlayArea was created and center it on screen"""
+        width, height = self._calculate_size(min_size, max_size)
+        self._set_field_size(Size(width, height))
+        self.styles.offset = self._calculate_additional_offset(screen_size, Size(width, height))
+
+    def stack_in_order(self, drawable_ids: list[str]) -> None:
+        """Stack drawables with given ids from bottom to top, whatever order they are mounted in
+
+        Drawables do not have to be mounted yet, so whole saved order is set at once.
+        Other drawables go above them. Empty list ends it, once all are mounted.
+        """
+        self._stacking = {drawable_id: index for index, drawable_id in enumerate(drawable_ids)}
+
+    async def apply_board_diff(self, diff: BoardDiff) -> None:
+        """Apply changes of notes file made outside of this app, touching only changed drawables"""
+        offset = -self.file_origin
+        with self.app.batch_update():
+            removed = [self.drawables_by_id[x] for x in diff.removed if x in self.drawables_by_id]
+            for drawable_id, obj in diff.modified.items():
+                drawable = self.drawables_by_id.get(drawable_id)
+                if drawable is None:
+                    diff.added[drawable_id] = obj
+                elif drawable.type != obj["type"]:
+                    removed.append(drawable)
+                    diff.added[drawable_id] = obj
+                else:
+                    drawable.restore(obj, offset)
+                    self.reindex_drawables([drawable])
+                    self._set_filtered(drawable, self.tags.set(drawable_id, drawable.record.tags))
+            if removed:
+                await self._remove_drawables(removed)
+            if diff.added:
+                self.add_parsed_drawables(list(diff.added.items()), offset)
+            self._repaint_overview()
+            if diff.background is not None:
+                self.load(diff.background)
+                self.update_layout(duration=0.0)
+            self._fit_field()
+        self.history.forget(diff.changed_ids())
+
+    @property
+    def records(self) -> list[DrawableRecord]:
+        """State of all drawables from bottom to top, without going through widgets"""
+        return [x.record for x in self.drawables]
+
+    def get_drawable(self, drawable_id: str) -> Optional[Drawable]:
+        return self.drawables_by_id.get(drawable_id)
 
     def clear_drawables(self) -> None:
         while self.drawables:
             self.drawables.pop().remove()
+        self.drawables_by_id.clear()
+        self.selection.clear()
+        self.overlapping.clear()
+        self.spatial.clear()
+        self.tags.clear()
+        self.history.clear()
+        self._shown.clear()
+
+    def group_of(self, drawable: Drawable) -> list[Drawable]:
+        """All selected drawables if `drawable` is in selection, otherwise only `drawable`"""
+        if drawable.id is not None and drawable.id in self.selection:
+            return list(self.selection.values())
+        return [drawable]
+
+    def toggle_selection(self, drawable: Drawable) -> None:
+        if drawable.id is None:
+            return
+        if drawable.id in self.selection:
+            del self.selection[drawable.id]
+            drawable.remove_class("-selected")
+        else:
+            self.selection[drawable.id] = drawable
+            drawable.add_class("-selected")
+
+    def select(self, drawables: list[Drawable], extend: bool = False) -> None:
+        with self.app.batch_update():
+            if not extend:
+                self.clear_selection()
+            for drawable in drawables:
+                if drawable.filtered_out:
+                    continue
+                if drawable.id is not None and drawable.id not in self.selection:
+                    self.selection[drawable.id] = drawable
+                    drawable.add_class("-selected")
+
+    def clear_selection(self) -> None:
+        with self.app.batch_update():
+            for drawable in self.selection.values():
+                drawable.remove_class("-selected")
+            self.selection.clear()
+
+    async def move_drawables(self, drawables: list[Drawable], delta: Offset, record: bool = True) -> None:
+        if not drawables or not delta:
+            return
+        with self.app.batch_update():
+            for drawable in drawables:
+                drawable.offset = drawable.offset + delta
+            self.reindex_drawables(drawables)
+            self._fit_field()
+            self._repaint_overview()
+        if record:
+            self.history.record_group_move(drawables, delta)
+
+    async def arrange_drawables(self, mode: str, animate: Optional[bool] = None) -> None:
+        """Arrange selection in place, or whole board if nothing is selected"""
+        drawables = list(self.selection.values()) or list(self.drawables)
+        if not drawables:
+            return
+        records = [x.record for x in drawables]
+        xs = [x.x for x in records]
+        ys = [x.y for x in records]
+        widths = [x.width for x in records]
+        heights = [x.height for x in records]
+        colors = [x.color for x in records]
+
+        new_xs, new_ys = arrange(mode, xs, ys, widths, heights, colors)
+        origin = Offset(0, 0)
+        if self.selection:
+            # Selection goes to free space near where it was, so it does not cover other drawables
+            extent = Size(
+                max(x + w for x, w in zip(new_xs, widths)) + GAP[0],
+                max(y + h for y, h in zip(new_ys, heights)) + GAP[1],
+            )
+            origin = self.spatial.free_region(extent, Offset(min(xs), min(ys)), ignore=self.selection).offset
+        before = [Offset(x, y) for x, y in zip(xs, ys)]
+        after = [origin + Offset(x, y) for x, y in zip(new_xs, new_ys)]
+
+        if animate is None:
+            animate = len(drawables) <= ARRANGE_ANIMATION_LIMIT
+        await self.place_drawables(drawables, after, animate=animate, record=False)
+        self.history.record_place(drawables, before, after)
+
+    async def place_drawables(
+        self, drawables: list[Drawable], positions: list[Offset], animate: bool = False, record: bool = True
+    ) -> None:
+        if not drawables:
+            return
+        before = [x.record.pos for x in drawables]
+        with self.app.batch_update():
+            for drawable, position in zip(drawables, positions):
+                drawable.place(position, animate=animate)
+            self.reindex_drawables(drawables)
+            self._fit_field()
+            self._repaint_overview()
+        if record:
+            self.history.record_place(drawables, before, positions)
+
+    def recolor_drawables(self, drawables: list[Drawable], color: Color, part_type: str = "body") -> None:
+        self.history.record_group_color(self._recolor(drawables, color, part_type), part_type, color)
+
+    def bring_drawables(self, drawables: list[Drawable], direction: str) -> None:
+        moved_set = set(drawables)
+        moved = [x for x in self.drawables if x in moved_set]
+        others = [x for x in self.drawables if x not in moved_set]
+        # Already on top (or bottom), nothing to restack or to log
+        if (self.drawables[len(others) :] if direction == "forward" else self.drawables[: len(moved)]) == moved:
+            return
+        if direction == "forward":
+            self.drawables = others + moved
+            for drawable in moved:
+                self.move_child(drawable, after=self.children[-1])
+        else:
+            self.drawables = moved + others
+            if others:
+                for drawable in moved:
+                    self.move_child(drawable, before=others[0])
+        if self.journal is not None:
+            self.journal.log_bring([x.id for x in moved if x.id is not None], direction)
+
+    def set_drawable_tags(self, drawable: Drawable, tags: tuple[str, ...]) -> None:
+        drawable.record.tags = tags
+        if drawable.id is not None:
+            self._set_filtered(drawable, self.tags.set(drawable.id, tags))
+            self._repaint_overview()
+
+    def filter_tags(self, tags: tuple[str, ...]) -> None:
+        """Show only drawables with any of `tags`, or all of them if none are given
+
+        Drawables that change visibility come from bitsets of tags, and are toggled in one update.
+        """
+        hide, show = self.tags.apply_filter(tags)
+        with self.app.batch_update():
+            for drawable_id in show:
+                self._set_filtered(self.drawables_by_id[drawable_id], False)
+            for drawable_id in hide:
+                self._set_filtered(self.drawables_by_id[drawable_id], True)
+            self._repaint_overview()
+
+    def _set_filtered(self, drawable: Drawable, filtered_out: bool) -> None:
+        """Hide or show drawable by tag filter, hidden one can't stay selected or focused"""
+        if drawable.filtered_out == filtered_out:
+            return
+        drawable.set_filtered(filtered_out)
+        if not filtered_out:
+            return
+        if drawable.id is not None and self.selection.pop(drawable.id, None) is not None:
+            drawable.remove_class("-selected")
+        if self.focused_drawable is drawable:
+            self.focused_drawable = None
 
-    def delete_drawable(self, drawable: Optional[Drawable] = None) -> None:
+    async def delete_drawable(self, drawable: Optional[Drawable] = None) -> None:
         if drawable is None:
             drawable = self.focused_drawable
         if drawable is None:
             return
 
-        self.drawables = [note for note in self.drawables if note != drawable]
-        drawable.remove()
+        drawables = self.group_of(drawable)
+        if len(drawables) > 1:
+            self.history.record_group_delete(drawables)
+        else:
+            self.history.record_delete(drawable)
+        await self._remove_drawables(drawables)
         self.focused_drawable = None
-        if len(self.drawables) == 0:
-            self.can_focus = True
+
+    async def undo(self) -> Optional[Operation]:
+        operation = await self.history.undo(self)
+        self._repaint_overview()
+        return operation
+
+    async def redo(self) -> Optional[Operation]:
+        operation = await self.history.redo(self)
+        self._repaint_overview()
+        return operation
+
+    @property
+    def zoom(self) -> int:
+        return ZOOM_LEVELS[self.zoom_level][0]
+
+    def set_zoom(self, level: int) -> None:
+        """Show board zoomed out to `level`, keeping the same board point in the middle of screen"""
+        level = max(0, min(level, len(ZOOM_LEVELS) - 1))
+        if level == self.zoom_level:
+            return
+        old_scale = self.zoom
+        scale, detail = ZOOM_LEVELS[level]
+        center = Offset(self.screen.size.width // 2, self.screen.size.height // 2)
+        board_center = (center - self.content_region.offset) * old_scale
+
+        self.zoom_level = level
+        with self.app.batch_update():
+            for drawable in self.drawables:
+                drawable.set_view(scale, detail)
+            self._set_field_size(self.field_size)
+            self.overview.display = detail == "canvas"
+            self._repaint_overview()
+            if detail == "canvas":
+                self._bring_layer_forward("board-overview")
+            new_origin = center - Offset(board_center.x // scale, board_center.y // scale)
+            self.offset = self.offset + (new_origin - self.content_region.offset)
+        self._cull_after_refresh()
 
     async def on_mouse_move(self, event: MouseMove) -> None:
         if event.ctrl and self.is_draggin:
             await self._move_play_area(event.delta)
+        elif self._band_start is not None and event.button != 0:
+            region = self._band_region(self._band_start, event.screen_offset)
+            self.selection_band.show_region(region, self.content_region.offset)
+            self._band_used = True
 
     async def on_mouse_down(self, event: MouseDown) -> None:
         if event.ctrl:
             self.is_draggin = True
             self.capture_mouse()
+        elif self.screen.get_widget_at(*event.screen_offset)[0] is self:
+            # Dragging over empty part of board selects drawables with band
+            self._band_start = event.screen_offset
+            self._band_used = False
+            self._bring_band_forward()
+            self.capture_mouse()
 
-    async def on_mouse_up(self, _: MouseUp) -> None:
+    async def on_mouse_up(self, event: MouseUp) -> None:
         self.is_draggin = False
         self.capture_mouse(False)
+        # Overlaps are highlighted only while drawables are dragged
+        self.clear_overlaps()
+        if self._band_start is None:
+            return
+        region = self._band_region(self._band_start, event.screen_offset)
+        self._band_start = None
+        self.selection_band.hide()
+        if self._band_used:
+            local = region.translate(-self.content_region.offset)
+            scale = self.zoom
+            local = Region(local.x * scale, local.y * scale, local.width * scale, local.height * scale)
+            self.select([self.drawables_by_id[x] for x in self.spatial.query(local)], extend=event.shift)
 
     async def on_click(self, event: Click) -> None:
+        if self._band_used:
+            self._band_used = False
+            return
         self.post_message(PlayArea.Clicked())
 
     async def on_drawable_move(self, event: Drawable.Move) -> None:
-        await self._resize_field_to_drawable(event.drawable, event.offset)
+        drawables = self.group_of(event.drawable)
+        if len(drawables) == 1:
+            self.history.record_move(event.drawable, event.offset)
+            self.reindex_drawables(drawables)
+            self.highlight_overlaps(drawables)
+            self._fit_field()
+            # Keyboard moves happen also when board is painted by overview
+            self._repaint_overview()
+            return
+        # Drawable moved itself already, rest of selection follows it
+        others = [x for x in drawables if x is not event.drawable]
+        with self.app.batch_update():
+            for drawable in others:
+                drawable.offset = drawable.offset + event.offset
+            self.reindex_drawables(drawables)
+            self.highlight_overlaps(drawables)
+            self._fit_field()
+            self._repaint_overview()
+        self.history.record_group_move(drawables, event.offset)
+
+    async def on_drawable_resize(self, event: Drawable.Resize) -> None:
+        self.history.record_resize(event.drawable, event.delta)
+        self.reindex_drawables([event.drawable])
+        self._fit_field()
+        self._repaint_overview()
+
+    async def on_drawable_recolor(self, event: Drawable.Recolor) -> None:
+        drawables = self.group_of(event.drawable)
+        if len(drawables) == 1:
+            self.history.record_color(event.drawable, event.part_type, event.old, event.new)
+            return
+        # Edited drawable was already recolored by sidebar, rest of selection follows it
+        changes = [(event.drawable, event.old)]
+        changes.extend(self._recolor([x for x in drawables if x is not event.drawable], event.new, event.part_type))
+        self.history.record_group_color(changes, event.part_type, event.new)
+
+    async def on_drawable_edit(self, event: Drawable.Edit) -> None:
+        self.history.record_text(event.drawable, event.part, event.old, event.new)
+
+    async def on_drawable_reborder(self, event: Drawable.Reborder) -> None:
+        self.history.record_border(event.drawable, event.old, event.new)
+
+    async def on_drawable_retag(self, event: Drawable.Retag) -> None:
+        self.set_drawable_tags(event.drawable, event.new)
+        self.history.record_tags(event.drawable, event.old, event.new)
 
     async def on_drawable_focus(self, message: Drawable.Focus) -> None:
         drawable = self.screen.get_widget_by_id(message.index)
         self.focused_drawable = cast(Drawable, drawable)
 
     async def move_drawable(self, direction: str, value: int) -> None:
-        if self.focused_drawable is not None:
-            await self.focused_drawable.move(direction, value)
+        if self.focused_drawable is None:
+            return
+        drawables = self.group_of(self.focused_drawable)
+        delta = self._snap_delta(drawables, Offset(*DIRECTIONS[direction]) * value)
+        if len(drawables) == 1:
+            await self.focused_drawable.drawable_is_moved_from_key(delta)
+            return
+        await self.move_drawables(drawables, delta)
+        self.highlight_overlaps(drawables)
+
+    def drawable_in_direction(self, direction: str, drawable: Optional[Drawable] = None) -> Optional[Drawable]:
+        """Closest drawable in `direction` from `drawable`, or from middle of screen if not given
+
+        Distance is taken between centers, with side distance counted twice,
+        so drawables in line are preferred over closer ones aside.
+        Search grows around the start until it can not find anything closer.
+        """
+        if drawable is not None:
+            start = drawable.record.region
+        else:
+            start = Region(*self._screen_center_on_board(), 1, 1)
+        dx, dy = DIRECTIONS[direction]
+        # Doubled centers stay integer
+        center_x, center_y = start.x * 2 + start.width, start.y * 2 + start.height
+        limit = max(self.field_size.width, self.field_size.height) + max(start.width, start.height)
+        radius = max(CHUNK_SIZE.x, CHUNK_SIZE.y)
+        while True:
+            best: Optional[tuple[int, str]] = None
+            for key, region in self.spatial.near(start, radius):
+                if (drawable is not None and key == drawable.id) or self.tags.is_hidden(key):
+                    continue
+                x, y = region.x * 2 + region.width - center_x, region.y * 2 + region.height - center_y
+                along = x * dx + y * dy
+                if along <= 0:
+                    continue
+                score = (along + 2 * abs(x * dy + y * dx), key)
+                if best is None or score < best:
+                    best = score
+            # Anything outside searched area is farther than radius
+            if (best is not None and best[0] <= 2 * radius) or radius > limit:
+                break
+            radius *= 2
+        return None if best is None else self.drawables_by_id.get(best[1])
+
+    def show_drawable(self, drawable: Drawable) -> None:
+        """Move field so `drawable` is in the middle of screen, unless it is already whole on screen"""
+        scale = self.zoom
+        record = drawable.record
+        width, height = max(1, -(-record.width // scale)), max(1, -(-record.height // scale))
+        view = Region(record.x // scale, record.y // scale, width, height).translate(self.content_region.offset)
+        if self.screen.region.contains_region(view):
+            return
+        center = Offset(self.screen.size.width // 2, self.screen.size.height // 2)
+        self.offset = self.offset + (center - Offset(view.x + width // 2, view.y + height // 2))
+        self._cull_after_refresh()
+
+    def visible_drawables(self) -> list[Drawable]:
+        """Drawables at least partly on screen, found again only when board or viewport changed"""
+        if ZOOM_LEVELS[self.zoom_level][1] == "canvas":
+            return []
+        viewport = self._viewport()
+        key = (viewport, self.spatial.version)
+        if self._visible[0] != key:
+            self._visible = (key, self.spatial.query(viewport))
+        is_hidden = self.tags.is_hidden
+        return [self.drawables_by_id[x] for x in self._visible[1] if x in self.drawables_by_id and not is_hidden(x)]
+
+    def on_idle(self) -> None:
+        self.cull()
+
+    def _cull_after_refresh(self) -> None:
+        # Screen position of moved field is known only after it was laid out again,
+        # while idle comes before that
+        self.call_after_refresh(self.cull)
+
+    def cull(self) -> None:
+        """Hide drawables farther than a screen away from it, so they are not laid out and rendered
+
+        Culled widgets stay mounted, selection, focus and history refer to them, so this
+        saves layout and rendering but not memory. Only drawables that came close
+        to the screen or went away from it since last time are touched.
+        """
+        if not self.is_attached or ZOOM_LEVELS[self.zoom_level][1] == "canvas":
+            return
+        viewport = self._viewport()
+        area = viewport.grow((viewport.height, viewport.width, viewport.height, viewport.width))
+        key = (area, self.spatial.version)
+        if key == self._cull_key:
+            return
+        self._cull_key = key
+        shown = set(self.spatial.query(area))
+        if self.focused_drawable is not None and self.focused_drawable.id is not None:
+            shown.add(self.focused_drawable.id)
+        with self.app.batch_update():
+            for drawable_id in self._shown - shown:
+                drawable = self.drawables_by_id.get(drawable_id)
+                if drawable is not None:
+                    drawable.set_culled(True)
+            for drawable_id in shown - self._shown:
+                self.drawables_by_id[drawable_id].set_culled(False)
+        self._shown = shown
+
+    def _viewport(self) -> Region:
+        """Part of board on screen, in board cells"""
+        scale = self.zoom
+        origin = (self.screen.region.offset - self.content_region.offset) * scale
+        return Region(origin.x, origin.y, self.screen.size.width * scale, self.screen.size.height * scale)
+
+    def _screen_center_on_board(self) -> Offset:
+        center = Offset(self.screen.size.width // 2, self.screen.size.height // 2)
+        return (center - self.content_region.offset) * self.zoom
+
+    def set_snapping(self, conf: dict[str, Any]) -> None:
+        self.snap_to_edges = bool(conf.get("edges", self.snap_to_edges))
+        self.snap_distance = int(conf.get("distance", self.snap_distance))
+        self.snap_grid = Offset(*conf.get("grid", self.snap_grid))
+
+    def reindex_drawables(self, drawables: list[Drawable]) -> None:
+        for drawable in drawables:
+            self.spatial.insert(drawable.record.id, drawable.record.region)
+
+    def highlight_overlaps(self, drawables: list[Drawable]) -> None:
+        """Mark `drawables` and their neighbours if they overlap, checking only nearby chunks"""
+        moved_ids = {x.id for x in drawables}
+        found: set[Drawable] = set()
+        for drawable in drawables:
+            region = self.spatial.get(drawable.id) if drawable.id is not None else None
+            if region is None:
+                continue
+            for key in self.spatial.query(region):
+                if key not in moved_ids:
+                    found.add(self.drawables_by_id[key])
+                    found.add(drawable)
+        self._set_overlapping(found)
+
+    def clear_overlaps(self) -> None:
+        if self.overlapping:
+            self._set_overlapping(set())
 
     def _calculate_additional_offset(self, size_a: Size, size_b: Size):
         return Offset((size_a.width - size_b.width) // 2, (size_a.height - size_b.height) // 2)
 
-    def _calculate_size(self, min_size: Size, max_size: Size):
-        calculated_width = ((max_size.width - min_size.width + 1) // CHUNK_SIZE.x) * CHUNK_SIZE.x + CHUNK_SIZE.x
-        calculated_height = ((max_size.height - min_size.height + 1) // CHUNK_SIZE.y) * CHUNK_SIZE.y + CHUNK_SIZE.y
-        return calculated_width, calculated_height
+    def _calculate_size(self, min_size: Size, max_size: Size) -> Size:
+        return field_size(min_size, max_size)
 
-    def _mount_drawable(self, drawable: Drawable) -> None:
-        self.drawables.append(drawable)
-        self.mount(drawable)
+    def _load_drawable(self, obj: dict[Any, Any], drawable_id: str, offset: Offset) -> Drawable:
+        d = {"note": Note, "box": Box}
+        drawable = cast(Drawable, d.get(obj["type"], Drawable).load(obj, drawable_id, offset))
+        drawable.record.tags = tuple(obj.get("tags", ()))
+        return drawable
+
+    def _mount_drawable(self, drawable: Drawable) -> AwaitMount:
+        return self._mount_drawables([drawable])
+
+    def _mount_drawables(self, drawables: list[Drawable]) -> AwaitMount:
+        # Groups of drawables by the drawable they are mounted below, None for the top
+        if self._stacking:
+            groups = self._stacked_groups(drawables)
+        else:
+            groups = {None: drawables}
+            self.drawables.extend(drawables)
+        for drawable in drawables:
+            if self.zoom_level:
+                drawable.set_view(*ZOOM_LEVELS[self.zoom_level])
+            if drawable.id is not None:
+                self.drawables_by_id[drawable.id] = drawable
+        self.reindex_drawables(drawables)
+        for drawable in drawables:
+            if drawable.id is not None:
+                drawable.set_filtered(self.tags.set(drawable.id, drawable.record.tags))
+                # Mounted drawables are shown until next `cull`
+                self._shown.add(drawable.id)
+        for above, group in groups.items():
+            if above is None:
+                self.mount(*group)
+            else:
+                self.mount(*group, before=above)
+        if not self._stacking:
+            # Loaded board was already fitted as a whole
+            self._fit_field()
         self.is_draggin = False
         self.can_focus = False
+        return AwaitMount(self, drawables)
+
+    def _stacked_groups(self, drawables: list[Drawable]) -> dict[Optional[Drawable], list[Drawable]]:
+        """Put drawables into `drawables` by saved stacking, grouped by drawable they go below"""
+        top = len(self._stacking)
+        keys = [self._stacking.get(x.id or "", top) for x in self.drawables]
+        groups: dict[Optional[Drawable], list[Drawable]] = {}
+        placed: list[tuple[int, Drawable]] = []
+        for drawable in sorted(drawables, key=lambda x: self._stacking.get(x.id or "", top)):
+            index = bisect_right(keys, self._stacking.get(drawable.id or "", top))
+            above = self.drawables[index] if index < len(self.drawables) else None
+            groups.setdefault(above, []).append(drawable)
+            placed.append((index, drawable))
+        # Inserted from the end, so indexes of ones not inserted yet stay valid
+        for index, drawable in reversed(placed):
+            self.drawables.insert(index, drawable)
+        return groups
+
+    def _recolor(self, drawables: list[Drawable], color: Color, part_type: str) -> list[tuple[Drawable, Color]]:
+        changes: list[tuple[Drawable, Color]] = []
+        with self.app.batch_update():
+            for drawable in drawables:
+                changes.append((drawable, drawable.get_color(part_type)))
+                drawable.change_color(color, part_type=part_type)
+        return changes
+
+    async def _remove_drawable(self, drawable: Drawable) -> None:
+        await self._remove_drawables([drawable])
+
+    async def _remove_drawables(self, drawables: list[Drawable]) -> None:
+        removed = set(drawables)
+        self.drawables = [note for note in self.drawables if note not in removed]
+        for drawable in drawables:
+            if drawable.id is not None:
+                self.drawables_by_id.pop(drawable.id, None)
+                self.selection.pop(drawable.id, None)
+                self.spatial.remove(drawable.id)
+                self.tags.remove(drawable.id)
+        self.overlapping -= removed
+        if self.focused_drawable in removed:
+            self.focused_drawable = None
+
+        # Widgets are detached in one update, field is fitted once they are gone
+        with self.app.batch_update():
+            removals = [x.remove() for x in drawables]
+        for await_remove in removals:
+            await await_remove
+        self._fit_field()
+        if len(self.drawables) == 0:
+            self.can_focus = True
+
+    def _set_overlapping(self, overlapping: set[Drawable]) -> None:
+        with self.app.batch_update():
+            for drawable in self.overlapping - overlapping:
+                drawable.remove_class("-overlapping")
+            for drawable in overlapping - self.overlapping:
+                drawable.add_class("-overlapping")
+        self.overlapping = overlapping
+
+    def _snap_delta(self, drawables: list[Drawable], delta: Offset) -> Offset:
+        if not self.snap_to_edges and not self.snap_grid:
+            return delta
+        regions = [self.spatial.get(x.id) for x in drawables if x.id is not None]
+        regions = [x for x in regions if x is not None]
+        if not regions:
+            return delta
+        bounds = Region.from_union(regions)
+        dx, dy = delta
+        if self.snap_grid.x and dx:
+            dx = self._snap_to_grid(bounds.x + dx, self.snap_grid.x, dx) - bounds.x
+        if self.snap_grid.y and dy:
+            dy = self._snap_to_grid(bounds.y + dy, self.snap_grid.y, dy) - bounds.y
+
+        if self.snap_to_edges:
+            target = bounds.translate(Offset(dx, dy))
+            moved_ids = {x.id for x in drawables}
+            neighbours = [r for key, r in self.spatial.near(target, self.snap_distance + 1) if key not in moved_ids]
+            if dx:
+                edges = [edge for r in neighbours for edge in (r.x, r.right)]
+                dx += self._snap_to_edge((target.x, target.right), edges, dx)
+            if dy:
+                edges = [edge for r in neighbours for edge in (r.y, r.bottom)]
+                dy += self._snap_to_edge((target.y, target.bottom), edges, dy)
+        return Offset(dx, dy)
+
+    @staticmethod
+    def _snap_to_grid(value: int, grid: int, direction: int) -> int:
+        # Rounded in direction of move, so it never snaps back to where it started
+        if direction > 0:
+            return -(-value // grid) * grid
+        return (value // grid) * grid
+
+    def _snap_to_edge(self, own: tuple[int, int], edges: list[int], direction: int) -> int:
+        """Additional move ahead to closest edge within snap distance"""
+        best = 0
+        for edge in edges:
+            for side in own:
+                shift = edge - side
+                if shift == 0:
+                    return 0
+                if shift * direction > 0 and abs(shift) <= self.snap_distance and (not best or abs(shift) < abs(best)):
+                    best = shift
+        return best
+
+    @staticmethod
+    def _band_region(start: Offset, end: Offset) -> Region:
+        x1, x2 = sorted((start.x, end.x))
+        y1, y2 = sorted((start.y, end.y))
+        return Region.from_corners(x1, y1, x2 + 1, y2 + 1)
+
+    def _bring_band_forward(self) -> None:
+        self._bring_layer_forward("selection-band")
+
+    def _bring_layer_forward(self, layer: str) -> None:
+        layers = tuple(x for x in self.screen.styles.layers if x != layer)
+        self.screen.styles.layers = layers + (layer,)
+
+    def _journal_snapshot(self, drawable_id: str) -> Optional[dict[str, Any]]:
+        """Drawable state as saved in notes file, None if it was removed"""
+        drawable = self.drawables_by_id.get(drawable_id)
+        if drawable is None:
+            return None
+        obj = drawable.dump()
+        obj["pos"] = tuple(drawable.offset - self.file_origin)
+        return obj
+
+    def _repaint_overview(self) -> None:
+        if ZOOM_LEVELS[self.zoom_level][1] != "canvas":
+            return
+        self.overview.paint([x.record for x in self.drawables if not x.filtered_out], self.zoom, self.field_size)
+
+    def _set_field_size(self, size: Size) -> None:
+        # Field size is kept in board cells, styles are in screen cells
+        self.field_size = size
+        scale = self.zoom
+        self.styles.width = -(-size.width // scale)
+        self.styles.height = -(-size.height // scale)
 
     async def _move_play_area(self, offset: Offset) -> None:
         self.offset = self.offset + offset
-
-    async def _resize_field_to_drawable(self, drawable: Drawable, offset: Offset = Offset(0, 0)) -> None:
-        xx, yy = offset.x, offset.y
-        if drawable.region.right + xx >= self.region.right:
-            self.styles.width = self.styles.width.value + CHUNK_SIZE.x
-
-        if drawable.region.bottom + yy >= self.region.bottom:
-            self.styles.height = self.styles.height.value + CHUNK_SIZE.y
-
-        if drawable.region.x + xx <= self.region.x:
-            self.styles.width = self.styles.width.value + CHUNK_SIZE.x
-            self.styles.offset = (self.styles.offset.x.value - CHUNK_SIZE.x, self.styles.offset.y.value)
-            for child in self.children:
-                child.styles.offset = (child.styles.offset.x.value + CHUNK_SIZE.x, child.styles.offset.y.value)
-
-        if drawable.region.y + yy <= self.region.y:
-            self.styles.height = self.styles.height.value + CHUNK_SIZE.y
-            self.styles.offset = (self.styles.offset.x.value, self.styles.offset.y.value - CHUNK_SIZE.y)
-            for child in self.children:
-                child.styles.offset = (child.styles.offset.x.value, child.styles.offset.y.value + CHUNK_SIZE.y)
+        self._cull_after_refresh()
+
+    def _fit_field(self) -> None:
+        """Resize field to chunk aligned extent of all drawables in one update, growing or shrinking"""
+        width, height = self._calculate_size(Size(0, 0), MIN_FIELD_EXTENT)
+        bounds = self.spatial.bounds()
+        if bounds is not None:
+            # Shifting touches every drawable, so some empty space is kept on left and top
+            shift = Offset(self._field_shift(bounds.x, CHUNK_SIZE.x), self._field_shift(bounds.y, CHUNK_SIZE.y))
+            if shift:
+                self._shift_drawables(shift)
+            # Field size includes border, so one chunk past drawables leaves space inside
+            width = max(width, bounds.right + shift.x + CHUNK_SIZE.x)
+            height = max(height, bounds.bottom + shift.y + CHUNK_SIZE.y)
+        if (width, height) != self.field_size:
+            self._set_field_size(Size(width, height))
+
+    def _field_shift(self, start: int, chunk: int) -> int:
+        """Shift of drawables that brings `start` of them close to the field edge
+
+        Field moves back by shift divided by zoom scale, so shift is kept divisible
+        by it as well as by chunk, otherwise drawables would drift on screen.
+        """
+        step = chunk * self.zoom // math.gcd(chunk, self.zoom)
+        if 0 <= start <= step:
+            return 0
+        return -(start // step) * step
+
+    def _shift_drawables(self, shift: Offset) -> None:
+        # Field moves the other way, so drawables stay in place on screen
+        scale = self.zoom
+        self.styles.offset = (
+            self.styles.offset.x.value - shift.x // scale,
+            self.styles.offset.y.value - shift.y // scale,
+        )
+        for drawable in self.drawables:
+            drawable.offset = drawable.offset + shift
+        self.spatial.translate(shift)
+        self.file_origin += shift
+        self._cull_after_refresh()
 
     def dump(self) -> dict[str, Any]:
         return {
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+from textual.color import Color, ColorParseError
+
+# Version written to saved boards, files without it are version 0
+BOARD_VERSION = 1
+# Keys of board file that are not drawables
+BOARD_KEYS = ("version", "background", "layers")
+
+BORDERS = [
+    "outer",
+    "ascii",
+    "round",
+    "solid",
+    "double",
+    "dashed",
+    "heavy",
+    "hkey",
+    "vkey",
+    "none",
+]
+
+# Text fields each drawable type needs besides `body`
+TEXT_FIELDS = {"drawable": (), "note": ("title",), "box": ("border_type",)}
+COLOR_FIELDS = {"drawable": ("color",), "note": ("color",), "box": ("color", "border_color")}
+
+Migration = Callable[[Dict[str, Any]], Dict[str, Any]]
+# Functions upgrading board from version given by key to the next one
+MIGRATIONS: dict[int, Migration] = {}
+
+
+def migration(version: int) -> Callable[[Migration], Migration]:
+    def register(function: Migration) -> Migration:
+        MIGRATIONS[version] = function
+        return function
+
+    return register
+
+
+@migration(0)
+def _integer_geometry(obj: dict[str, Any]) -> dict[str, Any]:
+    # Version 0 saved positions and sizes straight from Textual styles, as floats
+    for key, value in obj.items():
+        if key in BOARD_KEYS or not isinstance(value, dict):
+            continue
+        for field in ("pos", "size"):
+            pair = value.get(field)  # type: ignore
+            if isinstance(pair, list):
+                value[field] = [round(x) if isinstance(x, float) else x for x in pair]  # type: ignore
+    return obj
+
+
+def migrate(obj: dict[str, Any]) -> dict[str, Any]:
+    version = obj.get("version", 0)
+    if not isinstance(version, int) or version > BOARD_VERSION:
+        raise ValueError(f"Board version {version!r} is not supported, newest known is {BOARD_VERSION}")
+    while version < BOARD_VERSION:
+        obj = MIGRATIONS[version](obj)
+        version += 1
+    return obj
+
+
+def _is_pair(value: Any) -> bool:
+    if not isinstance(value, (list, tuple)) or len(value) != 2:  # type: ignore
+        return False
+    return all(isinstance(x, int) and not isinstance(x, bool) for x in value)  # type: ignore
+
+
+def _color_error(value: Any) -> bool:
+    if not isinstance(value, str):
+        return True
+    try:
+        Color.parse(value)
+    except ColorParseError:
+        return True
+    return False
+
+
+def check_drawable(value: Any) -> Optional[str]:
+    """Reason why `value` can not be loaded as drawable, None if it can"""
+    if not isinstance(value, dict):
+        return "not an object"
+    drawable_type = value.get("type")  # type: ignore
+    if drawable_type not in TEXT_FIELDS:
+        return f"unknown type {drawable_type!r}"
+    for field in ("body", *TEXT_FIELDS[drawable_type]):
+        if not isinstance(value.get(field), str):  # type: ignore
+            return f"{field} is missing or not text"
+    for field in COLOR_FIELDS[drawable_type]:
+        if _color_error(value.get(field)):  # type: ignore
+            return f"{field} is missing or not a color"
+    if drawable_type == "box" and value["border_type"] not in BORDERS:
+        return f"unknown border type {value['border_type']!r}"
+    tags = value.get("tags", [])  # type: ignore
+    if not isinstance(tags, list) or not all(isinstance(x, str) for x in tags):  # type: ignore
+        return "tags are not a list of text"
+    if not _is_pair(value.get("pos")):  # type: ignore
+        return "pos is missing or not a pair of integers"
+    size = value.get("size")  # type: ignore
+    if not _is_pair(size) or size[0] < 1 or size[1] < 1:
+        return "size is missing or not a pair of positive integers"
+    return None
+
+
+def check_background(value: Any) -> Optional[str]:
+    if not isinstance(value, dict):
+        return "not an object"
+    for field in ("color", "border_color"):
+        if _color_error(value.get(field)):  # type: ignore
+            return f"{field} is missing or not a color"
+    if not isinstance(value.get("type"), str):  # type: ignore
+        return "type is missing or not text"
+    return None
+
+
+def parse_board(obj: Any, quarantined: dict[str, Any]) -> dict[str, Any]:
+    """Board migrated to current version, with invalid entries moved to `quarantined`
+
+    Every entry is checked once, drawables missing from `layers` are put on top
+    and `layers` is left with ids of valid drawables only.
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("Board is not a JSON object")
+    if not obj:
+        return obj
+    obj = migrate(obj)  # type: ignore
+
+    board: dict[str, Any] = {"version": BOARD_VERSION}
+    background = obj.get("background")
+    if background is not None:
+        error = check_background(background)
+        if error is None:
+            board["background"] = background
+        else:
+            quarantined["background"] = {"error": error, "value": background}
+
+    for key, value in obj.items():
+        if key in BOARD_KEYS:
+            continue
+        error = check_drawable(value)
+        if error is None:
+            board[key] = value
+        else:
+            quarantined[key] = {"error": error, "value": value}
+
+    layers = obj.get("layers")
+    ordered: dict[str, None] = {}
+    if isinstance(layers, list):
+        ordered = {x: None for x in layers if isinstance(x, str) and x in board and x not in BOARD_KEYS}  # type: ignore
+    board["layers"] = [*ordered, *(x for x in board if x not in BOARD_KEYS and x not in ordered)]
+    return board
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+from textual.geometry import Size
+from textual.pilot import Pilot
+
+from notesh.main import NoteApp
+from notesh.play_area import field_size
+from notesh.tools import read_checked_board
+from notesh.utils import BOARD_ERRORS, COMPRESSORS, calculate_board_size
+
+BOARD_SUFFIXES = (".json", *COMPRESSORS)
+
+
+def snapshot_name(file_name: str) -> str:
+    """Name of SVG for board, `notes.json.gz` gives `notes.svg`"""
+    name = Path(file_name).name
+    while Path(name).suffix in BOARD_SUFFIXES:
+        name = name[: -len(Path(name).suffix)]
+    return f"{name}.svg"
+
+
+def snapshot_names(file_names: list[str]) -> dict[str, str]:
+    """Names of SVGs for boards, which are different even for boards with the same name
+
+    Boards with the same name get path from directory common to them in SVG name
+    instead, `a/notes.json` and `b/notes.json` give `a-notes.svg` and `b-notes.svg`.
+    Boards which would still get the same SVG (like `notes.json` and `notes.json.gz`) raise ValueError.
+    """
+    names = {x: snapshot_name(x) for x in file_names}
+    counts = Counter(names.values())
+    repeated = [x for x in names if counts[names[x]] > 1]
+    if repeated:
+        common = os.path.commonpath([os.path.dirname(os.path.abspath(x)) for x in repeated])
+        for file_name in repeated:
+            names[file_name] = snapshot_name(os.path.relpath(os.path.abspath(file_name), common).replace(os.sep, "-"))
+    counts = Counter(names.values())
+    clashing = sorted(x for x in names if counts[names[x]] > 1)
+    if clashing:
+        raise ValueError(f"Boards would be saved to the same snapshot: {', '.join(clashing)}")
+    return names
+
+
+def _screen_size(file_name: str) -> Size:
+    """Screen as big as the field NoteApp makes for board, read without putting invalid entries aside"""
+    try:
+        board, _ = read_checked_board(file_name)
+    except BOARD_ERRORS:
+        # NoteApp starts with empty board then
+        board = {}
+    return field_size(*calculate_board_size(board))
+
+
+def _render_board(file_name: str, output: str, size: Size) -> Optional[Size]:
+    """Write SVG of board loaded in headless NoteApp with screen of `size`
+
+    Returns size of PlayArea instead, without writing anything, if it is not as big as the screen.
+    """
+    app = NoteApp(file=file_name, performance="on")
+    written: list[str] = []
+    needed: list[Size] = []
+
+    async def auto_pilot(pilot: Pilot[None]) -> None:
+        await app.loaded.wait()
+        await pilot.wait_for_scheduled_animations()
+        app.footer.display = False
+        await pilot.pause()
+        if app.play_area.outer_size != app.size:
+            needed.append(app.play_area.outer_size)
+            app.exit()
+            return
+        # Field is as big as the screen, it is not centered but shown from its top left corner
+        app.play_area.styles.offset = (0, 0)
+        await pilot.pause()
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(app.export_screenshot(title=Path(file_name).name))
+        written.append(output)
+        app.exit()
+
+    app.run(headless=True, size=(size.width, size.height), auto_pilot=auto_pilot)
+    if needed:
+        return needed[0]
+    if not written:
+        # App prints error of its own and just stops
+        raise RuntimeError(f"Board was not rendered, see output of {file_name}")
+    return None
+
+
+def snapshot_board(file_name: str, output: str) -> float:
+    """Write SVG of whole PlayArea with board from `file_name` to `output`, returns seconds it took
+
+    Board is loaded in headless NoteApp with screen as big as the field, found from the file.
+    Field can still differ from it, for example by unsaved changes in journal, and then
+    board is loaded once more with screen of the size field had.
+    """
+    start = time.perf_counter()
+    if not os.path.exists(file_name):
+        raise FileNotFoundError(file_name)
+    size = _render_board(file_name, output, _screen_size(file_name))
+    if size is not None and _render_board(file_name, output, size) is not None:
+        raise RuntimeError(f"Field of {file_name} changed size between loads")
+    return time.perf_counter() - start
+
+
+def snapshot_boards(file_names: list[str], output_dir: str, jobs: Optional[int] = None) -> int:
+    """Snapshot boards in parallel processes, printing each one when done, returns number of failed
+
+    Raises ValueError before rendering anything if boards would overwrite snapshots of each other.
+    """
+    file_names = list(dict.fromkeys(file_names))
+    outputs = {name: os.path.join(output_dir, svg) for name, svg in snapshot_names(file_names).items()}
+    os.makedirs(output_dir, exist_ok=True)
+    failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(snapshot_board, name, outputs[name]): name for name in file_names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                seconds = future.result()
+            except Exception as error:
+                failed += 1
+                print(f"{name}: failed, {type(error).__name__}: {error}", flush=True)
+                continue
+            print(f"{name}: {outputs[name]} in {seconds:.2f}s", flush=True)
+    print(f"{len(file_names) - failed}/{len(file_names)} boards in {time.perf_counter() - start:.2f}s", flush=True)
+    return failed
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import Collection, Iterator
+
+from textual.geometry import Offset, Region, Size
+
+
+class SpatialIndex:
+    """Drawable regions bucketed by board chunks they cover
+
+    Regions are given in PlayArea content coordinates. When the board grows
+    to the left or top all drawables are shifted, which is handled
+    by `translate` without touching the buckets. Numbers of used buckets
+    in every chunk column and row are kept, so `bounds` does not look at regions.
+    """
+
+    def __init__(self, chunk: Offset) -> None:
+        self.chunk = chunk
+        self.buckets: dict[tuple[int, int], set[str]] = {}
+        self.regions: dict[str, Region] = {}
+        self._columns: dict[int, int] = {}
+        self._rows: dict[int, int] = {}
+        self._origin = Offset(0, 0)
+        # Bumped on every change, so results of queries can be cached
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.regions
+
+    def _chunks(self, region: Region) -> Iterator[tuple[int, int]]:
+        cw, ch = self.chunk
+        x1, y1 = region.x // cw, region.y // ch
+        x2, y2 = (region.right - 1) // cw, (region.bottom - 1) // ch
+        for cx in range(x1, max(x1, x2) + 1):
+            for cy in range(y1, max(y1, y2) + 1):
+                yield cx, cy
+
+    def insert(self, key: str, region: Region) -> None:
+        region = region.translate(-self._origin)
+        old = self.regions.get(key)
+        if old == region:
+            return
+        if old is not None:
+            self._discard(key, old)
+        self.version += 1
+        self.regions[key] = region
+        for chunk in self._chunks(region):
+            bucket = self.buckets.get(chunk)
+            if bucket is None:
+                bucket = self.buckets[chunk] = set()
+                self._count_chunk(chunk, 1)
+            bucket.add(key)
+
+    def remove(self, key: str) -> None:
+        old = self.regions.pop(key, None)
+        if old is not None:
+            self.version += 1
+            self._discard(key, old)
+
+    def clear(self) -> None:
+        self.buckets.clear()
+        self.regions.clear()
+        self._columns.clear()
+        self._rows.clear()
+        self._origin = Offset(0, 0)
+        self.version += 1
+
+    def translate(self, delta: Offset) -> None:
+        """Move every region by `delta`"""
+        self._origin += delta
+        self.version += 1
+
+    def bounds(self) -> Region | None:
+        """Smallest region made of whole chunks that covers all regions, None if there are none"""
+        if not self.buckets:
+            return None
+        cw, ch = self.chunk
+        x1, y1 = min(self._columns) * cw, min(self._rows) * ch
+        x2, y2 = (max(self._columns) + 1) * cw, (max(self._rows) + 1) * ch
+        return Region.from_corners(x1, y1, x2, y2).translate(self._origin)
+
+    def get(self, key: str) -> Region | None:
+        region = self.regions.get(key)
+        return None if region is None else region.translate(self._origin)
+
+    def candidates(self, region: Region) -> set[str]:
+        """Keys from chunks covered by `region`, superset of overlapping ones"""
+        found: set[str] = set()
+        for chunk in self._chunks(region.translate(-self._origin)):
+            bucket = self.buckets.get(chunk)
+            if bucket:
+                found |= bucket
+        return found
+
+    def query(self, region: Region) -> list[str]:
+        """Keys with regions overlapping `region`"""
+        local = region.translate(-self._origin)
+        return [key for key in self.candidates(region) if self.regions[key].overlaps(local)]
+
+    def near(self, region: Region, margin: int) -> list[tuple[str, Region]]:
+        """Keys with regions closer to `region` than `margin` cells, with their regions"""
+        grown = region.grow((margin, margin, margin, margin))
+        return [(key, self.regions[key].translate(self._origin)) for key in self.query(grown)]
+
+    def free_region(self, size: Size, near: Offset, ignore: Collection[str] = ()) -> Region:
+        """Region of `size` closest to `near` that overlaps no regions other than `ignore`d ones
+
+        Places right and below `near` are tried in whole chunk steps, the last of them
+        is past `bounds`, so there always is one.
+        """
+        region = Region(near.x, near.y, size.width, size.height)
+        bounds = self.bounds()
+        if bounds is None or self._is_free(region, ignore):
+            return region
+        cw, ch = self.chunk
+        columns = max(0, (bounds.right - near.x) // cw + 1)
+        rows = max(0, (bounds.bottom - near.y) // ch + 1)
+        steps = sorted(
+            ((x, y) for x in range(columns + 1) for y in range(rows + 1)),
+            key=lambda step: (step[0] * cw) ** 2 + (step[1] * ch) ** 2,
+        )
+        for x, y in steps:
+            moved = region.translate(Offset(x * cw, y * ch))
+            if self._is_free(moved, ignore):
+                return moved
+        return region.translate(Offset(columns * cw, 0))
+
+    def _is_free(self, region: Region, ignore: Collection[str]) -> bool:
+        return all(key in ignore for key in self.query(region))
+
+    def _discard(self, key: str, region: Region) -> None:
+        for chunk in self._chunks(region):
+            bucket = self.buckets.get(chunk)
+            if bucket is None:
+                continue
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[chunk]
+                self._count_chunk(chunk, -1)
+
+    def _count_chunk(self, chunk: tuple[int, int], change: int) -> None:
+        for counts, index in ((self._columns, chunk[0]), (self._rows, chunk[1])):
+            count = counts.get(index, 0) + change
+            if count:
+                counts[index] = count
+            else:
+                del counts[index]
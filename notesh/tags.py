@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator, Optional
+
+
+def parse_tags(text: str) -> tuple[str, ...]:
+    """Tags from text separated by commas or spaces, without repeats"""
+    return tuple(dict.fromkeys(x for x in re.split(r"[,\s]+", text) if x))
+
+
+class TagIndex:
+    """Tags of drawables kept as bitsets over drawable ordinals
+
+    Every drawable gets an ordinal (reused after it is removed), so drawables
+    with a tag are bits of one int and filtering is done with bitwise ops
+    instead of looking at every drawable.
+    """
+
+    def __init__(self) -> None:
+        self.ordinals: dict[str, int] = {}
+        self.bits: dict[str, int] = {}
+        # Drawables in index and drawables hidden by current filter
+        self.used = 0
+        self.hidden = 0
+        self.filter: tuple[str, ...] = ()
+        self._ids: list[Optional[str]] = []
+        self._free: list[int] = []
+        self._tags: dict[str, tuple[str, ...]] = {}
+
+    def set(self, drawable_id: str, tags: tuple[str, ...]) -> bool:
+        """Set tags of drawable, returns if it is hidden by current filter with them"""
+        ordinal = self.ordinals.get(drawable_id)
+        if ordinal is None:
+            ordinal = self._free.pop() if self._free else len(self._ids)
+            if ordinal == len(self._ids):
+                self._ids.append(drawable_id)
+            else:
+                self._ids[ordinal] = drawable_id
+            self.ordinals[drawable_id] = ordinal
+            self.used |= 1 << ordinal
+        self._unset_tags(drawable_id, 1 << ordinal)
+        for tag in tags:
+            self.bits[tag] = self.bits.get(tag, 0) | 1 << ordinal
+        self._tags[drawable_id] = tags
+        bit = 1 << ordinal
+        if self.filter and not any(tag in self.filter for tag in tags):
+            self.hidden |= bit
+        else:
+            self.hidden &= ~bit
+        return bool(self.hidden & bit)
+
+    def remove(self, drawable_id: str) -> None:
+        ordinal = self.ordinals.pop(drawable_id, None)
+        if ordinal is None:
+            return
+        bit = 1 << ordinal
+        self._unset_tags(drawable_id, bit)
+        self._tags.pop(drawable_id, None)
+        self.used &= ~bit
+        self.hidden &= ~bit
+        self._ids[ordinal] = None
+        self._free.append(ordinal)
+
+    def clear(self) -> None:
+        self.ordinals.clear()
+        self.bits.clear()
+        self.used = self.hidden = 0
+        self.filter = ()
+        self._ids.clear()
+        self._free.clear()
+        self._tags.clear()
+
+    def names(self) -> list[str]:
+        return sorted(self.bits)
+
+    def tags_of(self, drawable_id: str) -> tuple[str, ...]:
+        return self._tags.get(drawable_id, ())
+
+    def is_hidden(self, drawable_id: str) -> bool:
+        ordinal = self.ordinals.get(drawable_id)
+        return ordinal is not None and bool(self.hidden >> ordinal & 1)
+
+    def apply_filter(self, tags: Iterable[str]) -> tuple[list[str], list[str]]:
+        """Show only drawables with any of `tags` (all if none given), returns ids to hide and to show
+
+        Only drawables which visibility changed are returned.
+        """
+        self.filter = tuple(tags)
+        matching = 0
+        for tag in self.filter:
+            matching |= self.bits.get(tag, 0)
+        hidden = self.used & ~matching if self.filter else 0
+        changed = hidden ^ self.hidden
+        self.hidden = hidden
+        return list(self._ids_of(changed & hidden)), list(self._ids_of(changed & ~hidden))
+
+    def _unset_tags(self, drawable_id: str, bit: int) -> None:
+        for tag in self._tags.get(drawable_id, ()):
+            bits = self.bits[tag] & ~bit
+            if bits:
+                self.bits[tag] = bits
+            else:
+                del self.bits[tag]
+
+    def _ids_of(self, bits: int) -> Iterator[str]:
+        while bits:
+            lowest = bits & -bits
+            drawable_id = self._ids[lowest.bit_length() - 1]
+            if drawable_id is not None:
+                yield drawable_id
+            bits ^= lowest
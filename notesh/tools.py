@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from textual.geometry import Offset
+
+from notesh.model import DrawableRecord
+from notesh.schema import parse_board
+from notesh.utils import (
+    COMPRESSORS,
+    calculate_board_size,
+    generate_drawable_id,
+    open_board,
+    save_drawables,
+    split_board,
+)
+
+TOOL_ACTIONS = ("validate", "convert", "bounds", "merge")
+BOARD_FORMATS = ("json", *(f"json{suffix}" for suffix in COMPRESSORS))
+# Empty columns between boards put next to each other by `merge`
+MERGE_GAP = 4
+
+Board = Tuple[List[Tuple[str, Dict[Any, Any]]], Optional[Dict[Any, Any]]]
+
+
+def board_files(directory: str) -> list[str]:
+    """Board files in directory and its subdirectories, without quarantine files kept next to boards
+
+    Path of single file is returned as it is.
+    """
+    if Path(directory).is_file():
+        return [directory]
+    return sorted(
+        str(path)
+        for path in Path(directory).rglob("*")
+        if path.is_file()
+        and any(path.name.endswith(f".{x}") for x in BOARD_FORMATS)
+        and not path.name.endswith(".quarantine.json")
+    )
+
+
+def board_stem(file_name: str) -> str:
+    """File name without board format, `notes.json.gz` gives `notes`"""
+    for board_format in sorted(BOARD_FORMATS, key=len, reverse=True):
+        if file_name.endswith(f".{board_format}"):
+            return file_name[: -len(board_format) - 1]
+    return file_name
+
+
+def read_checked_board(file_name: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Board checked like it is checked when loaded and its invalid entries, which are not put aside"""
+    quarantined: dict[str, Any] = {}
+    with open_board(file_name) as file:
+        board = parse_board(json.load(file), quarantined)
+    return board, quarantined
+
+
+def _invalid_entries(quarantined: dict[str, Any]) -> str:
+    errors = ", ".join(f"{key} ({entry['error']})" for key, entry in quarantined.items())
+    return f"{len(quarantined)} invalid: {errors}"
+
+
+def load_valid_board(file_name: str) -> Board:
+    """Drawables and background of board, raises ValueError if any entry of it is invalid
+
+    Tools change or combine boards, so they don't leave out entries NoteSH would put aside.
+    Board is checked here instead of loaded with `load_drawables`, which would save
+    invalid entries aside in quarantine file next to it.
+    """
+    board, quarantined = read_checked_board(file_name)
+    if quarantined:
+        raise ValueError(_invalid_entries(quarantined))
+    return split_board(board)
+
+
+def validate_board(file_name: str) -> tuple[bool, str]:
+    """Check board like it is checked when loaded, but without putting invalid entries aside"""
+    board, quarantined = read_checked_board(file_name)
+    count = len(board.get("layers", ()))
+    if not quarantined:
+        return True, f"{count} drawables"
+    return False, f"{count} drawables, {_invalid_entries(quarantined)}"
+
+
+def convert_board(file_name: str, board_format: str, force: bool = False) -> tuple[bool, str]:
+    """Save board again in another format, next to the original one
+
+    Existing file of that format is not overwritten unless `force` is given.
+    """
+    output = f"{board_stem(file_name)}.{board_format}"
+    if output == file_name:
+        return True, "already in this format"
+    if not force and Path(output).exists():
+        return False, f"{output} already exists, use --force to overwrite it"
+    drawables, background = load_valid_board(file_name)
+    records = [DrawableRecord.load(drawable_id, obj) for drawable_id, obj in drawables]
+    save_drawables(output, records, [x.id for x in records], background)
+    return True, f"saved as {output}"
+
+
+def board_bounds(file_name: str) -> tuple[bool, str]:
+    """Extent of board that NoteSH makes field for when loading it"""
+    drawables, _ = load_valid_board(file_name)
+    min_size, max_size = calculate_board_size(dict(drawables))
+    width, height = max_size - min_size
+    return True, f"{min_size.width},{min_size.height} to {max_size.width},{max_size.height} ({width}x{height})"
+
+
+def merge_boards(boards: list[Board], output: str) -> int:
+    """Save boards as one, each put right of the previous one, returns number of drawables
+
+    Drawable ids already used by earlier boards are replaced with new ones.
+    """
+    records: list[DrawableRecord] = []
+    used: set[str] = set()
+    # Short new ids must not take ids of drawables from boards merged later
+    taken = {drawable_id for drawables, _ in boards for drawable_id, _ in drawables}
+    merged_background: Optional[dict[Any, Any]] = None
+    left = 0
+    for drawables, background in boards:
+        if not drawables:
+            continue
+        if merged_background is None:
+            merged_background = background
+        min_size, max_size = calculate_board_size(dict(drawables))
+        for drawable_id, obj in drawables:
+            if drawable_id in used:
+                drawable_id = generate_drawable_id()
+                while drawable_id in taken:
+                    drawable_id = generate_drawable_id()
+                taken.add(drawable_id)
+            used.add(drawable_id)
+            record = DrawableRecord.load(drawable_id, obj)
+            record.pos = Offset(record.x - min_size.width + left, record.y - min_size.height)
+            records.append(record)
+        left += max_size.width - min_size.width + MERGE_GAP
+    save_drawables(output, records, [x.id for x in records], merged_background)
+    return len(records)
+
+
+def run_tools(
+    action: str,
+    directory: str,
+    jobs: Optional[int] = None,
+    board_format: str = "json",
+    output: Optional[str] = None,
+    force: bool = False,
+) -> int:
+    """Run `action` on every board in directory in parallel processes, returns number of failed boards
+
+    Progress is printed as boards are done. `merge` reads boards in parallel
+    and saves them to `output` at the end, in order of file names, only if all of them were read.
+    Boards with invalid entries fail, see `load_valid_board`.
+    """
+    if action not in TOOL_ACTIONS:
+        raise ValueError(f"Action must be one of {', '.join(TOOL_ACTIONS)}, not {action!r}")
+    if action == "merge" and output is None:
+        raise ValueError("Merge needs output file")
+    # Merged board saved in the same directory is not merged into itself on next run
+    skipped = Path(output).resolve() if output is not None else None
+    file_names = [x for x in board_files(directory) if Path(x).resolve() != skipped]
+    total = len(file_names)
+    failed = 0
+    loaded: dict[str, Board] = {}
+    start = time.perf_counter()
+    function: Callable[..., Any] = {
+        "validate": validate_board,
+        "convert": convert_board,
+        "bounds": board_bounds,
+        "merge": load_valid_board,
+    }[action]
+    args = (board_format, force) if action == "convert" else ()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(function, name, *args): name for name in file_names}
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as error:
+                failed += 1
+                print(f"[{done}/{total}] {name}: failed, {type(error).__name__}: {error}", flush=True)
+                continue
+            if action == "merge":
+                loaded[name] = result
+                ok, message = True, f"{len(result[0])} drawables"
+            else:
+                ok, message = result
+            failed += not ok
+            print(f"[{done}/{total}] {name}: {message}", flush=True)
+    if action == "merge" and output is not None and failed:
+        print(f"Not merged into {output}, {failed} boards failed", flush=True)
+    elif action == "merge" and output is not None:
+        count = merge_boards([loaded[x] for x in file_names if x in loaded], output)
+        print(f"Merged {count} drawables from {len(loaded)} boards into {output}", flush=True)
+    print(f"{total - failed}/{total} boards in {time.perf_counter() - start:.2f}s", flush=True)
+    return failed
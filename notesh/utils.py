@@ -1,39 +1,198 @@
 from __future__ import annotations
 
+import gzip
+import hashlib
 import json
+import lzma
 import os
 from pathlib import Path
 import sys
+import tempfile
+import threading
 import uuid
+from contextlib import contextmanager
 from functools import partial
-from typing import TYPE_CHECKING, Any, Callable, Coroutine, Optional, Union
+from typing import IO, TYPE_CHECKING, Any, Callable, Coroutine, Iterator, Optional, Union
 from textual.app import App
 
 import tomli
 from textual.geometry import Size
 
+from notesh.schema import BOARD_KEYS, BOARD_VERSION, parse_board
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
 if TYPE_CHECKING:
     from textual.containers import Container
 
-    from notesh.drawables.drawable import Drawable
+    from notesh.model import DrawableRecord
 
 
 def generate_short_uuid() -> str:
     return uuid.uuid4().hex[:4]
 
 
+def generate_drawable_id() -> str:
+    """New id of drawable, drawables of all types get ids like notes"""
+    return f"note-{generate_short_uuid()}"
+
+
+def _canonical(value: Any) -> Any:
+    # Same state can be saved in different forms, eg. floats from styles
+    # as ints and colors in other case, which should not change the stamp
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(x) for x in value]  # type: ignore
+    if isinstance(value, dict):
+        return {
+            k: v.upper() if isinstance(v, str) and k.endswith("color") else _canonical(v)
+            for k, v in value.items()  # type: ignore
+        }
+    return value
+
+
+def drawable_stamp(obj: dict[str, Any]) -> str:
+    """Short hash of drawable state saved by `dump`, equal for equal content"""
+    return hashlib.blake2b(json.dumps(_canonical(obj), sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+# One lock file for all boards in a directory, so boards do not get a lock file each
+LOCK_NAME = ".notesh.lock"
+
+
+# Lock files held by each thread, taking one again inside does not wait for itself
+_held_locks = threading.local()
+
+
+@contextmanager
+def lock_file(file_name: str) -> Iterator[None]:
+    """Advisory lock between notesh processes, held on `LOCK_NAME` file in directory of notes file
+
+    Lock is re-entrant within one thread, so saving can read the board (and quarantine it) under it.
+    """
+    directory = Path(file_name).parent
+    directory.mkdir(parents=True, exist_ok=True)
+    lock_name = str((directory / LOCK_NAME).resolve())
+    if not hasattr(_held_locks, "names"):
+        _held_locks.names = set()
+    held: set[str] = _held_locks.names
+    if lock_name in held:
+        yield
+        return
+    with open(lock_name, "a+") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        held.add(lock_name)
+        try:
+            yield
+        finally:
+            held.discard(lock_name)
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Compressed boards are detected by extension, eg. `notes.json.gz`
+COMPRESSORS: dict[str, Callable[..., IO[Any]]] = {".gz": gzip.open, ".xz": lzma.open}
+DECOMPRESSORS: dict[str, Callable[[bytes], bytes]] = {".gz": gzip.decompress, ".xz": lzma.decompress}
+# Raised by reading board that is broken as a whole: bad JSON or compression, or unsupported version
+# (gzip has BadGzipFile, subclass of OSError, since Python 3.8)
+BOARD_ERRORS = (ValueError, EOFError, getattr(gzip, "BadGzipFile", OSError), lzma.LZMAError)
+
+
+def is_compressed(file_name: str) -> bool:
+    return Path(file_name).suffix in COMPRESSORS
+
+
+def open_board(file_name: str, mode: str = "r", board_name: Optional[str] = None) -> IO[str]:
+    """Open board file as text, through (de)compressor matching `board_name` extension
+
+    Compressed files are streamed, so the whole compressed content is never kept in memory.
+    """
+    compressor = COMPRESSORS.get(Path(board_name or file_name).suffix)
+    if compressor is None:
+        return open(file_name, mode)
+    return compressor(file_name, f"{mode}t", encoding="utf-8")
+
+
+def decode_board(data: bytes, file_name: str, quarantined: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """Parse board from raw file content"""
+    decompress = DECOMPRESSORS.get(Path(file_name).suffix)
+    if decompress is not None:
+        data = decompress(data)
+    return _parse_board(json.loads(data), file_name, quarantined)
+
+
+def _parse_board(obj: Any, file_name: str, quarantined: Optional[dict[str, Any]]) -> dict[str, Any]:
+    found: dict[str, Any] = {}
+    board = parse_board(obj, found)
+    if found:
+        save_quarantined(file_name, found)
+        if quarantined is not None:
+            quarantined.update(found)
+    return board
+
+
+def save_quarantined(file_name: str, entries: dict[str, Any]) -> str:
+    """Keep invalid board entries in file next to notes, so they are not lost when board is saved"""
+    quarantine_name = f"{file_name}.quarantine.json"
+    with lock_file(file_name):
+        saved: dict[str, Any] = {}
+        try:
+            with open(quarantine_name, encoding="utf-8") as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            pass
+        saved.update(entries)
+        handle, temp_name = tempfile.mkstemp(
+            prefix=f"{Path(quarantine_name).name}.", suffix=".tmp", dir=Path(file_name).parent
+        )
+        with open(handle, "w", encoding="utf-8") as file:
+            json.dump(saved, file, indent=4)
+        os.replace(temp_name, quarantine_name)
+    return quarantine_name
+
+
+def quarantine_board(file_name: str) -> str:
+    """Move board that can not be read at all aside, so it is not overwritten by next save"""
+    with lock_file(file_name):
+        index = 0
+        while True:
+            index += 1
+            quarantine_name = f"{file_name}.broken-{index}"
+            if not os.path.exists(quarantine_name):
+                break
+        os.replace(file_name, quarantine_name)
+    return quarantine_name
+
+
 def calculate_size_for_file(file_name: str) -> tuple[Size, Size]:
     if not os.path.exists(file_name):
         return Size(0, 0), Size(50, 20)
 
-    with open(file_name, "r") as file:
-        obj = json.load(file)
+    return calculate_board_size(read_board(file_name))
+
 
-    keys = [x for x in obj.keys() if x not in ["background", "layers"]]
+def calculate_board_size(obj: dict[str, Any]) -> tuple[Size, Size]:
+    keys = [x for x in obj.keys() if x not in BOARD_KEYS]
 
     mxx, mxy = -sys.maxsize, -sys.maxsize
     mnx, mny = sys.maxsize, sys.maxsize
-    for drawable in sorted(keys, key=lambda x: obj["layers"].index(x)):
+    for drawable in keys:
         mxx = max(mxx, obj[drawable]["pos"][0] + obj[drawable]["size"][0])
         mnx = min(mnx, obj[drawable]["pos"][0])
         mxy = max(mxy, obj[drawable]["pos"][1] + obj[drawable]["size"][1])
@@ -48,33 +207,59 @@ def calculate_size_for_file(file_name: str) -> tuple[Size, Size]:
 
 
 def save_drawables(
-    file_name: str, drawables: list[Drawable], layers: list[str], background: Optional[dict[Any, Any]] = None
-) -> None:
-    obj: dict[str, Any] = {"layers": []}
+    file_name: str,
+    records: list[DrawableRecord],
+    layers: list[str],
+    background: Optional[dict[Any, Any]] = None,
+    merge: Optional[Callable[[dict[str, Any], dict[str, Any]], dict[str, Any]]] = None,
+) -> dict[str, Any]:
+    """Write board to file and return what was written
+
+    With `merge` the board is combined with current file content under lock,
+    so saves from other processes are not lost.
+    """
+    obj: dict[str, Any] = {"version": BOARD_VERSION, "layers": []}
     layers_set: set[str] = set()
-    drawable: Drawable
-    for drawable in drawables:
-        if drawable.id is None:
-            continue
-        obj[drawable.id] = drawable.dump()
-        layers_set.add(drawable.id)
+    for record in records:
+        obj[record.id] = record.dump()
+        layers_set.add(record.id)
 
     obj["layers"].extend([x for x in layers if x in layers_set])
     if background is not None:
         obj["background"] = background
 
-    Path(file_name).parent.mkdir(parents=True, exist_ok=True)
-    with open(file_name, "w") as file:
-        json.dump(obj, file, indent=4)
+    with lock_file(file_name):
+        if merge is not None:
+            obj = merge(obj, read_board(file_name))
+        # Written next to file and replaced, so readers never see half of it
+        temp_name = f"{file_name}.tmp"
+        with open_board(temp_name, "w", board_name=file_name) as file:
+            if is_compressed(file_name):
+                # Encoded in chunks straight into compressor, without pretty-printing
+                json.dump(obj, file, separators=(",", ":"))
+            else:
+                json.dump(obj, file, indent=4)
+        os.replace(temp_name, file_name)
+    return obj
 
 
-def load_drawables(file_name: str) -> tuple[list[tuple[str, dict[Any, Any]]], Optional[dict[Any, Any]]]:
+def read_board(file_name: str, quarantined: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """Board from file, migrated to current version
+
+    Invalid entries are saved aside (see `save_quarantined`) and also put in `quarantined` if given.
+    """
     if not os.path.exists(file_name):
-        return [], None
+        return {}
+
+    with open_board(file_name) as file:
+        return _parse_board(json.load(file), file_name, quarantined)
+
+
+def load_drawables(file_name: str) -> tuple[list[tuple[str, dict[Any, Any]]], Optional[dict[Any, Any]]]:
+    return split_board(read_board(file_name))
 
-    with open(file_name, "r") as file:
-        obj = json.load(file)
 
+def split_board(obj: dict[str, Any]) -> tuple[list[tuple[str, dict[Any, Any]]], Optional[dict[Any, Any]]]:
     if not obj:
         return [], None
 
@@ -82,8 +267,8 @@ def load_drawables(file_name: str) -> tuple[list[tuple[str, dict[Any, Any]]], Op
     if "background" in obj:
         background = obj["background"]
 
-    keys = [x for x in obj.keys() if x not in ["background", "layers"]]
-    return [(name, obj[name]) for name in sorted(keys, key=lambda x: obj["layers"].index(x))], background
+    # Parsed boards list every drawable in layers
+    return [(name, obj[name]) for name in obj["layers"]], background
 
 
 def load_binding_config_file(file_name: str) -> dict[str, Any]:
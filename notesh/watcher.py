@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import lzma
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from notesh.schema import BOARD_KEYS
+from notesh.utils import decode_board, drawable_stamp
+
+
+class BoardDiff:
+    def __init__(self) -> None:
+        self.added: dict[str, dict[str, Any]] = {}
+        self.removed: list[str] = []
+        self.modified: dict[str, dict[str, Any]] = {}
+        self.background: Optional[dict[str, Any]] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified or self.background is not None)
+
+    def changed_ids(self) -> set[str]:
+        return set(self.added) | set(self.removed) | set(self.modified)
+
+
+class BoardWatcher:
+    """Polls notes file for changes made by other processes
+
+    Runs in thread worker, the file is read only when its stat changes
+    and parsed only when its content hash differs from the last known one.
+    """
+
+    def __init__(self, file_name: str, interval: float = 1.0) -> None:
+        self.file_name = file_name
+        self.interval = interval
+        self.stamps: dict[str, str] = {}
+        self.background: Optional[dict[str, Any]] = None
+        self._stat: Optional[tuple[int, int]] = None
+        self._hash: Optional[str] = None
+        # Bumped on every save or load, changes read before it are stale
+        self.generation = 0
+        # Generation at the time of last change found by `check`
+        self.checked_generation = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def remember(self, obj: dict[str, Any], file_seen: bool = True) -> None:
+        """Set board state as known in memory, after it was loaded or saved
+
+        With `file_seen` current file is also taken as already seen. It is not read again,
+        `obj` is what was loaded or written, so only its stat is kept.
+        """
+        self.stamps = {key: drawable_stamp(value) for key, value in obj.items() if key not in BOARD_KEYS}
+        self.background = obj.get("background")
+        if not file_seen:
+            return
+        with self._lock:
+            self.generation += 1
+            self._stat = self._read_stat()
+            # Content of the file is known, but not its hash, which is taken on next change
+            self._hash = None
+
+    def diff(self, obj: dict[str, Any]) -> BoardDiff:
+        diff = BoardDiff()
+        for key, value in obj.items():
+            if key in BOARD_KEYS:
+                continue
+            stamp = self.stamps.get(key)
+            if stamp is None:
+                diff.added[key] = value
+            elif stamp != drawable_stamp(value):
+                diff.modified[key] = value
+        diff.removed = [key for key in self.stamps if key not in obj]
+        if obj.get("background") != self.background:
+            diff.background = obj.get("background")
+        return diff
+
+    def check(self) -> Optional[dict[str, Any]]:
+        """New board content if file was changed since last check"""
+        with self._lock:
+            stat = self._read_stat()
+            if stat is None or stat == self._stat:
+                return None
+            self._stat = stat
+            data = self._read_bytes()
+            if data is None:
+                return None
+            digest = self._digest(data)
+            if digest == self._hash:
+                return None
+            try:
+                obj = decode_board(data, self.file_name)
+            except (ValueError, EOFError, OSError, lzma.LZMAError):
+                # Probably caught in the middle of write, retried on next poll
+                self._stat = None
+                return None
+            self._hash = digest
+            self.checked_generation = self.generation
+            return obj
+
+    def watch(self, on_change: Callable[[dict[str, Any]], None]) -> None:
+        self._stop.clear()
+        while not self._stop.wait(self.interval):
+            obj = self.check()
+            if obj is not None:
+                on_change(obj)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _read_stat(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.file_name)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_bytes(self) -> Optional[bytes]:
+        try:
+            with open(self.file_name, "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
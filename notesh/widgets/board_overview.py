@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from rich.segment import Segment
+from rich.style import Style
+from textual.color import Color
+from textual.geometry import Size
+from textual.strip import Strip
+from textual.widget import Widget
+
+from notesh.model import DrawableRecord
+
+
+class BoardOverview(Widget):
+    """Whole board painted as coloured cells in a single widget
+
+    Used at the farthest zoom, where separate widget for every drawable
+    would cost much more than the few cells it covers.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(id="board-overview")
+        self.styles.layer = "board-overview"
+        self.display = False
+        self._rows: list[list[Segment]] = []
+        self._width = 0
+
+    def paint(self, records: Iterable[DrawableRecord], scale: int, size: Size) -> None:
+        """Paint `records` given bottom to top on board of `size` cells shown `scale` times smaller"""
+        width, height = -(-size.width // scale), -(-size.height // scale)
+        cells: list[list[Optional[str]]] = [[None] * width for _ in range(height)]
+        for record in records:
+            x1, y1 = max(record.x // scale, 0), max(record.y // scale, 0)
+            x2 = min(max(-(-(record.x + record.width) // scale), x1 + 1), width)
+            y2 = min(max(-(-(record.y + record.height) // scale), y1 + 1), height)
+            for row in cells[y1:y2]:
+                row[x1:x2] = [record.color] * (x2 - x1)
+
+        styles: dict[str, Style] = {}
+        self._rows = []
+        for row in cells:
+            segments: list[Segment] = []
+            start = 0
+            for x in range(1, width + 1):
+                if x < width and row[x] == row[start]:
+                    continue
+                color = row[start]
+                if color is None:
+                    segments.append(Segment(" " * (x - start)))
+                else:
+                    if color not in styles:
+                        styles[color] = Style(bgcolor=Color.parse(color).rich_color)
+                    segments.append(Segment(" " * (x - start), styles[color]))
+                start = x
+            self._rows.append(segments)
+        self._width = width
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        if y >= len(self._rows):
+            return Strip.blank(self.size.width, self.rich_style)
+        strip = Strip(self._rows[y], self._width).apply_style(self.rich_style)
+        return strip.crop_extend(0, self.size.width, self.rich_style)
@@ -1,5 +1,27 @@
-from textual.widgets import Footer
+from typing import Optional
+
+from textual.app import ComposeResult
+from textual.reactive import reactive
+from textual.widgets import Footer, Label
 
 
 class FocusableFooter(Footer):
     can_focus = True
+    # Loaded and all drawables while board is loading
+    progress: reactive[Optional[tuple[int, int]]] = reactive(None)
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Shown over start of key bindings while board is loading
+        self.progress_label = Label(id="footer-progress", classes="-hidden")
+
+    def compose(self) -> ComposeResult:
+        yield self.progress_label
+
+    def watch_progress(self, progress: Optional[tuple[int, int]]) -> None:
+        if progress is None:
+            self.progress_label.add_class("-hidden")
+            return
+        loaded, total = progress
+        self.progress_label.update(f" Loading {loaded}/{total} ")
+        self.progress_label.remove_class("-hidden")
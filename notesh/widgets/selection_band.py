@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from textual.geometry import Offset, Region
+from textual.widgets import Static
+
+
+class SelectionBand(Static):
+    """Rectangle displayed while selecting drawables by dragging over PlayArea"""
+
+    def __init__(self) -> None:
+        super().__init__("", id="selection-band")
+        self.styles.layer = "selection-band"
+        self.display = False
+
+    def show_region(self, region: Region, origin: Offset) -> None:
+        self.styles.offset = region.offset - origin
+        self.styles.width = max(region.width, 1)
+        self.styles.height = max(region.height, 1)
+        self.display = True
+
+    def hide(self) -> None:
+        self.display = False
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional, OrderedDict
+from typing import Optional, OrderedDict, cast
 
 from textual.app import ComposeResult
 from textual.color import Color
@@ -11,6 +11,7 @@ from textual.widgets import Button, Input
 
 from notesh.drawables.drawable import Drawable
 from notesh.play_area import PlayArea
+from notesh.tags import parse_tags
 from notesh.widgets.color_picker import ColorPicker
 from notesh.widgets.multiline_input import MultilineArray
 
@@ -36,6 +37,7 @@ class Sidebar(Vertical):
 
         input = Input("Title", id="sidebar-title")
         multiline_array = MultilineArray()
+        tags_input = Input(placeholder="Tags", id="sidebar-tags")
 
         body_color_picker = ColorPicker(type="body", title="Body Color Picker")
 
@@ -48,6 +50,7 @@ class Sidebar(Vertical):
             {
                 "input": input,
                 "multiline_array": multiline_array,
+                "tags_input": tags_input,
                 "body_color_picker": body_color_picker,
                 "border_color_picker": border_color_picker,
                 "border_picker": border_type,
@@ -65,6 +68,10 @@ class Sidebar(Vertical):
 
         if self.drawable is not None:
             self.drawable.sidebar_layout(self.widget_list)
+            # Every drawable can be tagged
+            tags_input = self.widget_list["tags_input"]
+            tags_input.remove_class("-hidden")
+            cast(Input, tags_input).value = ", ".join(self.drawable.record.tags)
 
     async def set_drawable(self, drawable: Optional[Drawable], display_sidebar: bool = False):
         self.drawable = drawable
@@ -77,16 +84,40 @@ class Sidebar(Vertical):
         self.refresh()
 
     async def on_input_changed(self, event: Input.Changed):
-        if self.drawable is not None:
+        if self.drawable is not None and event.input.id == "sidebar-tags":
+            old, new = self.drawable.record.tags, parse_tags(event.value)
+            if old != new:
+                self.drawable.post_message(Drawable.Retag(self.drawable, old, new))
+        elif self.drawable is not None:
+            old = self._part_text("title")
             self.drawable.input_changed(event)
+            self._post_edit("title", old)
 
     async def on_multiline_array_changed(self, event: MultilineArray.Changed):
         if self.drawable is not None:
+            old = self._part_text("body")
             self.drawable.multiline_array_changed(event)
+            self._post_edit("body", old)
 
     def change_drawable_color(self, color: Color | str, part_type: str):
         if self.drawable:
+            old = self.drawable.get_color(part_type)
             self.drawable.change_color(color, part_type=part_type)
+            new = self.drawable.get_color(part_type)
+            if old != new:
+                self.drawable.post_message(Drawable.Recolor(self.drawable, part_type, old, new))
+
+    def _part_text(self, part: str) -> Optional[str]:
+        part_widget = getattr(self.drawable, part, None)
+        if part_widget is None:
+            return None
+        return str(part_widget.body)
+
+    def _post_edit(self, part: str, old: Optional[str]) -> None:
+        new = self._part_text(part)
+        if self.drawable is None or old is None or new is None or old == new:
+            return
+        self.drawable.post_message(Drawable.Edit(self.drawable, part, old, new))
 
     def on_button_pressed(self, event: Button.Pressed):
         if not self.drawable:
@@ -99,7 +130,11 @@ class Sidebar(Vertical):
             self.screen.query_one(PlayArea).post_message(DeleteDrawable(self.drawable))
             self.refresh()
         if button_id == "border-picker":
+            old = self.drawable.get_border_type()
             self.drawable.next_border()
+            new = self.drawable.get_border_type()
+            if old is not None and new is not None and old != new:
+                self.drawable.post_message(Drawable.Reborder(self.drawable, old, new))
 
     def on_color_picker_change(self, message: ColorPicker.Change):
         self.change_drawable_color(message.color, message.type)
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
-from typing import Optional, OrderedDict
+from typing import TYPE_CHECKING, Optional, OrderedDict, cast
 
 from textual.app import ComposeResult
 from textual.color import Color
 from textual.containers import Vertical
 from textual.widget import Widget
-from textual.widgets import Static
+from textual.widgets import Button, Input, Static
 
+from notesh.animation import AnimationBudget
 from notesh.drawables.drawable import Drawable
 from notesh.play_area import PlayArea
+from notesh.tags import parse_tags
 from notesh.widgets.color_picker import ColorPicker
 
+if TYPE_CHECKING:
+    from notesh.main import NoteApp
+
 
 class SidebarLeft(Vertical):
     can_focus_children: bool = False
@@ -31,16 +36,22 @@ class SidebarLeft(Vertical):
         title = Static("Here more settings soon!", id="sidebar-title")
         body_color_picker = ColorPicker(type="body", title="Body Color Picker")
         border_color_picker = ColorPicker(type="border", title="Border Color Picker")
+        performance_mode = Button("Performance mode", id="performance-mode", variant="primary")
+        tag_filter = Input(placeholder="Show only tags", id="tag-filter")
 
         self.widget_list: OrderedDict[str, Widget] = OrderedDict(
             {
                 "title": title,
                 "body_color_picker": body_color_picker,
                 "border_color_picker": border_color_picker,
+                "tag_filter": tag_filter,
+                "performance_mode": performance_mode,
             }
         )
 
     def compose(self) -> ComposeResult:
+        # Mode is known once app loaded its settings
+        cast(Button, self.widget_list["performance_mode"]).label = self._performance_label()
         self.current_layout = Vertical(*self.widget_list.values())
         yield self.current_layout
 
@@ -70,3 +81,18 @@ class SidebarLeft(Vertical):
 
     def on_color_picker_change(self, message: ColorPicker.Change):
         self.change_play_area_color(message.color, message.type)
+
+    def on_input_changed(self, event: Input.Changed):
+        if self.play_area and event.input.id == "tag-filter":
+            self.play_area.filter_tags(parse_tags(event.value))
+
+    def on_button_pressed(self, event: Button.Pressed):
+        if event.button.id == "performance-mode":
+            self._animation_budget().next_mode()
+            event.button.label = self._performance_label()
+
+    def _animation_budget(self) -> AnimationBudget:
+        return cast("NoteApp", self.app).animation_budget
+
+    def _performance_label(self) -> str:
+        return f"Performance mode: {self._animation_budget().mode}"
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import inspect
+from typing import Any, Callable, Iterable
+
+from hoptex.configs import JUMPS, HoptexBindingConfig, HoptexWidgetsFiltersConfig
+from hoptex.hop_screen import HopScreen
+from hoptex.utils import DUMMY_MOUSE_EVENT
+from textual.app import ComposeResult
+from textual.widget import Widget
+from textual.widgets import Static
+
+
+def hop_labels(count: int) -> list[str]:
+    """Labels where no label is start of another one, the shortest given first
+
+    Labels get as long as needed, the last label of the shortest length becomes
+    start of longer ones until there are enough of them.
+    """
+    keys = list(reversed(JUMPS))
+    labels = keys[:count]
+    # Index of the first label that is longer than the shortest ones
+    longer = len(labels)
+    while len(labels) < count:
+        if longer == 0:
+            longer = len(labels)
+        prefix = labels.pop(longer - 1)
+        longer -= 1
+        labels.extend(prefix + key for key in keys)
+    return labels[:count]
+
+
+class ViewportHopScreen(HopScreen):
+    """Hoptex screen labeling only given targets, the closest to the middle of screen with shortest labels
+
+    `compose` replaces the one of HopScreen, which walks all parent widgets and
+    gives labels in no order. Choosing a label is left to HopScreen.
+    """
+
+    def __init__(
+        self,
+        bindings: HoptexBindingConfig,
+        filters_lists: HoptexWidgetsFiltersConfig,
+        label: type[Static],
+        targets: Iterable[Widget],
+    ) -> None:
+        super().__init__(bindings, filters_lists, label)
+        self.targets = list(targets)
+
+    def compose(self) -> ComposeResult:
+        self.to_choose = dict()
+        self.to_choose_bar = dict()
+        self.to_choose_set = set()
+
+        center_x, center_y = self.app.size.width / 2, self.app.size.height / 2
+
+        def distance(widget: Widget) -> float:
+            region = widget.region
+            return (region.x + region.width / 2 - center_x) ** 2 + (region.y + region.height / 2 - center_y) ** 2
+
+        targets = sorted(self.targets, key=distance)
+        for label_text, widget in zip(hop_labels(len(targets)), targets):
+            bar = self.label(label_text)
+            # Docked labels share one layer at the top left corner, offset alone places them
+            bar.styles.dock = "top"
+            bar.styles.offset = (widget.region.x, widget.region.y)
+            self.to_choose[label_text] = widget
+            self.to_choose_bar[label_text] = bar
+            for i in range(len(label_text)):
+                self.to_choose_set.add(label_text[: i + 1])
+            yield bar
+
+
+async def press(widget: Widget) -> None:
+    """Click widget like hoptex does when it focuses and presses"""
+    for function, args in [("_on_click", [DUMMY_MOUSE_EVENT]), ("on_click", [])]:
+        method: Callable[..., Any] | None = getattr(widget, function, None)
+        if method is None:
+            continue
+        if inspect.iscoroutinefunction(method):
+            await method(*args)
+        else:
+            method(*args)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from textual.app import App
+from textual.color import Color
+from textual.widgets import Static
+
+from notesh.animation import AnimationBudget, animate_style
+
+
+class BudgetApp(App[None]):
+    def __init__(self, budget):
+        super().__init__()
+        self.animation_budget = budget
+
+    def compose(self):
+        for index in range(4):
+            yield Static(str(index))
+
+
+def run(budget, test):
+    async def main():
+        app = BudgetApp(budget)
+        async with app.run_test() as pilot:
+            await test(app, pilot)
+
+    asyncio.run(main())
+
+
+def test_changes_beyond_budget_are_instant():
+    budget = AnimationBudget(max_animations=2, mode="on")
+
+    async def test(app, pilot):
+        statics = list(app.query(Static))
+        for static in statics:
+            animate_style(static.styles, "background", Color(255, 0, 0), 1.0)
+        assert budget.running == 2
+        assert [app.animator.is_being_animated(x.styles, "background") for x in statics] == [True, True, False, False]
+        assert statics[3].styles.background == Color(255, 0, 0)
+        # Retargeting a counted animation keeps animating it
+        animate_style(statics[0].styles, "background", Color(0, 0, 255), 1.0)
+        assert budget.running == 2
+        # Other animations of the app are not counted
+        statics[2].styles.animate("color", Color(0, 255, 0), duration=1.0)
+        assert budget.running == 2
+
+    run(budget, test)
+
+
+def test_instant_change_replaces_running_animation():
+    budget = AnimationBudget(max_animations=1, mode="on")
+
+    async def test(app, pilot):
+        first, second = list(app.query(Static))[:2]
+        second.styles.animate("background", Color(255, 0, 0), duration=1.0)
+        animate_style(first.styles, "background", Color(255, 0, 0), 1.0)
+        animate_style(second.styles, "background", Color(0, 0, 255), 1.0)
+        await pilot.pause(0.1)
+        assert second.styles.background == Color(0, 0, 255)
+        assert not app.animator.is_being_animated(second.styles, "background")
+
+    run(budget, test)
+
+
+def test_auto_mode_follows_drawable_count():
+    count = 0
+    budget = AnimationBudget(auto_threshold=10, count_drawables=lambda: count)
+    assert not budget.enabled
+    count = 11
+    assert budget.enabled
+    budget.set_mode("off")
+    assert not budget.enabled
+    with pytest.raises(ValueError):
+        budget.set_mode("fast")
+
+
+def test_finished_and_unlimited_animations_are_not_kept():
+    budget = AnimationBudget(max_animations=2, mode="off")
+
+    async def test(app, pilot):
+        statics = list(app.query(Static))
+        for static in statics:
+            animate_style(static.styles, "background", Color(255, 0, 0), 0.05)
+        assert budget._running == {}
+
+        budget.set_mode("on")
+        animate_style(statics[0].styles, "background", Color(0, 0, 255), 0.05)
+        await pilot.pause(0.1)
+        animate_style(statics[1].styles, "background", Color(0, 0, 255), 1.0)
+        assert list(budget._running) == [(id(statics[1].styles), "background")]
+
+    run(budget, test)
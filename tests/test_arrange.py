@@ -0,0 +1,56 @@
+import random
+import time
+
+import pytest
+from textual.geometry import Region
+
+from notesh.arrange import ARRANGE_MODES, GAP, arrange
+
+COLORS = ("#ff0000", "#00ff00", "#0000ff", "#ffaa00")
+
+
+def board(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    xs = [rng.randint(0, 2000) for _ in range(count)]
+    ys = [rng.randint(0, 500) for _ in range(count)]
+    widths = [rng.randint(10, 40) for _ in range(count)]
+    heights = [rng.randint(5, 20) for _ in range(count)]
+    colors = [rng.choice(COLORS) for _ in range(count)]
+    return xs, ys, widths, heights, colors
+
+
+@pytest.mark.parametrize("mode", ARRANGE_MODES)
+def test_arranged_drawables_do_not_overlap(mode):
+    xs, ys, widths, heights, colors = board(200)
+    new_xs, new_ys = arrange(mode, xs, ys, widths, heights, colors)
+    regions = [Region(x, y, w + GAP[0], h + GAP[1]) for x, y, w, h in zip(new_xs, new_ys, widths, heights)]
+    for index, region in enumerate(regions):
+        assert min(region.x, region.y) >= 0
+        assert not any(region.overlaps(other) for other in regions[index + 1 :])
+
+
+def test_grid_keeps_reading_order():
+    new_xs, new_ys = arrange("grid", [50, 0, 0], [0, 0, 30], [10, 10, 10], [5, 5, 5], ["#000000"] * 3)
+    assert sorted(range(3), key=lambda i: (new_ys[i], new_xs[i])) == [1, 0, 2]
+
+
+def test_clusters_keep_colors_together():
+    colors = ["#ff0000", "#0000ff"] * 10
+    new_xs, new_ys = arrange("cluster", [0] * 20, [0] * 20, [10] * 20, [5] * 20, colors)
+    red = [(new_xs[i], new_ys[i]) for i in range(0, 20, 2)]
+    blue = [(new_xs[i], new_ys[i]) for i in range(1, 20, 2)]
+    # Bounding boxes of clusters are apart
+    assert max(x for x, _ in red) < min(x for x, _ in blue) or max(y for _, y in red) < min(y for _, y in blue)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        arrange("spiral", [], [], [], [], [])
+
+
+@pytest.mark.parametrize("mode", ARRANGE_MODES)
+def test_ten_thousand_drawables_take_well_under_second(mode):
+    columns = board(10_000)
+    start = time.perf_counter()
+    arrange(mode, *columns)
+    assert time.perf_counter() - start < 0.5
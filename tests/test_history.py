@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+from textual.geometry import Offset
+
+from notesh.history import History, MoveOperation, TextOperation, text_diff
+
+
+class FakePlayArea:
+    """Just enough of PlayArea for text operations"""
+
+    def __init__(self, body: str) -> None:
+        self.drawable = SimpleNamespace(body=SimpleNamespace(body=body))
+
+    def get_drawable(self, drawable_id: str):
+        return self.drawable if drawable_id == "note-1" else None
+
+    @property
+    def text(self) -> str:
+        return self.drawable.body.body
+
+
+def type_text(history: History, play_area: FakePlayArea, new: str) -> None:
+    old = play_area.text
+    history.record(TextOperation("note-1", "body", *text_diff(old, new)))
+    play_area.drawable.body.body = new
+
+
+def test_text_diff_is_smallest_replacement():
+    assert text_diff("hello world", "hello there world") == (6, "", "there ")
+    assert text_diff("abc", "abc") == (3, "", "")
+    assert text_diff("abcd", "ad") == (1, "bc", "")
+    assert text_diff("aaa", "aaaa") == (3, "", "a")
+
+
+def test_typing_is_merged_into_one_step():
+    history = History()
+    play_area = FakePlayArea("")
+    for text in ("h", "he", "hel", "help", "hel", "hello"):
+        type_text(history, play_area, text)
+    assert len(history.undo_stack) == 1
+
+    asyncio.run(history.undo(play_area))
+    assert play_area.text == ""
+    asyncio.run(history.redo(play_area))
+    assert play_area.text == "hello"
+
+
+def test_sealed_steps_are_not_merged():
+    history = History()
+    play_area = FakePlayArea("")
+    type_text(history, play_area, "one")
+    history.seal()
+    type_text(history, play_area, "one two")
+    assert len(history.undo_stack) == 2
+
+    asyncio.run(history.undo(play_area))
+    assert play_area.text == "one"
+    assert history.can_redo()
+    type_text(history, play_area, "one three")
+    assert not history.can_redo()
+
+
+def test_moves_of_other_drawables_are_not_merged():
+    history = History()
+    history.record(MoveOperation("a", Offset(1, 0)))
+    history.record(MoveOperation("a", Offset(2, 1)))
+    history.record(MoveOperation("b", Offset(1, 0)))
+    assert [(x.drawable_id, x.delta) for x in history.undo_stack] == [("a", Offset(3, 1)), ("b", Offset(1, 0))]
+
+
+def test_budget_drops_oldest_steps_but_keeps_last():
+    history = History(memory_budget=1)
+    history.record(MoveOperation("a", Offset(1, 0)))
+    history.record(MoveOperation("b", Offset(1, 0)))
+    assert [x.drawable_id for x in history.undo_stack] == ["b"]
+    assert history.used_memory == history.undo_stack[0].cost()
+
+
+def test_forget_drops_steps_of_changed_drawables():
+    history = History()
+    history.record(MoveOperation("a", Offset(1, 0)))
+    history.record(MoveOperation("b", Offset(1, 0)))
+    history.forget({"a"})
+    assert [x.drawable_id for x in history.undo_stack] == ["b"]
+
+
+class ShiftingPlayArea:
+    """PlayArea which field was shifted after operations were recorded"""
+
+    def __init__(self) -> None:
+        self.file_origin = Offset(0, 0)
+        self.added = []
+        self.placed = []
+
+    def get_drawable(self, drawable_id: str):
+        return None if drawable_id == "deleted" else drawable_id
+
+    def add_parsed_drawable(self, obj, drawable_id, offset):
+        self.added.append((Offset(*obj["pos"]) - offset, drawable_id))
+
+    async def place_drawables(self, drawables, positions, record=True):
+        self.placed.append(positions)
+
+
+def test_positions_survive_field_shift():
+    play_area = ShiftingPlayArea()
+    history = History()
+    history.origin = lambda: play_area.file_origin
+    play_area.file_origin = Offset(-20, 0)
+    record = SimpleNamespace(pos=Offset(40, 10))
+    history.record_delete(SimpleNamespace(id="deleted", record=record, dump=lambda: {"pos": (40, 10)}))
+    history.record_place([SimpleNamespace(id="placed")], [Offset(40, 10)], [Offset(80, 10)])
+    # Deleting leftmost drawable shifts all others left
+    play_area.file_origin = Offset(-60, 0)
+
+    asyncio.run(history.undo(play_area))
+    assert play_area.placed == [[Offset(0, 10)]]
+    asyncio.run(history.undo(play_area))
+    assert play_area.added == [(Offset(0, 10), "deleted")]
+    asyncio.run(history.redo(play_area))
+    asyncio.run(history.redo(play_area))
+    assert play_area.placed[-1] == [Offset(40, 10)]
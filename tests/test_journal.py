@@ -0,0 +1,59 @@
+from notesh.journal import Journal
+
+
+def note(body):
+    return {"title": "Note", "body": body, "pos": [0, 0], "color": "#ffaa00", "size": [20, 14], "type": "note"}
+
+
+BOARD = {"a": note("a"), "b": note("b"), "layers": ["a", "b"]}
+
+
+def test_replay_applies_drawables_bring_and_background(tmp_path):
+    journal = Journal(str(tmp_path / "notes.json"))
+    states = {"b": note("changed"), "c": note("new")}
+    journal.snapshot = states.get
+    journal.log_drawables(("b", "c", "a"))
+    journal.log_bring(["c"], "backward")
+    journal.log_background({"color": "#111111", "border_color": "#222222", "type": "plain"})
+    journal.log_background({"color": "#333333", "border_color": "#222222", "type": "plain"})
+    journal.flush()
+
+    board, count = journal.replay(BOARD)
+    assert count == 5
+    assert board["b"]["body"] == "changed"
+    assert "a" not in board
+    assert board["layers"] == ["c", "b"]
+    assert board["background"]["color"] == "#333333"
+    assert BOARD["layers"] == ["a", "b"]
+
+
+def test_invalid_entries_are_quarantined(tmp_path):
+    journal = Journal(str(tmp_path / "notes.json"))
+    journal.snapshot = {"b": dict(note("changed"), size=[0, 14]), "c": note("new")}.get
+    journal.log_drawables(("b", "c"))
+    journal.log_background({"color": "nope", "border_color": "#222222", "type": "plain"})
+    journal.flush()
+
+    quarantined = {}
+    board, count = journal.replay(BOARD, quarantined)
+    assert count == 1
+    assert board["b"]["body"] == "b"
+    assert board["layers"] == ["a", "b", "c"]
+    assert "background" not in board
+    assert sorted(quarantined) == ["b (unsaved)", "background (unsaved)"]
+    assert "size" in quarantined["b (unsaved)"]["error"]
+
+
+def test_cut_last_line_is_skipped(tmp_path):
+    journal = Journal(str(tmp_path / "notes.json"))
+    journal.snapshot = {"b": note("changed")}.get
+    journal.log_drawables(("b",))
+    journal.flush()
+    with open(journal.file_name, "a", encoding="utf-8") as file:
+        file.write('{"id": "a", "del')
+
+    board, count = journal.replay(BOARD)
+    assert count == 1
+    assert board["b"]["body"] == "changed"
+    journal.clear()
+    assert journal.replay(BOARD) == (BOARD, 0)
@@ -0,0 +1,50 @@
+import pytest
+from rich.console import Console
+from rich.markdown import Markdown
+
+from notesh.markdown_window import BlockCache, MarkdownWindow, split_blocks
+
+TEXTS = [
+    "# Title\n\nfirst paragraph\nstill first\n\nsecond",
+    "- one\n\n- two\n\n  continued in two\n\nafter list",
+    "1. one\n\n2. two\n   - nested\n\n     nested paragraph\n\ntext",
+    "```\ncode\n\nstill code\n```\n\nend",
+    "> quoted\n\n> another quote\n\ntext after quotes",
+    "para\n\n---\n\n---\n\n## Heading\n\n    indented code\n\n    more code\n\nend",
+    "text\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n![image](url)\n\nlast",
+    "see [link]\n\n[link]: https://example.com\n\nend",
+]
+
+
+def plain(lines):
+    return ["".join(segment.text for segment in line).rstrip() for line in lines]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_window_renders_like_whole_markdown(text):
+    console = Console(width=30, color_system=None)
+    options = console.options.update(width=30, height=200)
+    whole = plain(console.render_lines(Markdown(text), options.reset_height(), pad=False))
+    window = MarkdownWindow(split_blocks(text), BlockCache())
+    rendered = plain(console.render_lines(window, options, pad=False))
+    assert rendered[: len(whole)] == whole
+    assert not any(rendered[len(whole) :])
+    assert window.line_count == len(whole)
+
+
+def test_blocks_stay_open_inside_fences_and_lists():
+    assert split_blocks("a\n\n\nb") == ["a", "b"]
+    assert split_blocks("```\na\n\nb\n```\n\nc") == ["```\na\n\nb\n```", "c"]
+    assert split_blocks("- a\n\n- b\n\n  c\n\nd") == ["- a\n\n- b\n\n  c", "d"]
+    assert split_blocks("\n\n") == []
+
+
+def test_window_shows_lines_from_top():
+    text = "\n\n".join(f"paragraph {index}" for index in range(20))
+    console = Console(width=30, color_system=None)
+    window = MarkdownWindow(split_blocks(text), BlockCache(), top=4)
+    lines = plain(console.render_lines(window, console.options.update(width=30, height=3), pad=False))
+    assert lines == ["paragraph 2", "", "paragraph 3"]
+    # Blocks below window and lookahead are not rendered
+    assert window.line_count is None
+    assert len(window.cache.lines) < 20
@@ -0,0 +1,67 @@
+import inspect
+import os
+import tracemalloc
+
+from notesh.drawables.drawable import DrawablePart
+from notesh.drawables.sticknote import Note
+from notesh.memory import _charge, format_report
+from notesh.play_area import PlayArea
+
+SITE_PACKAGES = os.path.join(os.sep, "lib", "site-packages")
+
+
+def frame(function):
+    """File and line inside body of function"""
+    return inspect.getsourcefile(function), inspect.getsourcelines(function)[1] + 1
+
+
+def library(*path):
+    return os.path.join(SITE_PACKAGES, *path), 10
+
+
+def traceback(*frames):
+    # Innermost frame first, like tracemalloc gets them
+    return tracemalloc.Traceback(frames)
+
+
+def test_base_class_code_is_charged_to_subclass_calling_it():
+    created = traceback(library("textual", "dom.py"), frame(DrawablePart.__init__), frame(Note.init_parts))
+    assert _charge(created) == ("Drawable parts", "Note")
+    # Nothing further out that would tell which part it is
+    rendered = traceback(library("textual", "strip.py"), frame(DrawablePart.render_line), library("textual", "app.py"))
+    assert _charge(rendered) == ("Drawable parts", "DrawablePart")
+
+
+def test_walk_goes_past_other_notesh_frames():
+    created = traceback(frame(DrawablePart.__init__), frame(PlayArea.add_parsed_drawables), frame(Note.init_parts))
+    assert _charge(created) == ("Drawable parts", "Note")
+    assert _charge(traceback(frame(PlayArea.add_parsed_drawables))) == ("Other NoteSH", "PlayArea")
+
+
+def test_markdown_is_charged_by_drawable_rendering_it():
+    parsed = traceback(
+        library("markdown_it", "main.py"),
+        library("rich", "markdown.py"),
+        frame(DrawablePart.render_body),
+        frame(DrawablePart.__init__),
+        frame(Note.init_parts),
+    )
+    assert _charge(parsed) == ("Markdown renderables", "Note")
+
+
+def test_generated_code_is_charged_to_library_calling_it():
+    assert _charge(traceback(("<string>", 1), library("rich", "segment.py"))) == (
+        "Textual and libraries",
+        "rich.segment",
+    )
+    assert _charge(traceback(library("textual", "css", "parse.py"))) == ("Textual and libraries", "textual.css")
+
+
+def test_report_has_sections_by_size_and_total_per_drawable():
+    small = {("Drawables", "Note"): 2048, ("Storage", "utils"): 1024}
+    large = {("Drawables", "Note"): 4096, ("Drawables", "Box"): 1024, ("Storage", "utils"): 1024}
+    lines = format_report([("1", small), ("2", large)], per=[1, 2]).split("\n")
+    assert lines[1].split() == ["Drawables", "2.0", "5.0"]
+    assert [x.split()[0] for x in lines[2:4]] == ["Note", "Box"]
+    assert lines[4].split() == ["Storage", "1.0", "1.0"]
+    assert lines[-1].split() == ["Total", "per", "drawable", "3.0", "3.0"]
@@ -0,0 +1,70 @@
+from textual.geometry import Offset
+
+from notesh.merge import BoardMerge
+from notesh.utils import drawable_stamp
+
+NOTE = {"title": "A", "body": "text", "pos": [0, 0], "color": "#ffaa00", "size": [20, 14], "type": "note"}
+
+
+def board(**drawables):
+    return {"version": 1, "layers": list(drawables), **drawables}
+
+
+def test_stamp_ignores_form_of_saved_values():
+    same = {**NOTE, "pos": (0.0, 0.0), "color": "#FFAA00", "size": (20, 14.0)}
+    assert drawable_stamp(same) == drawable_stamp(NOTE)
+    assert drawable_stamp({**NOTE, "body": "TEXT"}) != drawable_stamp(NOTE)
+    assert drawable_stamp({**NOTE, "pos": [0.5, 0]}) != drawable_stamp(NOTE)
+
+
+def test_stamp_does_not_depend_on_key_order():
+    assert drawable_stamp(dict(reversed(list(NOTE.items())))) == drawable_stamp(NOTE)
+
+
+def test_changes_on_disk_are_taken_and_reported():
+    stamps = {"a": drawable_stamp(NOTE), "b": drawable_stamp(NOTE)}
+    merger = BoardMerge(stamps, None)
+    moved = {**NOTE, "pos": [5, 5]}
+    merged = merger.merge(board(a=NOTE, b=NOTE), board(a=moved, c=NOTE))
+
+    assert merged["a"] == moved
+    assert "b" not in merged
+    assert merged["c"] == NOTE
+    assert merged["layers"] == ["a", "c"]
+    assert list(merger.from_disk.modified) == ["a"]
+    assert merger.from_disk.removed == ["b"]
+    assert list(merger.from_disk.added) == ["c"]
+    assert not merger.conflicts
+
+
+def test_changes_on_both_sides_keep_ours_as_conflict():
+    merger = BoardMerge({"a": drawable_stamp(NOTE)}, None)
+    ours = {**NOTE, "body": "ours"}
+    merged = merger.merge(board(a=ours), board(a={**NOTE, "body": "theirs"}))
+    assert merged["a"] == ours
+    assert merger.conflicts == ["a"]
+    assert not merger.from_disk
+
+
+def test_deleted_here_but_edited_on_disk_is_kept():
+    merger = BoardMerge({"a": drawable_stamp(NOTE)}, None)
+    edited = {**NOTE, "body": "edited"}
+    merged = merger.merge(board(), board(a=edited))
+    assert merged["a"] == edited
+    assert merger.conflicts == ["a"]
+    assert list(merger.from_disk.added) == ["a"]
+
+
+def test_positions_are_saved_in_file_coordinates():
+    merger = BoardMerge({}, None, origin=Offset(10, 5))
+    merged = merger.merge(board(a={**NOTE, "pos": (10, 5)}), board())
+    assert merged["a"]["pos"] == (0, 0)
+
+
+def test_background_changed_on_disk_is_taken():
+    merger = BoardMerge({}, {"color": "#000000"})
+    merged = merger.merge(
+        {**board(), "background": {"color": "#000000"}}, {**board(), "background": {"color": "#111111"}}
+    )
+    assert merged["background"] == {"color": "#111111"}
+    assert merger.from_disk.background == {"color": "#111111"}
@@ -0,0 +1,37 @@
+from textual.geometry import Offset, Region, Size
+
+from notesh.model import DrawableRecord
+
+BOX = {
+    "body": "text",
+    "pos": (3, 4),
+    "color": "#0044AA",
+    "size": (20, 10),
+    "type": "box",
+    "border_color": "#FFAA00",
+    "border_type": "outer",
+}
+
+
+def test_dump_of_loaded_record_is_the_same():
+    record = DrawableRecord.load("box-1", BOX)
+    assert record.dump() == BOX
+    assert record.region == Region(3, 4, 20, 10)
+
+
+def test_position_and_size_are_kept_as_ints():
+    record = DrawableRecord("note-1", "note")
+    record.pos = Offset(2, 3) + Offset(1, 1)
+    record.size = Size(10, 5)
+    assert (record.x, record.y, record.width, record.height) == (3, 4, 10, 5)
+    assert record.pos == Offset(3, 4) and record.size == Size(10, 5)
+
+
+def test_text_of_parts_is_kept_only_in_record():
+    from notesh.drawables.sticknote import Note
+
+    note = Note(title="title", body="body")
+    assert note.title._body == note.body._body == ""
+    note.body.body = "new body"
+    assert (note.record.title, note.record.body) == ("title", "new body")
+    assert note.body.body is note.record.body
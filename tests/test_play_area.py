@@ -0,0 +1,339 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from textual.events import Click, MouseDown, MouseMove, MouseUp
+from textual.geometry import Offset, Size
+
+from notesh.drawables.drawable import Drawable
+
+NOTE = {"title": "", "body": "", "color": "#ffaa00", "size": [20, 14], "type": "note"}
+BOX = {
+    "body": "",
+    "color": "#ffaa00",
+    "size": [20, 8],
+    "border_color": "#ffaa00",
+    "border_type": "outer",
+    "type": "box",
+}
+
+
+def run_board(tmp_path, positions, test, size=(120, 40), kind=NOTE):
+    """Run `test(app, pilot)` in NoteApp with drawables `a`, `b`, ... of `kind` at given file positions"""
+    from notesh.main import NoteApp
+
+    file_name = tmp_path / "notes.json"
+    notes = {chr(ord("a") + index): {**kind, "pos": list(pos)} for index, pos in enumerate(positions)}
+    file_name.write_text(json.dumps({"layers": list(notes), **notes}))
+
+    async def main():
+        app = NoteApp(file=str(file_name))
+        async with app.run_test(size=size) as pilot:
+            await app.loaded.wait()
+            await pilot.pause()
+            await test(app, pilot)
+
+    asyncio.run(main())
+
+
+def file_position(play_area, drawable_id):
+    return play_area.get_drawable(drawable_id).offset - play_area.file_origin
+
+
+def test_undo_delete_of_leftmost_note_after_field_shrinks(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        await play_area.delete_drawable(play_area.get_drawable("a"))
+        await pilot.pause()
+        assert file_position(play_area, "b") == Offset(60, 0)
+        await play_area.undo()
+        await pilot.pause()
+        assert [file_position(play_area, x) for x in "abc"] == [Offset(0, 0), Offset(60, 0), Offset(120, 0)]
+
+    run_board(tmp_path, [(0, 0), (60, 0), (120, 0)], test)
+
+
+def test_undo_group_delete_after_field_shrinks(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        group = [play_area.get_drawable(x) for x in "ab"]
+        play_area.select(group)
+        await play_area.move_drawables(group, Offset(3, 0))
+        await play_area.delete_drawable(group[0])
+        await pilot.pause()
+        await play_area.undo()
+        await pilot.pause()
+        assert [file_position(play_area, x) for x in "abc"] == [Offset(3, 0), Offset(63, 0), Offset(120, 0)]
+        await play_area.undo()
+        assert [file_position(play_area, x) for x in "ab"] == [Offset(0, 0), Offset(60, 0)]
+
+    run_board(tmp_path, [(0, 0), (60, 0), (120, 0)], test)
+
+
+def test_border_change_is_recorded_and_journaled(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        box = play_area.get_drawable("a")
+        play_area.focused_drawable = box
+        await app.action_edit()
+        await pilot.pause()
+        logged = []
+        app.journal.log_drawables = logged.extend
+        app.query_one("#border-picker").press()
+        await pilot.pause()
+        assert box.get_border_type() == "ascii"
+        assert logged == ["a"]
+        await play_area.undo()
+        await pilot.pause()
+        assert box.get_border_type() == "outer"
+        assert logged == ["a", "a"]
+
+    run_board(tmp_path, [(0, 0)], test, kind=BOX)
+
+
+def test_background_type_change_is_journaled(tmp_path):
+    async def test(app, pilot):
+        logged = []
+        app.journal.log_background = logged.append
+        app.play_area.change_background_type("plain")
+        assert logged == []
+        app.play_area.change_background_type("dots")
+        assert [x["type"] for x in logged] == ["dots"]
+
+    run_board(tmp_path, [(0, 0)], test)
+
+
+def test_far_drawables_are_culled_until_scrolled_into_view(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+
+        async def scroll_to(x):
+            await play_area._move_play_area(Offset(play_area._viewport().x - x, 0))
+            await pilot.pause()
+            return {x.id: x.display for x in play_area.drawables}
+
+        assert await scroll_to(0) == {"a": True, "b": True, "c": False}
+        assert play_area.get_drawable("c").culled
+        assert await scroll_to(560) == {"a": False, "b": False, "c": True}
+        assert await scroll_to(0) == {"a": True, "b": True, "c": False}
+
+    run_board(tmp_path, [(0, 0), (60, 0), (600, 0)], test)
+
+
+def test_field_grows_and_shrinks_with_drawables_at_its_edges(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        a, b = play_area.get_drawable("a"), play_area.get_drawable("b")
+        assert play_area.field_size.width == 100
+        await play_area.move_drawables([b], Offset(200, 0))
+        assert play_area.field_size.width == 300
+        await play_area.move_drawables([b], Offset(-200, 0))
+        assert play_area.field_size.width == 100
+
+        # Leaving empty space on the left shifts the field instead of keeping it
+        await pilot.pause()
+        screen_position = b.region.offset
+        await play_area.move_drawables([a], Offset(100, 0))
+        await pilot.pause()
+        assert play_area.file_origin == Offset(-60, 0)
+        assert play_area.field_size.width == 80
+        assert b.offset == Offset(0, 0) and file_position(play_area, "b") == Offset(60, 0)
+        assert b.region.offset == screen_position
+
+    run_board(tmp_path, [(0, 0), (60, 0)], test)
+
+
+def focus(app, drawable_id):
+    drawable = app.play_area.get_drawable(drawable_id)
+    app.set_focus(drawable)
+    app.play_area.focused_drawable = drawable
+
+
+def test_focus_moves_to_closest_drawable_on_each_side(tmp_path):
+    async def test(app, pilot):
+        # `f` is closer to `a` than `b` is, but aside from the line to the right
+        for key, expected in [("right", "b"), ("left", "c"), ("up", "d"), ("down", "e")]:
+            focus(app, "a")
+            await pilot.press(f"ctrl+{key}")
+            await pilot.pause()
+            assert app.play_area.focused_drawable.id == expected
+            assert app.focused is app.play_area.focused_drawable
+
+    run_board(tmp_path, [(100, 40), (140, 40), (60, 40), (100, 10), (100, 70), (125, 60)], test)
+
+
+def test_focus_ties_and_missing_candidates(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        a = play_area.get_drawable("a")
+        # `b` and `c` are as far to the right, lower id wins
+        assert play_area.drawable_in_direction("right", a).id == "b"
+        assert play_area.drawable_in_direction("left", a) is None
+        assert play_area.drawable_in_direction("right", play_area.get_drawable("b")) is None
+
+        focus(app, "a")
+        await pilot.press("ctrl+left")
+        await pilot.pause()
+        assert play_area.focused_drawable is a
+
+    run_board(tmp_path, [(0, 20), (40, 10), (40, 30)], test)
+
+
+class Stacked:
+    def __init__(self, id):
+        self.id = id
+
+
+def stacked_groups(mounted, stacking, batch):
+    """Groups of `batch` put among `mounted` by `PlayArea._stacked_groups`, and resulting order"""
+    from notesh.play_area import PlayArea
+
+    area = SimpleNamespace(drawables=[Stacked(x) for x in mounted], _stacking=stacking)
+    groups = PlayArea._stacked_groups(area, [Stacked(x) for x in batch])
+    by_id = {(None if above is None else above.id): [x.id for x in group] for above, group in groups.items()}
+    return by_id, [x.id for x in area.drawables]
+
+
+def test_stacked_groups_of_batch_above_mounted_drawables():
+    stacking = {x: index for index, x in enumerate("abcd")}
+    assert stacked_groups("ab", stacking, "dc") == ({None: ["c", "d"]}, list("abcd"))
+
+
+def test_stacked_groups_of_batch_between_mounted_drawables():
+    stacking = {x: index for index, x in enumerate("abcde")}
+    groups, order = stacked_groups("bd", stacking, "eca")
+    assert groups == {"b": ["a"], "d": ["c"], None: ["e"]}
+    assert order == list("abcde")
+    # Drawables missing from saved stacking go on top
+    assert stacked_groups("ab", {"a": 0, "b": 1}, "x") == ({None: ["x"]}, list("abx"))
+
+
+def test_batches_are_mounted_in_saved_stacking(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        layers = list("abcdef")
+        play_area.stack_in_order(layers)
+        for batch in ("ce", "fa", "db"):
+            await play_area.add_parsed_drawables([(x, {**NOTE, "pos": [0, 0]}) for x in batch])
+        await pilot.pause()
+        assert [x.id for x in play_area.drawables] == layers
+        assert [x.id for x in play_area.children if isinstance(x, Drawable)] == layers
+
+    run_board(tmp_path, [], test)
+
+
+def test_render_cache_hits_and_evicts_after_content_or_size_change(tmp_path):
+    from notesh.drawables.drawable import RENDER_CACHE_SIZE
+
+    async def test(app, pilot):
+        box = app.play_area.get_drawable("a")
+        part = box.body
+        part._renders.clear()
+        first = part.render_line(0)
+        assert part.render_line(0) is first and len(part._renders) == 1
+
+        # Every new content is one more entry, the oldest goes once cache is full
+        for index in range(RENDER_CACHE_SIZE - 1):
+            part.body = f"text {index}"
+            part.render_line(0)
+        assert len(part._renders) == RENDER_CACHE_SIZE
+        oldest = next(iter(part._renders))
+        box.set_size((30, 8))
+        await pilot.pause()
+        part.render_line(0)
+        assert len(part._renders) == RENDER_CACHE_SIZE and oldest not in part._renders
+
+        # Coming back to the latest content and size is a hit again
+        latest = part.render_line(0)
+        assert part.render_line(0) is latest
+
+    run_board(tmp_path, [(0, 0)], test, kind=BOX)
+
+
+def test_hover_changes_within_a_frame_skip_layouts(tmp_path):
+    async def test(app, pilot):
+        box = app.play_area.get_drawable("a")
+        start = Drawable.hover_layouts_avoided
+        # Entered and left before next frame, layout is not changed at all
+        box.set_hover(True)
+        box.set_hover(False)
+        await pilot.pause()
+        assert Drawable.hover_layouts_avoided == start + 2
+        assert not box.is_entered
+
+        box.set_hover(True)
+        await pilot.pause()
+        assert Drawable.hover_layouts_avoided == start + 2
+        assert box.is_entered
+
+    run_board(tmp_path, [(0, 0)], test, kind=BOX)
+
+
+def test_positions_and_sizes_survive_zoom_round_trip(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+
+        def state():
+            return {x.id: (file_position(play_area, x.id), x.record.size) for x in play_area.drawables}
+
+        before = state()
+        regions = {x.id: x.region for x in play_area.drawables}
+        for level in (1, 2, 3, 2, 1, 0):
+            play_area.set_zoom(level)
+            await pilot.pause()
+            assert state() == before
+        # Odd sizes are rounded up while zoomed out, but not lost
+        assert {x.id: x.region.size for x in play_area.drawables} == {x: y.size for x, y in regions.items()}
+
+    run_board(tmp_path, [(0, 0), (60, 0), (70, 30)], test, kind={**NOTE, "size": [21, 15]})
+
+
+def test_field_shift_while_zoomed_out_keeps_positions(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        b = play_area.get_drawable("b")
+        play_area.set_zoom(1)
+        await pilot.pause()
+        screen_position = b.region.offset
+
+        # Empty space left of `b` is dropped by shifting the field
+        await play_area.move_drawables([play_area.get_drawable("a")], Offset(100, 0))
+        await pilot.pause()
+        assert play_area.file_origin == Offset(-60, 0)
+        assert b.region.offset == screen_position
+
+        play_area.set_zoom(0)
+        await pilot.pause()
+        assert [file_position(play_area, x) for x in "abc"] == [Offset(100, 0), Offset(60, 0), Offset(70, 30)]
+        assert {x.record.size for x in play_area.drawables} == {Size(21, 15)}
+        assert b.region.size == Size(21, 15)
+
+    run_board(tmp_path, [(0, 0), (60, 0), (70, 30)], test, kind={**NOTE, "size": [21, 15]})
+
+
+async def drag(app, pilot, start, end):
+    """Press mouse at screen offset `start`, move it to `end` and let it go there"""
+    for event, offset in [(MouseDown, start), (MouseMove, end), (MouseUp, end), (Click, end)]:
+        x, y = offset
+        app.post_message(event(x, y, 0, 0, button=1, shift=False, meta=False, ctrl=False, screen_x=x, screen_y=y))
+        await pilot.pause()
+
+
+def test_band_selects_drawables_that_move_and_undo_as_group(tmp_path):
+    async def test(app, pilot):
+        play_area = app.play_area
+        a, b, c = (play_area.get_drawable(x) for x in "abc")
+        await drag(app, pilot, b.region.bottom_right + Offset(2, 1), a.region.offset)
+        assert set(play_area.selection) == {"a", "b"}
+        assert not app.query_one("#selection-band").display
+
+        focus(app, "a")
+        await pilot.press("L")
+        await pilot.pause()
+        assert [file_position(play_area, x) for x in "abc"] == [Offset(15, 10), Offset(45, 10), Offset(90, 10)]
+
+        await pilot.press("ctrl+z")
+        await pilot.pause()
+        assert [file_position(play_area, x) for x in "abc"] == [Offset(10, 10), Offset(40, 10), Offset(90, 10)]
+
+    run_board(tmp_path, [(10, 10), (40, 10), (90, 10)], test)
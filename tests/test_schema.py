@@ -0,0 +1,58 @@
+import pytest
+
+from notesh.schema import BOARD_VERSION, check_drawable, migrate, parse_board
+
+
+def note(**changes):
+    obj = {"title": "Note", "body": "text", "pos": [0, 0], "color": "#ffaa00", "size": [20, 14], "type": "note"}
+    obj.update(changes)
+    return obj
+
+
+def test_version_0_geometry_is_rounded_to_integers():
+    board = parse_board({"a": note(pos=[2.0, 3.6], size=[20.0, 14.0]), "layers": ["a"]}, {})
+    assert board["version"] == BOARD_VERSION
+    assert board["a"]["pos"] == [2, 4]
+    assert board["a"]["size"] == [20, 14]
+
+
+def test_unsupported_version_is_rejected():
+    with pytest.raises(ValueError):
+        migrate({"version": BOARD_VERSION + 1})
+    with pytest.raises(ValueError):
+        parse_board(["not", "a", "board"], {})
+
+
+def test_invalid_entries_are_quarantined():
+    quarantined = {}
+    obj = {
+        "version": BOARD_VERSION,
+        "a": note(),
+        "b": note(pos=[1.5, 0]),
+        "c": note(type="sticker"),
+        "d": note(title=None),
+        "e": {"type": "box", "body": "", "color": "#000000", "border_color": "#ffffff", "border_type": "wavy"},
+        "background": {"color": "blue", "border_color": "not a color", "type": "plain"},
+        "layers": ["b", "a", "missing"],
+    }
+    board = parse_board(obj, quarantined)
+    assert board["layers"] == ["a"]
+    assert "background" not in board
+    assert sorted(quarantined) == ["b", "background", "c", "d", "e"]
+    assert quarantined["b"]["value"] == note(pos=[1.5, 0])
+    assert "pos" in quarantined["b"]["error"]
+    assert "type" in quarantined["c"]["error"]
+
+
+def test_drawables_missing_from_layers_go_on_top():
+    board = parse_board({"version": BOARD_VERSION, "a": note(), "b": note(), "layers": ["b"]}, {})
+    assert board["layers"] == ["b", "a"]
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [{"size": [0, 5]}, {"size": [True, 5]}, {"pos": [1]}, {"tags": "work"}, {"color": 5}, {"body": None}],
+)
+def test_check_drawable_reasons(changes):
+    assert check_drawable(note(**changes)) is not None
+    assert check_drawable(note(tags=["work"])) is None
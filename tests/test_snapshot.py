@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+from textual.geometry import Size
+
+import notesh.snapshot
+from notesh.snapshot import snapshot_board, snapshot_boards, snapshot_name, snapshot_names
+
+
+def test_snapshot_name_drops_board_suffixes():
+    assert snapshot_name("boards/notes.json.gz") == "notes.svg"
+    assert snapshot_name("plan.v2.json") == "plan.v2.svg"
+
+
+def test_boards_with_same_name_get_their_path():
+    names = snapshot_names(["boards/work/notes.json", "boards/home/notes.json.xz", "boards/todo.json"])
+    assert names == {
+        "boards/work/notes.json": "work-notes.svg",
+        "boards/home/notes.json.xz": "home-notes.svg",
+        "boards/todo.json": "todo.svg",
+    }
+    assert snapshot_names(["a/notes.json", "a/b/notes.json"]) == {
+        "a/notes.json": "notes.svg",
+        "a/b/notes.json": "b-notes.svg",
+    }
+
+
+def test_clashing_snapshots_are_rejected_before_rendering(tmp_path):
+    with pytest.raises(ValueError, match="notes.json, .*notes.json.gz"):
+        snapshot_boards([str(tmp_path / "notes.json"), str(tmp_path / "notes.json.gz")], str(tmp_path / "out"))
+    assert not os.path.exists(tmp_path / "out")
+
+
+def test_snapshot_has_whole_board(tmp_path):
+    board = tmp_path / "notes.json"
+    note = {"title": "far", "body": "far away", "pos": [150, 45], "color": "#ffaa00", "size": [20, 14], "type": "note"}
+    board.write_text(json.dumps({"layers": ["note-aaaa"], "note-aaaa": note}))
+    output = tmp_path / "notes.svg"
+    snapshot_board(str(board), str(output))
+    svg = output.read_text()
+    assert svg.startswith("<svg") and "far&#160;away" in svg
+
+
+def test_board_is_loaded_again_if_field_is_not_as_big_as_screen(tmp_path, monkeypatch):
+    board = tmp_path / "notes.json"
+    note = {"title": "a", "body": "near", "pos": [0, 0], "color": "#ffaa00", "size": [20, 14], "type": "note"}
+    board.write_text(json.dumps({"layers": ["note-aaaa"], "note-aaaa": note}))
+    sizes = []
+    render_board = notesh.snapshot._render_board
+
+    def counted(file_name, output, size):
+        sizes.append(tuple(size))
+        return render_board(file_name, output, size)
+
+    monkeypatch.setattr(notesh.snapshot, "_render_board", counted)
+    snapshot_board(str(board), str(tmp_path / "notes.svg"))
+    assert sizes == [(60, 25)]
+    # Field changed by something screen size was not found from, like unsaved changes
+    monkeypatch.setattr(notesh.snapshot, "_screen_size", lambda file_name: Size(120, 40))
+    sizes.clear()
+    snapshot_board(str(board), str(tmp_path / "notes.svg"))
+    assert sizes == [(120, 40), (60, 25)]
+    assert "near" in (tmp_path / "notes.svg").read_text()
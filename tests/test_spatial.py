@@ -0,0 +1,61 @@
+from textual.geometry import Offset, Region, Size
+
+from notesh.spatial import SpatialIndex
+
+CHUNK = Offset(20, 10)
+
+
+def test_query_and_near():
+    spatial = SpatialIndex(CHUNK)
+    spatial.insert("a", Region(0, 0, 10, 5))
+    spatial.insert("b", Region(12, 0, 10, 5))
+    assert sorted(spatial.query(Region(9, 0, 4, 1))) == ["a", "b"]
+    assert spatial.query(Region(10, 0, 2, 1)) == []
+    assert [key for key, _ in spatial.near(Region(10, 0, 1, 1), 2)] in (["a", "b"], ["b", "a"])
+
+
+def test_bounds_are_whole_chunks_around_regions():
+    spatial = SpatialIndex(CHUNK)
+    assert spatial.bounds() is None
+    spatial.insert("a", Region(5, 5, 10, 3))
+    spatial.insert("b", Region(45, 22, 10, 3))
+    assert spatial.bounds() == Region(0, 0, 60, 30)
+
+    spatial.remove("b")
+    assert spatial.bounds() == Region(0, 0, 20, 10)
+    spatial.remove("a")
+    assert spatial.bounds() is None
+
+
+def test_bounds_follow_moved_and_translated_regions():
+    spatial = SpatialIndex(CHUNK)
+    spatial.insert("a", Region(5, 5, 10, 3))
+    spatial.insert("a", Region(25, 15, 10, 3))
+    assert spatial.bounds() == Region(20, 10, 20, 10)
+
+    spatial.translate(Offset(20, 10))
+    assert spatial.bounds() == Region(40, 20, 20, 10)
+    assert spatial.get("a") == Region(45, 25, 10, 3)
+    assert spatial.query(Region(44, 24, 2, 2)) == ["a"]
+
+
+def test_free_region_avoids_other_regions():
+    spatial = SpatialIndex(CHUNK)
+    spatial.insert("a", Region(0, 0, 10, 5))
+    spatial.insert("b", Region(15, 0, 30, 8))
+    spatial.insert("c", Region(0, 10, 40, 10))
+
+    # Own regions do not block the place
+    assert spatial.free_region(Size(10, 5), Offset(0, 0), ignore={"a"}) == Region(0, 0, 10, 5)
+
+    found = spatial.free_region(Size(10, 5), Offset(0, 0), ignore={"c"})
+    assert found.size == Size(10, 5)
+    assert not set(spatial.query(found)) - {"c"}
+
+
+def test_free_region_past_full_board():
+    spatial = SpatialIndex(CHUNK)
+    spatial.insert("wall", Region(0, 0, 100, 100))
+    found = spatial.free_region(Size(30, 30), Offset(10, 10))
+    assert spatial.query(found) == []
+    assert found.x >= 10 and found.y >= 10
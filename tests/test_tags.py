@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from notesh.tags import TagIndex, parse_tags
+
+
+def test_parse_tags_splits_and_drops_repeats():
+    assert parse_tags("work, home  work,,todo") == ("work", "home", "todo")
+    assert parse_tags("  ") == ()
+
+
+def test_filter_returns_only_changed_drawables():
+    tags = TagIndex()
+    tags.set("a", ("work",))
+    tags.set("b", ("home",))
+    tags.set("c", ())
+    assert tags.apply_filter(["work"]) == (["b", "c"], [])
+    assert tags.apply_filter(["work", "home"]) == ([], ["b"])
+    assert tags.is_hidden("c") and not tags.is_hidden("a")
+    assert tags.apply_filter([]) == ([], ["c"])
+
+
+def test_set_is_checked_against_active_filter():
+    tags = TagIndex()
+    tags.set("a", ("work",))
+    tags.apply_filter(["work"])
+    assert tags.set("b", ("home",)) is True
+    assert tags.set("a", ("home",)) is True
+    assert tags.set("b", ("work", "home")) is False
+    assert [tags.is_hidden(x) for x in "ab"] == [True, False]
+    assert tags.apply_filter([]) == ([], ["a"])
+    assert tags.set("a", ()) is False
+
+
+def test_removed_ordinals_are_reused():
+    tags = TagIndex()
+    for drawable_id in "abc":
+        tags.set(drawable_id, ("work",))
+    tags.remove("b")
+    assert tags.bits["work"] == 0b101
+    tags.set("d", ("home",))
+    assert tags.ordinals["d"] == 1
+    assert tags.names() == ["home", "work"]
+    tags.remove("d")
+    assert "home" not in tags.bits
+
+
+def test_tagging_note_under_filter_hides_it(tmp_path):
+    from notesh.main import NoteApp
+
+    file_name = tmp_path / "notes.json"
+    note = {"title": "", "body": "", "pos": [0, 0], "color": "#ffaa00", "size": [20, 14], "type": "note"}
+    layers = ["note-aaaa", "note-bbbb"]
+    file_name.write_text(json.dumps({"layers": layers, "note-aaaa": {**note, "tags": ["work"]}, "note-bbbb": note}))
+
+    async def main():
+        app = NoteApp(file=str(file_name))
+        async with app.run_test() as pilot:
+            await app.loaded.wait()
+            play_area = app.play_area
+            first, second = (play_area.get_drawable(x) for x in layers)
+            play_area.filter_tags(("work",))
+            assert second.filtered_out and not second.display
+            play_area.select([first])
+            play_area.set_drawable_tags(first, ("home",))
+            assert first.filtered_out and not play_area.selection
+            play_area.set_drawable_tags(second, ("work",))
+            assert not second.filtered_out
+            await pilot.pause()
+
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+import json
+import re
+
+import pytest
+
+from notesh.tools import board_bounds, board_files, board_stem, convert_board, merge_boards, run_tools
+from notesh.utils import load_drawables
+
+NOTE = {"title": "A", "body": "text", "pos": [0, 0], "color": "#ffaa00", "size": [20, 14], "type": "note"}
+
+
+def write_board(path, **drawables):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"version": 1, "layers": list(drawables), **drawables}))
+    return str(path)
+
+
+def test_board_files_skip_quarantine_files(tmp_path):
+    write_board(tmp_path / "a.json", n1=NOTE)
+    write_board(tmp_path / "sub" / "b.json", n1=NOTE)
+    (tmp_path / "a.json.quarantine.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("")
+    assert board_files(str(tmp_path)) == [str(tmp_path / "a.json"), str(tmp_path / "sub" / "b.json")]
+    assert board_stem("notes.json.xz") == "notes"
+
+
+def test_convert_keeps_board(tmp_path):
+    file_name = write_board(tmp_path / "a.json", n1=NOTE, n2={**NOTE, "pos": [30, 5]})
+    assert convert_board(file_name, "json.gz") == (True, f"saved as {tmp_path / 'a.json.gz'}")
+    assert load_drawables(str(tmp_path / "a.json.gz")) == load_drawables(file_name)
+
+
+def test_convert_does_not_overwrite_without_force(tmp_path):
+    file_name = write_board(tmp_path / "a.json", n1=NOTE)
+    other = write_board(tmp_path / "other" / "a.json", n2=NOTE)
+    convert_board(other, "json.gz")
+    (tmp_path / "other" / "a.json.gz").rename(tmp_path / "a.json.gz")
+    ok, message = convert_board(file_name, "json.gz")
+    assert not ok and message.endswith("already exists, use --force to overwrite it")
+    assert [x for x, _ in load_drawables(str(tmp_path / "a.json.gz"))[0]] == ["n2"]
+    assert convert_board(file_name, "json.gz", force=True)[0]
+    assert [x for x, _ in load_drawables(str(tmp_path / "a.json.gz"))[0]] == ["n1"]
+
+
+def test_invalid_entries_fail_board_without_quarantine_files(tmp_path):
+    file_name = write_board(tmp_path / "a.json", n1=NOTE, n2={**NOTE, "size": "big"}, n3={**NOTE, "color": 5})
+    with pytest.raises(ValueError, match="^2 invalid: n2 .*, n3 "):
+        board_bounds(file_name)
+    with pytest.raises(ValueError, match="^2 invalid"):
+        convert_board(file_name, "json.gz")
+    assert sorted(x.name for x in tmp_path.iterdir()) == ["a.json"]
+
+
+def test_merge_puts_boards_side_by_side_with_new_ids(tmp_path):
+    first = load_drawables(write_board(tmp_path / "a.json", n1=NOTE, n2={**NOTE, "pos": [30, 10]}))
+    second = load_drawables(write_board(tmp_path / "b.json", n1={**NOTE, "pos": [100, 50]}))
+    output = tmp_path / "all.json"
+    assert merge_boards([first, second], str(output)) == 3
+    (n1, a), (n2, b), (new_id, c) = load_drawables(str(output))[0]
+    assert (n1, n2) == ("n1", "n2")
+    assert re.fullmatch(r"note-[0-9a-f]{4}", new_id)
+    assert (a["pos"], b["pos"], c["pos"]) == ([0, 0], [30, 10], [54, 0])
+
+
+def test_merge_saves_nothing_if_board_fails(tmp_path, capsys):
+    write_board(tmp_path / "a.json", n1=NOTE)
+    write_board(tmp_path / "b.json", n1={**NOTE, "pos": "here"})
+    output = tmp_path / "out" / "all.json"
+    assert run_tools("merge", str(tmp_path), jobs=1, output=str(output)) == 1
+    assert not output.exists()
+    printed = capsys.readouterr().out
+    assert "b.json: failed, ValueError: 1 invalid: n1" in printed
+    assert "Not merged" in printed
@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from notesh.model import DrawableRecord
+from notesh.schema import BOARD_VERSION
+from notesh.utils import BOARD_ERRORS, LOCK_NAME, lock_file, quarantine_board, read_board, save_drawables
+
+fcntl = pytest.importorskip("fcntl")
+
+
+def test_boards_in_directory_share_one_lock_file(tmp_path):
+    for name in ("one.json", "two.json.gz", "nested/three.json"):
+        with lock_file(str(tmp_path / name)):
+            pass
+    assert sorted(os.listdir(tmp_path)) == sorted([LOCK_NAME, "nested"])
+    assert os.listdir(tmp_path / "nested") == [LOCK_NAME]
+
+
+def test_lock_is_reentrant_and_released(tmp_path):
+    file_name = str(tmp_path / "notes.json")
+    with lock_file(file_name):
+        with lock_file(str(tmp_path / "other.json")):
+            pass
+    # Released, so another open file can take it without waiting
+    with open(tmp_path / LOCK_NAME) as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def test_invalid_entries_are_saved_aside_while_saving(tmp_path):
+    file_name = str(tmp_path / "notes.json")
+    with open(file_name, "w") as file:
+        json.dump({"version": BOARD_VERSION, "bad": {"type": "note"}, "layers": ["bad"]}, file)
+    record = DrawableRecord("note-a", "note", title="Note")
+    # Merge reads the board under lock of the save, quarantining it takes the same lock
+    saved = save_drawables(file_name, [record], ["note-a"], merge=lambda ours, theirs: ours)
+    assert saved["layers"] == ["note-a"]
+    with open(f"{file_name}.quarantine.json") as file:
+        assert list(json.load(file)) == ["bad"]
+    assert sorted(os.listdir(tmp_path)) == sorted([LOCK_NAME, "notes.json", "notes.json.quarantine.json"])
+
+
+def test_unreadable_board_is_moved_aside(tmp_path):
+    file_name = str(tmp_path / "notes.json")
+    for _ in range(2):
+        with open(file_name, "w") as file:
+            file.write('{"layers": [')
+        with pytest.raises(BOARD_ERRORS):
+            read_board(file_name)
+        quarantine_board(file_name)
+    assert not os.path.exists(file_name)
+    assert os.path.exists(f"{file_name}.broken-1")
+    assert os.path.exists(f"{file_name}.broken-2")
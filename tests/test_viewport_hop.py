@@ -0,0 +1,19 @@
+import pytest
+
+from notesh.widgets.viewport_hop import hop_labels
+
+
+@pytest.mark.parametrize("count", [0, 1, 26, 27, 300, 676, 677, 5000])
+def test_labels_are_unique_and_prefix_free(count):
+    labels = hop_labels(count)
+    assert len(labels) == len(set(labels)) == count
+    taken = set(labels)
+    assert not any(label[:end] in taken for label in labels for end in range(1, len(label)))
+
+
+def test_shortest_labels_come_first():
+    labels = hop_labels(700)
+    assert [len(x) for x in labels] == sorted(len(x) for x in labels)
+    assert len(labels[0]) == 2
+    assert len(labels[-1]) == 3
+    assert len(hop_labels(20)[-1]) == 1
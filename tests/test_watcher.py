@@ -0,0 +1,64 @@
+import json
+import os
+
+from textual.geometry import Offset, Size
+
+from notesh.model import DrawableRecord
+from notesh.utils import save_drawables
+from notesh.watcher import BoardWatcher
+
+
+def save(file_name, *records):
+    return save_drawables(file_name, list(records), [x.id for x in records])
+
+
+def note(drawable_id, body="text"):
+    return DrawableRecord(drawable_id, "note", Offset(0, 0), Size(20, 14), "#ffaa00", body, title="Note")
+
+
+def touch_later(file_name):
+    # Changes in the same tick of file system clock would not change stat
+    stat = os.stat(file_name)
+    os.utime(file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_own_save_is_not_reported(tmp_path):
+    file_name = str(tmp_path / "notes.json")
+    watcher = BoardWatcher(file_name)
+    watcher.remember(save(file_name, note("note-a")))
+    assert watcher.check() is None
+
+
+def test_external_change_is_reported_as_diff(tmp_path):
+    file_name = str(tmp_path / "notes.json")
+    watcher = BoardWatcher(file_name)
+    watcher.remember(save(file_name, note("note-a"), note("note-b")))
+
+    with open(file_name) as file:
+        obj = json.load(file)
+    obj["note-a"]["body"] = "changed"
+    del obj["note-b"]
+    obj["layers"] = ["note-a"]
+    with open(file_name, "w") as file:
+        json.dump(obj, file)
+    touch_later(file_name)
+
+    changed = watcher.check()
+    assert changed is not None
+    diff = watcher.diff(changed)
+    assert list(diff.modified) == ["note-a"]
+    assert diff.removed == ["note-b"]
+    assert not diff.added
+
+
+def test_touched_file_with_same_content_has_empty_diff(tmp_path):
+    file_name = str(tmp_path / "notes.json")
+    watcher = BoardWatcher(file_name)
+    watcher.remember(save(file_name, note("note-a")))
+    touch_later(file_name)
+
+    changed = watcher.check()
+    assert changed is not None and not watcher.diff(changed)
+    touch_later(file_name)
+    # Hash of the content is known now, so it is not decoded again
+    assert watcher.check() is None